@@ -0,0 +1 @@
+"""Shared building blocks for the KnowMap Streamlit pages."""
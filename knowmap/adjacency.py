@@ -0,0 +1,189 @@
+import numpy as np
+import scipy.sparse as sp
+
+from knowmap.vector_index import top_k
+
+DIRECTIONS = ("out", "in", "both")
+
+
+class CSRAdjacency:
+    """Directed, multi-relation CSR adjacency of a networkx graph, indexed by predicate.
+
+    Edges are stored once, sorted by (predicate, source, target), so the
+    edges of one predicate are a contiguous slice found by offset lookup.
+    Traversal matrices are built from those slices only: forward rows hold
+    a node's out-edges, reverse rows its in-edges, and "both" ignores
+    direction. Each (predicates, direction) matrix is built once and
+    cached. Undirected graphs store each edge in both directions. k-hop
+    expansion multiplies a sparse frontier vector by the matrix, so each
+    hop only touches the rows of the frontier nodes.
+    """
+
+    def __init__(self, G):
+        self.nodes = list(G.nodes())
+        self.index = {n: i for i, n in enumerate(self.nodes)}
+
+        pred_ids = {}
+        rows, cols, preds = [], [], []
+        for u, v, attr in G.edges(data=True):
+            p = pred_ids.setdefault(attr.get("predicate", ""), len(pred_ids))
+            rows.append(self.index[u])
+            cols.append(self.index[v])
+            preds.append(p)
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        preds = np.asarray(preds, dtype=np.int32)
+        if not G.is_directed():
+            rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
+            preds = np.concatenate([preds, preds])
+
+        order = np.lexsort((cols, rows, preds))
+        self.sources = rows[order]
+        self.targets = cols[order]
+        # Edges of predicate id p are sources/targets[offsets[p]:offsets[p + 1]].
+        self.offsets = np.zeros(len(pred_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(preds, minlength=len(pred_ids)), out=self.offsets[1:])
+        self.predicates = list(pred_ids)
+        self._predicate_ids = pred_ids
+        self._matrices = {}
+        self._by_source = None
+
+    @classmethod
+    def from_arrays(cls, nodes, predicates, sources, targets, offsets):
+        """Rebuild from the `nodes`, `predicates`, `sources`, `targets` and `offsets` of a saved adjacency."""
+        adjacency = cls.__new__(cls)
+        adjacency.nodes = list(nodes)
+        adjacency.index = {n: i for i, n in enumerate(adjacency.nodes)}
+        adjacency.sources = sources
+        adjacency.targets = targets
+        adjacency.offsets = offsets
+        adjacency.predicates = list(predicates)
+        adjacency._predicate_ids = {p: i for i, p in enumerate(adjacency.predicates)}
+        adjacency._matrices = {}
+        adjacency._by_source = None
+        return adjacency
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def predicate_counts(self):
+        return dict(zip(self.predicates, np.diff(self.offsets).tolist()))
+
+    def _edges(self, predicates):
+        if not predicates:
+            return self.sources, self.targets
+        ids = sorted(self._predicate_ids[p] for p in set(predicates) if p in self._predicate_ids)
+        spans = [slice(self.offsets[i], self.offsets[i + 1]) for i in ids]
+        if not spans:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate([self.sources[s] for s in spans]), np.concatenate([self.targets[s] for s in spans])
+
+    def matrix(self, predicates=None, direction="both"):
+        """Adjacency restricted to `predicates` (all edges when None) and oriented by `direction`.
+
+        Entry (i, j) counts the edges that lead from node i to node j: "out"
+        follows edges forward, "in" backward (the reverse index) and "both"
+        either way. Cached per filter and direction.
+        """
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Unknown direction {direction!r}; expected one of {DIRECTIONS}")
+        key = (None if not predicates else frozenset(predicates), direction)
+        if key not in self._matrices:
+            rows, cols = self._edges(key[0])
+            if direction == "in":
+                rows, cols = cols, rows
+            elif direction == "both":
+                rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
+            n = len(self)
+            self._matrices[key] = sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(n, n))
+        return self._matrices[key]
+
+    def induced_edges(self, ids, predicates=None, max_edges=None):
+        """(sources, targets, predicate ids) of the stored edges between the node ids `ids`.
+
+        Only the out-edges of `ids` are read, through a source-ordered edge
+        index built once, and the predicate of each edge comes from the
+        per-predicate offsets. At most `max_edges` edges are returned.
+        """
+        if self._by_source is None:
+            order = np.argsort(self.sources, kind="stable")
+            indptr = np.zeros(len(self) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.sources, minlength=len(self)), out=indptr[1:])
+            self._by_source = (order, indptr)
+        order, indptr = self._by_source
+        ids = np.asarray(ids, dtype=np.int64)
+        inside = np.zeros(len(self), dtype=bool)
+        inside[ids] = True
+        starts, counts = indptr[ids], indptr[ids + 1] - indptr[ids]
+        # Positions starts[i] .. starts[i] + counts[i] for every i, without a Python loop.
+        firsts = np.repeat(np.cumsum(counts) - counts, counts)
+        edges = order[np.repeat(starts, counts) + np.arange(counts.sum()) - firsts]
+        edges = edges[inside[self.targets[edges]]]
+        preds = np.searchsorted(self.offsets, edges, side="right") - 1
+        if predicates:
+            wanted = [self._predicate_ids[p] for p in predicates if p in self._predicate_ids]
+            keep = np.isin(preds, wanted)
+            edges, preds = edges[keep], preds[keep]
+        if max_edges is not None:
+            edges, preds = edges[:max_edges], preds[:max_edges]
+        return self.sources[edges], self.targets[edges], preds
+
+    def neighbors(self, node, predicates=None, direction="out"):
+        """Nodes one edge away from `node`, e.g. direction="in" for everything pointing at it."""
+        i = self.index.get(node)
+        if i is None:
+            return []
+        A = self.matrix(predicates, direction)
+        return [self.nodes[j] for j in A.indices[A.indptr[i]:A.indptr[i + 1]]]
+
+    def _hops(self, seeds, depth, max_nodes, predicates, direction):
+        """Hop count per node id from `seeds` (-1 where unreached)."""
+        A = self.matrix(predicates, direction)
+        n = len(self)
+        seeds = np.unique(np.fromiter((self.index[s] for s in seeds if s in self.index), dtype=np.int64))
+        hops = np.full(n, -1, dtype=np.int32)
+        if not len(seeds):
+            return hops
+        hops[seeds] = 0
+        frontier = seeds
+        budget = None if max_nodes is None else max_nodes - len(seeds)
+
+        for hop in range(1, depth + 1):
+            if not len(frontier) or (budget is not None and budget <= 0):
+                break
+            f = sp.csr_matrix((np.ones(len(frontier), dtype=np.float32), (np.zeros(len(frontier), dtype=np.int64), frontier)), shape=(1, n))
+            reached = f @ A
+            cand, links = reached.indices, reached.data
+            fresh = hops[cand] < 0
+            cand, links = cand[fresh], links[fresh]
+            if budget is not None and len(cand) > budget:
+                keep = top_k(links, budget)
+                cand = cand[keep]
+            hops[cand] = hop
+            frontier = cand
+            if budget is not None:
+                budget -= len(cand)
+
+        return hops
+
+    def expand(self, seeds, depth=1, max_nodes=None, predicates=None, direction="both"):
+        """Node ids within `depth` hops of `seeds`, capped at `max_nodes`.
+
+        When a hop would pass the cap, the new nodes with the most links
+        into the current frontier are kept first.
+        """
+        return np.flatnonzero(self._hops(seeds, depth, max_nodes, predicates, direction) >= 0)
+
+    def expand_nodes(self, seeds, depth=1, max_nodes=None, predicates=None, direction="both"):
+        return [self.nodes[i] for i in self.expand(seeds, depth, max_nodes, predicates, direction)]
+
+    def reach(self, seeds, depth=1, max_nodes=None, predicates=None, direction="in"):
+        """(node, hops) for every node reached from `seeds`, nearest first; the seeds themselves are left out.
+
+        With direction="in" and predicates=["influences"] this is everything
+        that influences the seeds, directly or through up to `depth` steps.
+        """
+        hops = self._hops(seeds, depth, max_nodes, predicates, direction)
+        found = np.flatnonzero(hops > 0)
+        found = found[np.argsort(hops[found], kind="stable")]
+        return [(self.nodes[i], int(hops[i])) for i in found]
@@ -0,0 +1,278 @@
+import json
+import os
+import shutil
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+from knowmap.config import CACHE_DIR
+from knowmap.generations import new_generation, publish, read_current
+from knowmap.telemetry import timed
+
+N_LANDMARKS = 16
+ROUTE_CANDIDATES = 4
+BETWEENNESS_SAMPLES = 64
+PAGERANK_ALPHA = 0.85
+
+# Distance sketches are uint16; this marks "not reachable from the landmark".
+UNREACHED = np.iinfo(np.uint16).max
+# Analytics of this many graph versions are kept on disk; older ones are deleted after each save.
+KEEP_VERSIONS = 2
+
+_ARRAYS = ("degree", "pagerank", "betweenness", "component", "landmarks", "distances", "predecessors")
+
+
+def pagerank(A, alpha=PAGERANK_ALPHA, tol=1e-6, max_iter=100):
+    """PageRank by power iteration over a CSR matrix whose (i, j) entries count edges i -> j.
+
+    Rank of nodes without out-edges is spread uniformly, as in networkx.
+    """
+    n = A.shape[0]
+    if not n:
+        return np.zeros(0)
+    out = np.asarray(A.sum(axis=1)).ravel()
+    dangling = out == 0
+    inv_out = np.divide(1.0, out, out=np.zeros(n), where=~dangling)
+    At = A.T.tocsr()
+    r = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        prev = r
+        r = alpha * (At @ (prev * inv_out) + prev[dangling].sum() / n) + (1 - alpha) / n
+        if np.abs(r - prev).sum() < n * tol:
+            break
+    return r / r.sum()
+
+
+def _pick_landmarks(degree, component, n_landmarks):
+    """The best-connected node of each of the largest components first, then the highest-degree nodes overall."""
+    by_degree = np.argsort(-degree, kind="stable")
+    sizes = np.bincount(component)
+    picked = []
+    for c in np.argsort(-sizes, kind="stable")[:n_landmarks]:
+        if sizes[c] > 1:
+            picked.append(by_degree[component[by_degree] == c][0])
+    seen = set(picked)
+    for i in by_degree:
+        if len(picked) >= n_landmarks:
+            break
+        if i not in seen:
+            picked.append(i)
+            seen.add(i)
+    return np.asarray(picked, dtype=np.int64)
+
+
+class GraphAnalytics:
+    """Centrality, components and landmark distance sketches for one graph version.
+
+    Path queries ignore edge direction: two concepts are connected if any
+    chain of relations links them. Each landmark keeps its BFS distance to
+    every node plus the BFS tree, so a route through a landmark is read off
+    in O(path length) and the distances bound the true hop count from both
+    sides.
+    """
+
+    def __init__(self, nodes, degree, pagerank, betweenness, component, landmarks, distances, predecessors):
+        self.nodes = nodes
+        self.index = {n: i for i, n in enumerate(nodes)}
+        self.degree = degree
+        self.pagerank = pagerank
+        self.betweenness = betweenness
+        self.component = component
+        self.landmarks = landmarks
+        self.distances = distances
+        self.predecessors = predecessors
+        self._pagerank_rank = None
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def n_components(self):
+        return int(self.component.max()) + 1 if len(self.component) else 0
+
+    def importance(self, node):
+        """PageRank percentile in [0, 1] (1 = most central concept)."""
+        if self._pagerank_rank is None:
+            order = np.argsort(self.pagerank, kind="stable")
+            rank = np.empty(len(order), dtype=np.float64)
+            rank[order] = np.arange(len(order)) / max(1, len(order) - 1)
+            self._pagerank_rank = rank
+        i = self.index.get(node)
+        return None if i is None else float(self._pagerank_rank[i])
+
+    def stats(self, node):
+        i = self.index.get(node)
+        if i is None:
+            return None
+        return {
+            "node": node,
+            "degree": int(self.degree[i]),
+            "pagerank": float(self.pagerank[i]),
+            "importance": self.importance(node),
+            "betweenness": float(self.betweenness[i]),
+            "component": int(self.component[i]),
+        }
+
+    def top(self, by="pagerank", limit=20):
+        scores = getattr(self, by)
+        best = np.argsort(-scores, kind="stable")[:limit]
+        return [self.stats(self.nodes[i]) for i in best]
+
+    def _tree_path(self, landmark, i):
+        """Nodes from i up the BFS tree of `landmark` to the landmark itself."""
+        preds = self.predecessors[landmark]
+        path = [i]
+        while path[-1] != self.landmarks[landmark]:
+            path.append(int(preds[path[-1]]))
+        return path
+
+    def _route(self, landmark, a, b):
+        up, down = self._tree_path(landmark, a), self._tree_path(landmark, b)
+        # Drop the shared tail of both tree paths: they meet at their lowest common ancestor.
+        while len(up) > 1 and len(down) > 1 and up[-2] == down[-2]:
+            up.pop()
+            down.pop()
+        return up + down[-2::-1]
+
+    def connect(self, source, target, adjacency=None):
+        """Route between two concepts through the landmark BFS trees, or None when they are not connected.
+
+        Returns {"path", "hops", "lower_bound", "exact"}. `hops` is the
+        length of the returned path; the shortest path has at least
+        `lower_bound` hops, so the route is optimal when the two agree.
+        Concepts in small components without a landmark are routed by a
+        BFS over `adjacency`, which only walks that component.
+        """
+        a, b = self.index.get(source), self.index.get(target)
+        if a is None or b is None or self.component[a] != self.component[b]:
+            return None
+        if a == b:
+            return {"path": [source], "hops": 0, "lower_bound": 0, "exact": True}
+        da = self.distances[:, a].astype(np.int64)
+        db = self.distances[:, b].astype(np.int64)
+        usable = (da != UNREACHED) & (db != UNREACHED)
+        if not usable.any():
+            path = None if adjacency is None else _bfs_path(adjacency, source, target)
+            return None if path is None else {"path": path, "hops": len(path) - 1, "lower_bound": len(path) - 1, "exact": True}
+        lower = int(np.abs(da[usable] - db[usable]).max())
+        # Tree routes can beat their landmark's distance bound, so the few most promising landmarks are all tried.
+        candidates = np.flatnonzero(usable)
+        candidates = candidates[np.argsort((da + db)[candidates], kind="stable")[:ROUTE_CANDIDATES]]
+        path = min((self._route(int(c), a, b) for c in candidates), key=len)
+        hops = len(path) - 1
+        return {"path": [self.nodes[i] for i in path], "hops": hops, "lower_bound": max(lower, 1), "exact": hops <= max(lower, 1)}
+
+
+def _bfs_path(adjacency, source, target):
+    A = adjacency.matrix(direction="both")
+    start, goal = adjacency.index[source], adjacency.index[target]
+    parent = {start: start}
+    frontier = [start]
+    while frontier and goal not in parent:
+        nxt = []
+        for i in frontier:
+            for j in A.indices[A.indptr[i]:A.indptr[i + 1]]:
+                if j not in parent:
+                    parent[j] = i
+                    nxt.append(j)
+        frontier = nxt
+    if goal not in parent:
+        return None
+    path = [goal]
+    while path[-1] != start:
+        path.append(parent[path[-1]])
+    return [adjacency.nodes[i] for i in reversed(path)]
+
+
+def compute_analytics(adjacency, n_landmarks=N_LANDMARKS, betweenness_samples=BETWEENNESS_SAMPLES, seed=0):
+    """Degree, PageRank, sampled betweenness, weak components and landmark BFS sketches of a graph.
+
+    Everything runs on the CSR adjacency except betweenness, which uses
+    networkx on `betweenness_samples` random source nodes (Brandes with
+    pivots), so its cost grows with samples x edges rather than nodes x edges.
+    """
+    n = len(adjacency)
+    with timed("analytics.compute", items=n):
+        A_out = adjacency.matrix(direction="out")
+        A = adjacency.matrix(direction="both")
+        degree = np.asarray(A.sum(axis=1)).ravel().astype(np.int64)
+        with timed("analytics.pagerank", items=n):
+            ranks = pagerank(A_out)
+        _, component = csgraph.connected_components(A, directed=False)
+        component = component.astype(np.int32)
+
+        with timed("analytics.betweenness", items=n):
+            U = nx.from_scipy_sparse_array(sp.csr_matrix((np.ones(A.nnz), A.indices, A.indptr), shape=A.shape))
+            between = nx.betweenness_centrality(U, k=min(betweenness_samples, n), seed=seed) if n else {}
+            betweenness = np.fromiter((between.get(i, 0.0) for i in range(n)), dtype=np.float64, count=n)
+
+        landmarks = _pick_landmarks(degree, component, n_landmarks) if n else np.zeros(0, dtype=np.int64)
+        with timed("analytics.landmarks", items=len(landmarks)):
+            if len(landmarks):
+                dist, preds = csgraph.shortest_path(A, directed=False, unweighted=True, indices=landmarks, return_predecessors=True)
+                distances = np.where(np.isinf(dist), UNREACHED, np.minimum(dist, UNREACHED - 1)).astype(np.uint16)
+                predecessors = preds.astype(np.int32)
+            else:
+                distances = np.zeros((0, n), dtype=np.uint16)
+                predecessors = np.zeros((0, n), dtype=np.int32)
+
+    return GraphAnalytics(adjacency.nodes, degree, ranks, betweenness, component, landmarks, distances, predecessors)
+
+
+def analytics_path(version):
+    return os.path.join(CACHE_DIR, "analytics", version)
+
+
+def save_analytics(analytics, version):
+    """Publish `analytics` as a new generation of the version's directory (see knowmap.generations).
+
+    Processes that compute the same version at once each publish a
+    complete copy, so neither can delete the other's output while it is
+    read. Versions other than the KEEP_VERSIONS most recent are removed.
+    """
+    root = analytics_path(version)
+    os.makedirs(root, exist_ok=True)
+    path = new_generation(root)
+    for name in _ARRAYS:
+        np.save(os.path.join(path, f"{name}.npy"), getattr(analytics, name))
+    with open(os.path.join(path, "nodes.json"), "w", encoding="utf-8") as f:
+        json.dump([str(n) for n in analytics.nodes], f)
+    publish(path)
+    prune_analytics(keep=root)
+    return path
+
+
+def prune_analytics(keep):
+    """Delete the analytics of all but the KEEP_VERSIONS most recently saved versions; `keep` is always kept."""
+    parent = os.path.dirname(keep)
+    # Publishing a generation replaces CURRENT, which also bumps the version directory's mtime.
+    saved = [os.path.join(parent, d) for d in os.listdir(parent)]
+    saved = sorted((p for p in saved if p != keep and os.path.isdir(p)), key=os.path.getmtime, reverse=True)
+    for old in saved[KEEP_VERSIONS - 1:]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def _load_generation(path):
+    with open(os.path.join(path, "nodes.json"), encoding="utf-8") as f:
+        nodes = json.load(f)
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in _ARRAYS}
+    return GraphAnalytics(nodes, **arrays)
+
+
+def load_analytics(version):
+    """The saved analytics of `version`, read back memory-mapped, or None."""
+    try:
+        return read_current(analytics_path(version), _load_generation)
+    except FileNotFoundError:
+        return None
+
+
+def load_or_compute_analytics(adjacency, version, **kwargs):
+    """Analytics for one graph version, computed once and kept on disk (read back memory-mapped)."""
+    analytics = load_analytics(version)
+    if analytics is None:
+        analytics = compute_analytics(adjacency, **kwargs)
+        save_analytics(analytics, version)
+    return analytics
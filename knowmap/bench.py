@@ -0,0 +1,315 @@
+"""Benchmarks for the graph, search, rendering and extraction hot paths.
+
+    python -m knowmap.bench --preset demo
+    python -m knowmap.bench --nodes 100000 --degree 4 --out bench.json
+    python -m knowmap.bench --nodes 100000 --compare bench.json
+
+Synthetic graphs are generated from a seed, so two runs with the same
+arguments time the same data. Results are written as JSON with the git
+commit and library versions, so runs from different commits can be
+compared with --compare.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import networkx as nx
+import numpy as np
+
+from knowmap import telemetry
+from knowmap.adjacency import CSRAdjacency
+from knowmap.analytics import compute_analytics
+from knowmap.config import SPACY_MODEL_NAME
+from knowmap.demo_data import NODE_SENTENCES, TRIPLES
+from knowmap.extraction import extract_chunk, extract_entities_and_triples, extraction_cost
+from knowmap.graph_store import GraphStore, build_graph
+from knowmap.lod import lod_view, summarize_graph
+from knowmap.render import graph_html
+from knowmap.search import build_subgraph_from_matches, build_tfidf, node_documents, semantic_search, semantic_search_batch
+
+# pyvis renders every node into the page, so full-graph HTML is only timed up to this size.
+RENDER_LIMIT = 5000
+
+_SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "ta", "vi", "zo", "qu", "sh", "an", "el", "or", "ex", "um")
+
+
+def synthetic_vocabulary(size, seed=0):
+    """`size` distinct pronounceable pseudo-words."""
+    rng = np.random.default_rng(seed)
+    words = set()
+    while len(words) < size:
+        parts = rng.integers(0, len(_SYLLABLES), size=(size, 4))
+        lengths = rng.integers(2, 5, size=size)
+        words.update("".join(_SYLLABLES[j] for j in row[:n]) for row, n in zip(parts, lengths))
+    return sorted(words)[:size]
+
+
+def synthetic_triples(n_nodes, avg_degree=4.0, degree="powerlaw", n_predicates=20, exponent=1.1, seed=0):
+    """Random (subject, predicate, object) triples over `n_nodes` concepts.
+
+    `degree` is "powerlaw" (a few hub concepts, as in real knowledge graphs;
+    weight of node rank r is r ** -exponent) or "uniform". There are about
+    n_nodes * avg_degree / 2 triples and no self-loops.
+    """
+    rng = np.random.default_rng(seed)
+    n_triples = max(1, int(n_nodes * avg_degree / 2))
+    if degree == "powerlaw":
+        weights = np.arange(1, n_nodes + 1, dtype=np.float64) ** -exponent
+        weights /= weights.sum()
+        s = rng.choice(n_nodes, size=n_triples, p=weights)
+        o = rng.choice(n_nodes, size=n_triples, p=weights)
+    elif degree == "uniform":
+        s = rng.integers(0, n_nodes, size=n_triples)
+        o = rng.integers(0, n_nodes, size=n_triples)
+    else:
+        raise ValueError(f"Unknown degree distribution: {degree!r}")
+    keep = s != o
+    s, o = s[keep], o[keep]
+    p = rng.integers(0, n_predicates, size=len(s))
+
+    names = np.array([f"Concept {i}" for i in range(n_nodes)], dtype=object)
+    predicates = np.array([f"relation_{i}" for i in range(n_predicates)], dtype=object)
+    return list(zip(names[s], predicates[p], names[o]))
+
+
+def synthetic_sentences(nodes, doc_length=12, vocabulary=None, seed=0):
+    """{node: sentence} with `doc_length` words each, drawn from `vocabulary`."""
+    rng = np.random.default_rng(seed + 1)
+    vocabulary = np.array(vocabulary or synthetic_vocabulary(2000, seed), dtype=object)
+    words = vocabulary[rng.integers(0, len(vocabulary), size=(len(nodes), doc_length))]
+    return {n: " ".join(row) + "." for n, row in zip(nodes, words)}
+
+
+def synthetic_texts(nodes, n_texts, mentions=3, doc_length=12, seed=0):
+    """Free-text rows that mention `mentions` known concepts each, for extraction benchmarks."""
+    rng = np.random.default_rng(seed + 2)
+    nodes = np.array(nodes, dtype=object)
+    vocabulary = np.array(synthetic_vocabulary(500, seed), dtype=object)
+    picked = nodes[rng.integers(0, len(nodes), size=(n_texts, mentions))]
+    filler = vocabulary[rng.integers(0, len(vocabulary), size=(n_texts, doc_length))]
+    return [" ".join(f) + " " + " and ".join(p) + "." for p, f in zip(picked, filler)]
+
+
+def parser_model(name, entity_names):
+    """spaCy pipeline `name` with an entity ruler that knows `entity_names`, ahead of its own NER."""
+    import spacy
+
+    nlp = spacy.load(name)
+    ruler = nlp.add_pipe("entity_ruler", before="ner") if nlp.has_pipe("ner") else nlp.add_pipe("entity_ruler")
+    ruler.add_patterns([{"label": "CONCEPT", "pattern": name} for name in entity_names])
+    return nlp
+
+
+def extraction_model(spacy_model, entity_names):
+    """(nlp, None) for a pipeline with a dependency parser, or (None, why the extraction stages are skipped)."""
+    try:
+        import spacy
+    except ImportError:
+        return None, "spaCy is not installed"
+    name = spacy_model or SPACY_MODEL_NAME
+    if spacy_model is None and not spacy.util.is_package(name):
+        return None, f"{name} is not installed; the extractor needs a dependency parse (pass --spacy-model)"
+    nlp = parser_model(name, entity_names)
+    if not nlp.has_pipe("parser"):
+        return None, f"{name} has no dependency parser, so the extractor would find no triples"
+    return nlp, None
+
+
+def measure(func, repeat=3, items=None):
+    """Run `func` `repeat` times; returns timing stats and the last return value."""
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    stats = {
+        "repeat": repeat,
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "mean_s": statistics.fmean(times),
+    }
+    if items:
+        stats["items"] = items
+        stats["items_per_sec"] = items / stats["median_s"] if stats["median_s"] > 0 else None
+    return stats, result
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=os.path.dirname(__file__))
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _versions():
+    versions = {"python": platform.python_version(), "numpy": np.__version__, "networkx": nx.__version__}
+    for name in ("scipy", "sklearn", "pyvis", "spacy"):
+        module = sys.modules.get(name)
+        if module is not None:
+            versions[name] = getattr(module, "__version__", None)
+    return versions
+
+
+def run(triples, sentences, n_queries=100, k=5, depth=1, max_sub_nodes=300, n_texts=2000, repeat=3, spacy_model=None, n_workers=2, seed=0, log=print):
+    """Time every stage on one dataset; returns {stage: stats}."""
+    results = {}
+
+    def stage(name, func, items=None, repeat=repeat):
+        log(f"  {name} ...")
+        results[name], value = measure(func, repeat=repeat, items=items)
+        log(f"  {name}: {results[name]['median_s'] * 1000:,.2f} ms (median of {repeat})")
+        return value
+
+    G = stage("build_graph", lambda: build_graph(triples, sentences), items=len(triples))
+    stage("graph_store_sync", lambda: GraphStore(sentences).sync(triples), items=len(triples), repeat=1)
+    results["graph"] = {"nodes": G.number_of_nodes(), "edges": G.number_of_edges(), "triples": len(triples)}
+
+    nodes, docs = stage("node_documents", lambda: node_documents(G), items=G.number_of_nodes())
+    vectorizer, embeddings = stage("prepare_corpus_tfidf", lambda: build_tfidf(docs), items=len(docs))
+
+    rng = np.random.default_rng(seed + 3)
+    queries = [docs[i].split(": ", 1)[-1][:40] for i in rng.integers(0, len(docs), size=n_queries)]
+    stage(
+        "semantic_search",
+        lambda: [semantic_search(q, nodes, docs, None, embeddings, vectorizer, top_k=k) for q in queries],
+        items=len(queries),
+    )
+    matches = stage("semantic_search_batch", lambda: semantic_search_batch(queries, nodes, None, embeddings, vectorizer, top_k=k), items=len(queries))
+    seeds = [[n for n, _ in m] for m in matches]
+
+    stage("subgraph_walk", lambda: [build_subgraph_from_matches(G, s, depth) for s in seeds], items=len(seeds))
+    adjacency = stage("csr_adjacency", lambda: CSRAdjacency(G), items=G.number_of_edges())
+    subgraphs = stage(
+        "subgraph_csr",
+        lambda: [build_subgraph_from_matches(G, s, depth, adjacency=adjacency, max_nodes=max_sub_nodes) for s in seeds],
+        items=len(seeds),
+    )
+    relation = adjacency.predicates[0] if adjacency.predicates else None
+    stage(
+        "relation_reach",
+        lambda: [adjacency.reach(s[:1], 2, max_nodes=max_sub_nodes, predicates=[relation], direction="in") for s in seeds],
+        items=len(seeds),
+    )
+    analytics = stage("analytics_compute", lambda: compute_analytics(adjacency), items=G.number_of_nodes(), repeat=1)
+    pairs = [(s[0], seeds[-1 - i][0]) for i, s in enumerate(seeds) if s and seeds[-1 - i]]
+    stage("connect", lambda: [analytics.connect(a, b, adjacency) for a, b in pairs], items=len(pairs))
+
+    largest = max(subgraphs, key=len)
+    stage("graph_html_subgraph", lambda: graph_html(largest, 400), items=largest.number_of_nodes())
+    if G.number_of_nodes() <= RENDER_LIMIT:
+        stage("graph_html_full", lambda: graph_html(G, 600), items=G.number_of_nodes())
+    else:
+        results["graph_html_full"] = {"skipped": f"more than {RENDER_LIMIT} nodes"}
+    summary = stage("lod_summarize", lambda: summarize_graph(G), items=G.number_of_nodes(), repeat=1)
+    view = lod_view(G, summary)
+    stage("graph_html_lod", lambda: graph_html(view, 600), items=view.number_of_nodes())
+
+    nlp, skipped = extraction_model(spacy_model, nodes[:5000])
+    if nlp is None:
+        results["extract_entities_and_triples"] = {"skipped": skipped}
+        log(f"  extraction skipped: {skipped}")
+    else:
+        texts = synthetic_texts(nodes, n_texts, seed=seed)
+        stage("extract_entities_and_triples", lambda: [extract_entities_and_triples(nlp, t) for t in texts], items=len(texts), repeat=1)
+        for n_process in sorted({1, n_workers}):
+            # Spawning the pool's workers and loading the pipeline in each is a one-off cost, kept out of the timing.
+            extract_chunk(nlp, texts[:n_process], n_process=n_process)
+            chunk = stage(f"extract_chunk_x{n_process}", lambda: extract_chunk(nlp, texts, n_process=n_process), items=len(texts), repeat=1)
+            results[f"extraction_cost_x{n_process}"] = extraction_cost([chunk])
+    return results
+
+
+def compare(current, baseline):
+    """Rows of (stage, baseline median ms, current median ms, ratio) for stages timed in both runs."""
+    rows = []
+    for name, stats in current["results"].items():
+        base = baseline["results"].get(name, {})
+        if "median_s" in stats and "median_s" in base:
+            rows.append((name, base["median_s"] * 1000, stats["median_s"] * 1000, stats["median_s"] / base["median_s"] if base["median_s"] else None))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m knowmap.bench", description=__doc__.splitlines()[0])
+    parser.add_argument("--preset", choices=["demo", "synthetic"], default="synthetic", help="demo = the built-in 36-triple graph")
+    parser.add_argument("--nodes", type=int, default=10000)
+    parser.add_argument("--degree", type=float, default=4.0, help="average node degree")
+    parser.add_argument("--distribution", choices=["powerlaw", "uniform"], default="powerlaw")
+    parser.add_argument("--predicates", type=int, default=20, help="size of the predicate vocabulary")
+    parser.add_argument("--doc-length", type=int, default=12, help="words per node document")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--depth", type=int, default=1)
+    parser.add_argument("--texts", type=int, default=2000, help="rows for the extraction benchmark")
+    parser.add_argument("--spacy-model", default=None, help=f"spaCy pipeline with a dependency parser for the extraction stages (default {SPACY_MODEL_NAME}, skipped if it is not installed)")
+    parser.add_argument("--workers", type=int, default=2, help="worker processes for the pooled extraction benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", default=None, help="earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    # Benchmark calls must not end up in the app's telemetry.
+    telemetry.ENABLED = False
+
+    def log(msg):
+        print(msg, file=sys.stderr)
+
+    log("Generating data ...")
+    if args.preset == "demo":
+        triples, sentences = list(TRIPLES), dict(NODE_SENTENCES)
+    else:
+        triples = synthetic_triples(args.nodes, args.degree, args.distribution, args.predicates, seed=args.seed)
+        concepts = sorted({t[0] for t in triples} | {t[2] for t in triples})
+        sentences = synthetic_sentences(concepts, args.doc_length, seed=args.seed)
+
+    results = run(
+        triples,
+        sentences,
+        n_queries=args.queries,
+        k=args.k,
+        depth=args.depth,
+        n_texts=args.texts,
+        repeat=args.repeat,
+        spacy_model=args.spacy_model,
+        n_workers=args.workers,
+        seed=args.seed,
+        log=log,
+    )
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "versions": _versions(),
+            "params": vars(args),
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        log(f"Wrote {args.out}")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        log(f"\n{'stage':32} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+        for name, base_ms, cur_ms, ratio in compare(report, baseline):
+            log(f"{name:32} {base_ms:12.2f} {cur_ms:12.2f} {ratio:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
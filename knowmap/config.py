@@ -0,0 +1,30 @@
+import os
+
+# Root for everything KnowMap keeps on local disk between runs (embedding
+# cache, indexes, job checkpoints, ...). Override with KNOWMAP_CACHE_DIR.
+CACHE_DIR = os.environ.get(
+    "KNOWMAP_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "knowmap"),
+)
+
+# Prebuilt graph snapshots loaded at startup (see knowmap.snapshot). Point
+# KNOWMAP_SNAPSHOT_DIR at a directory baked into an image to start serving without rebuilding.
+SNAPSHOT_DIR = os.environ.get("KNOWMAP_SNAPSHOT_DIR", os.path.join(CACHE_DIR, "snapshots"))
+
+SENTENCE_MODEL_NAME = "all-MiniLM-L6-v2"
+SPACY_MODEL_NAME = "en_core_web_sm"
+
+# Precision of the scanned node embeddings: "none" (float32), "float16" or "int8".
+# Quantized scans are re-ranked on the float32 vectors.
+EMBEDDING_QUANTIZATION = os.environ.get("KNOWMAP_EMBEDDING_QUANTIZATION", "none")
+
+# Base URL of a running knowmap.service (e.g. http://127.0.0.1:8765). When set, the
+# Knowledge Graph page is a thin client of that shared service instead of holding its own graph.
+SERVICE_URL = os.environ.get("KNOWMAP_SERVICE_URL")
+
+
+def cache_path(*parts):
+    """Return a path under CACHE_DIR, creating the parent directory."""
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
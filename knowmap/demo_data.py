@@ -0,0 +1,72 @@
+# Demo knowledge graph shown until a dataset has been uploaded.
+
+TRIPLES = [
+    ("Asia", "has_topic", "Classical Mechanics"),
+    ("Asia", "has_topic", "Quantum Mechanics"),
+    ("Asia", "related_to", "Mathematics"),
+    ("Classical Mechanics", "has_concept", "Newton's Laws"),
+    ("Classical Mechanics", "has_concept", "Energy Conservation"),
+    ("Quantum Mechanics", "has_concept", "Wave Function"),
+    ("Quantum Mechanics", "has_concept", "Uncertainty Principle"),
+    ("Mathematics", "has_topic", "Calculus"),
+    ("Calculus", "used_in", "Classical Mechanics"),
+    ("Quantum Mechanics", "influences", "Philosophy"),
+    ("Philosophy", "has_topic", "Epistemology"),
+    ("History of Science", "has_figure", "Isaac Newton"),
+    ("History of Science", "has_figure", "Albert Einstein"),
+    ("Isaac Newton", "born_in", "1643"),
+    ("Albert Einstein", "born_in", "1879"),
+    ("Technology", "related_to", "Asia"),
+    ("Biology", "has_topic", "Genetics"),
+    ("Genetics", "has_concept", "DNA"),
+    ("DNA", "discovered_by", "Watson & Crick"),
+    ("Astronomy", "has_topic", "Astrophysics"),
+    ("Astrophysics", "related_to", "Asia"),
+    ("Concept A", "subconcept_of", "Asia"),
+    ("Concept B", "subconcept_of", "Asia"),
+    ("Sun", "is_a", "Star"),
+    ("Sun", "related_to", "Astrophysics"),
+    ("Sun", "has_feature", "Solar Flares"),
+    ("Solar Flares", "affects", "Space Weather"),
+    ("Space Weather", "affects", "Satellite Operations"),
+    ("Concept C", "linked_to", "History of Science"),
+    ("Sub-A1", "part_of", "Concept A"),
+    ("Sub-A2", "part_of", "Concept A"),
+    ("Sub-B1", "part_of", "Concept B"),
+    ("Sub-C1", "part_of", "Concept C"),
+    ("Technology", "used_in", "Satellite Operations"),
+    ("Philosophy", "influences", "History of Science"),
+    ("Mathematics", "used_in", "Astrophysics"),
+]
+
+NODE_SENTENCES = {
+    "Asia": "Physics is the natural science that studies matter, motion and behavior through space and time.",
+    "Classical Mechanics": "Classical mechanics deals with the motion of bodies under forces such as Newton's laws and energy conservation.",
+    "Quantum Mechanics": "Quantum mechanics studies physical phenomena at the scale of atoms and subatomic particles and includes the wave function and uncertainty principle.",
+    "Mathematics": "Mathematics provides the language and tools used in physical theories, including calculus and linear algebra.",
+    "Calculus": "Calculus is used for describing change and motion, including derivatives and integrals.",
+    "Newton's Laws": "Newton's laws are foundational principles describing how forces affect motion.",
+    "Energy Conservation": "Conservation of energy is a key principle in many physical and engineering systems.",
+    "Wave Function": "The wave function is a mathematical description of the quantum state of a system.",
+    "Uncertainty Principle": "Heisenberg's uncertainty principle limits the precision of position and momentum measurements.",
+    "Philosophy": "Philosophy studies fundamental questions about knowledge, existence, and reasoning.",
+    "History of Science": "The history of science traces the development of scientific ideas and influential figures.",
+    "Isaac Newton": "Isaac Newton, born 1643, formulated laws of motion and universal gravitation.",
+    "Albert Einstein": "Albert Einstein, born 1879, developed the theory of relativity and shaped modern physics.",
+    "Technology": "Technology is the application of scientific knowledge for practical purposes, such as satellites.",
+    "Biology": "Biology studies living organisms and life processes, including genetics and evolution.",
+    "Genetics": "Genetics is the study of heredity and genes, including DNA structure and function.",
+    "DNA": "DNA stores genetic information in living organisms.",
+    "Sun": "The Sun is a G-type main-sequence star at the center of the Solar System; it produces light and solar activity.",
+    "Solar Flares": "Solar flares are sudden eruptions of energy from the Sun's atmosphere that can affect space weather.",
+    "Space Weather": "Space weather describes variable conditions in space driven by solar activity and can impact satellites and communications.",
+    "Satellite Operations": "Satellite operations manage the functioning and control of satellites orbiting Earth.",
+    "Astrophysics": "Astrophysics applies principles of physics and mathematics to study astronomical objects and phenomena.",
+    "Concept A": "Concept A is a placeholder central concept in this demo KG.",
+    "Concept B": "Concept B is another demo concept that connects to Concept A.",
+    "Concept C": "Concept C deals with historical aspects in the demo.",
+    "Sub-A1": "Sub-A1 is a subtopic of Concept A.",
+    "Sub-A2": "Sub-A2 is a subtopic of Concept A.",
+    "Sub-B1": "Sub-B1 is a subtopic of Concept B.",
+    "Sub-C1": "Sub-C1 is a subtopic of Concept C.",
+}
@@ -0,0 +1,253 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from knowmap.config import cache_path
+from knowmap.telemetry import timed
+from knowmap.vector_index import normalize_rows, quantize_int8
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: fall back to the in-process lock only
+    fcntl = None
+
+KEY_DTYPE = np.dtype("S32")
+
+QUANTIZATIONS = ("none", "float16", "int8")
+# Corpus matrices kept per model; older ones are removed when a new one is written.
+KEEP_MATRICES = 4
+MATRIX_CHUNK = 65536
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def doc_key(model_name, text):
+    """Content address of one document for one model."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest().encode("ascii")
+
+
+class EmbeddingStore:
+    """On-disk, append-only embedding cache for a single model.
+
+    Layout of the store directory:
+      vectors.f32  raw float32 rows, memory-mapped on read
+      keys.npy     one content key per row (same order as vectors.f32)
+      meta.json    {"model", "dim", "count"}; count is the committed row count
+    """
+
+    def __init__(self, model_name, root=None):
+        self.model_name = model_name
+        slug = model_name.replace("/", "__")
+        self.root = root or os.path.dirname(cache_path("embeddings", slug, "meta.json"))
+        os.makedirs(self.root, exist_ok=True)
+        self._vectors_path = os.path.join(self.root, "vectors.f32")
+        self._keys_path = os.path.join(self.root, "keys.npy")
+        self._meta_path = os.path.join(self.root, "meta.json")
+        self._lock = threading.Lock()
+        self._loaded_count = -1
+        self._row_of = {}
+        self.dim = None
+        self.count = 0
+
+    @contextmanager
+    def _file_lock(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.root, ".lock"), "w") as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _read_meta(self):
+        if not os.path.exists(self._meta_path):
+            return {"model": self.model_name, "dim": None, "count": 0}
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _refresh(self):
+        """Reload the key index if another process appended rows."""
+        meta = self._read_meta()
+        if meta["count"] == self._loaded_count:
+            return
+        self.dim = meta["dim"]
+        self.count = meta["count"]
+        if self.count:
+            keys = np.load(self._keys_path, mmap_mode="r")[: self.count]
+            self._row_of = {k: i for i, k in enumerate(keys.tolist())}
+        else:
+            self._row_of = {}
+        self._loaded_count = self.count
+
+    def _vectors(self):
+        if not self.count:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+
+    def lookup(self, keys):
+        """Row number for each key, or -1 when the key is not cached."""
+        self._refresh()
+        return np.array([self._row_of.get(k, -1) for k in keys], dtype=np.int64)
+
+    def add(self, keys, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if not len(keys):
+            return
+        with self._file_lock():
+            self._refresh()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dim {vectors.shape[1]} does not match store dim {self.dim}.")
+
+            fresh = [i for i, k in enumerate(keys) if k not in self._row_of]
+            if not fresh:
+                return
+            new_keys = np.array([keys[i] for i in fresh], dtype=KEY_DTYPE)
+
+            # Vectors first, then keys, then meta: readers only trust rows < meta["count"],
+            # so a crash mid-append leaves a consistent (if slightly larger) store.
+            with open(self._vectors_path, "r+b" if os.path.exists(self._vectors_path) else "wb") as f:
+                f.seek(self.count * self.dim * 4)
+                f.write(vectors[fresh].tobytes())
+                f.truncate()
+
+            old_keys = np.load(self._keys_path)[: self.count] if self.count else np.empty(0, dtype=KEY_DTYPE)
+            tmp = self._keys_path + ".tmp.npy"
+            np.save(tmp, np.concatenate([old_keys, new_keys]))
+            os.replace(tmp, self._keys_path)
+
+            meta = {"model": self.model_name, "dim": self.dim, "count": self.count + len(fresh)}
+            tmp = self._meta_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp, self._meta_path)
+            self._refresh()
+
+    def encode(self, model, docs, batch_size=64):
+        """Embed `docs`, encoding only the ones not already in the store."""
+        with timed("embeddings.encode", items=len(docs)) as span:
+            keys = [doc_key(self.model_name, d) for d in docs]
+            rows = self._ensure(model, docs, keys, batch_size, span)
+        if not len(docs):
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.asarray(self._vectors()[rows], dtype=np.float32)
+
+    def _ensure(self, model, docs, keys, batch_size, span):
+        """Store rows for `keys`, encoding the docs that are missing first."""
+        rows = self.lookup(keys)
+        missing = np.flatnonzero(rows < 0)
+        span.hits, span.misses = len(docs) - len(missing), len(missing)
+
+        if len(missing):
+            # Duplicate docs share a key; encode each distinct one once.
+            todo = {}
+            for i in missing:
+                todo.setdefault(keys[i], docs[i])
+            encoded = model.encode(
+                list(todo.values()),
+                batch_size=batch_size,
+                show_progress_bar=False,
+                convert_to_numpy=True,
+            )
+            self.add(list(todo.keys()), encoded)
+            rows = self.lookup(keys)
+        return rows
+
+    def corpus_matrix(self, model, docs, quantize="none", batch_size=64):
+        """Normalized vectors for `docs` in order, as a read-only memory-mapped EmbeddingMatrix.
+
+        The matrix is written once per distinct corpus and then shared by
+        every process on the host through the page cache. A worker that
+        finds it on disk opens it without encoding or copying anything.
+        """
+        if quantize not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {quantize!r}; expected one of {QUANTIZATIONS}.")
+        keys = [doc_key(self.model_name, d) for d in docs]
+        digest = hashlib.blake2b(b"".join(keys), digest_size=16).hexdigest()
+        path = os.path.join(self.root, "matrices", f"{digest}-{len(keys)}")
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            with timed("embeddings.corpus_matrix", items=len(docs)) as span:
+                rows = self._ensure(model, docs, keys, batch_size, span)
+                self._write_matrix(path, rows)
+        return EmbeddingMatrix.open(path, quantize)
+
+    def _write_matrix(self, path, rows):
+        with self._file_lock():
+            if os.path.exists(os.path.join(path, "meta.json")):
+                return
+            tmp = f"{path}.tmp-{os.getpid()}"
+            os.makedirs(tmp, exist_ok=True)
+            dim = self.dim or 0
+            vectors = np.lib.format.open_memmap(os.path.join(tmp, "vectors.npy"), mode="w+", dtype=np.float32, shape=(len(rows), dim))
+            codes = np.lib.format.open_memmap(os.path.join(tmp, "codes-int8.npy"), mode="w+", dtype=np.int8, shape=(len(rows), dim))
+            halves = np.lib.format.open_memmap(os.path.join(tmp, "codes-float16.npy"), mode="w+", dtype=np.float16, shape=(len(rows), dim))
+            scales = np.empty(len(rows), dtype=np.float32)
+            source = self._vectors()
+            # Written in chunks so building the matrix never needs it all in memory.
+            for start in range(0, len(rows), MATRIX_CHUNK):
+                chunk = normalize_rows(source[rows[start:start + MATRIX_CHUNK]])
+                vectors[start:start + len(chunk)] = chunk
+                codes[start:start + len(chunk)], scales[start:start + len(chunk)] = quantize_int8(chunk)
+                halves[start:start + len(chunk)] = chunk.astype(np.float16)
+            for m in (vectors, codes, halves):
+                m.flush()
+            del vectors, codes, halves
+            np.save(os.path.join(tmp, "scales-int8.npy"), scales)
+            with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"model": self.model_name, "count": len(rows), "dim": dim}, f)
+            os.replace(tmp, path)
+            self._prune_matrices(keep=path)
+
+    def _prune_matrices(self, keep):
+        root = os.path.dirname(keep)
+        done = [os.path.join(root, d) for d in os.listdir(root) if "." not in d and d != os.path.basename(keep)]
+        done.sort(key=os.path.getmtime, reverse=True)
+        for old in done[KEEP_MATRICES - 1:]:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+class EmbeddingMatrix:
+    """A corpus's L2-normalized vectors, memory-mapped read-only, with optional quantized codes.
+
+    `codes` is None without quantization. For int8, `scales` holds the
+    per-row factor (vector ~= codes * scale); float16 codes need no scale.
+    """
+
+    def __init__(self, vectors, codes=None, scales=None):
+        self.vectors = vectors
+        self.codes = codes
+        self.scales = scales
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @classmethod
+    def open(cls, path, quantize="none"):
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        if quantize == "none":
+            return cls(vectors)
+        codes = np.load(os.path.join(path, f"codes-{quantize}.npy"), mmap_mode="r")
+        scales = np.load(os.path.join(path, "scales-int8.npy"), mmap_mode="r") if quantize == "int8" else None
+        return cls(vectors, codes, scales)
+
+
+def get_embedding_store(model_name):
+    """Process-wide store per model, so the key index is loaded once."""
+    with _STORES_LOCK:
+        if model_name not in _STORES:
+            _STORES[model_name] = EmbeddingStore(model_name)
+        return _STORES[model_name]
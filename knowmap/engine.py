@@ -0,0 +1,491 @@
+import logging
+import threading
+
+from knowmap.adjacency import CSRAdjacency
+from knowmap.analytics import load_or_compute_analytics
+from knowmap.config import EMBEDDING_QUANTIZATION, SENTENCE_MODEL_NAME
+from knowmap.demo_data import NODE_SENTENCES, TRIPLES
+from knowmap.embedding_store import get_embedding_store
+from knowmap.graph_store import GraphStore
+from knowmap.lexical import get_lexical_index, save_lexical_index
+from knowmap.lod import lod_view, summarize_graph
+from knowmap.models import get_sentence_model, has_package
+from knowmap.query_cache import QueryCache, normalize_query
+from knowmap.render import graph_fingerprint, graph_html
+from knowmap.search import HybridRetriever, adjacency_subgraph, build_tfidf, node_documents, semantic_search_batch
+from knowmap.similarity import MAX_NEIGHBORS, cross_domain_links, load_or_build_knn, top_neighbors
+from knowmap.snapshot import find_snapshot, read_header, snapshot_name, write_snapshot
+from knowmap.telemetry import record, timed
+from knowmap.triple_store import MAIN_STORE, TripleStore, load_store, save_store, stored_version
+from knowmap.vector_index import QuantizedIndex, build_index, recall_report
+
+log = logging.getLogger(__name__)
+
+# Above this many nodes the full view switches to clustered level-of-detail rendering.
+LOD_NODE_THRESHOLD = 500
+
+# Rendered subgraphs keep at most this many edges unless the caller asks for another cap.
+SUBGRAPH_EDGE_LIMIT = 5000
+
+# rank="importance" re-orders this many times k similarity matches by similarity x (0.5 + 0.5 x PageRank percentile).
+IMPORTANCE_POOL = 3
+
+
+class Corpus:
+    """Everything search needs for one graph version: node documents, model, vectors and indexes."""
+
+    def __init__(self, nodes, docs, model=None, embeddings=None, vectorizer=None, index=None, retriever=None, quantize="none"):
+        self.nodes = nodes
+        self.docs = docs
+        self.model = model
+        self.embeddings = embeddings
+        self.vectorizer = vectorizer
+        self.index = index
+        self.retriever = retriever
+        self.quantize = quantize
+
+    @property
+    def backend(self):
+        return "sentence-transformers" if self.model is not None else "tfidf"
+
+    def mode(self, hybrid):
+        """Everything besides the query that changes search results, for cache keys."""
+        if self.model is None:
+            return ("tfidf",)
+        return ("hybrid" if hybrid and self.retriever is not None else "dense", SENTENCE_MODEL_NAME, self.quantize)
+
+    def search_batch(self, queries, k, hybrid=True):
+        return semantic_search_batch(
+            queries, self.nodes, self.model, self.embeddings, self.vectorizer, top_k=k, index=self.index, retriever=self.retriever if hybrid else None
+        )
+
+
+class GraphEngine:
+    """Owns the knowledge graph and everything derived from it, for any number of sessions.
+
+    Derived state (search corpus, adjacency, clusters, similarity graph) is
+    built on first use for the current graph version and dropped when the
+    graph changes. Search results and rendered pages go through version-
+    scoped LRU caches. On a cold start the engine restores the newest
+    matching snapshot (knowmap.snapshot): search, relation queries and the
+    clustered view are served from its memory-mapped parts at once, while
+    the networkx graph is rebuilt from its triples in the background. The Streamlit pages use one engine per process, or
+    talk to a shared one through knowmap.service. Every public method takes
+    and returns plain JSON-friendly values so it can be called over RPC.
+    """
+
+    def __init__(self, use_sentence_model=None):
+        self.store = GraphStore(NODE_SENTENCES)
+        self.use_sentence_model = has_package("sentence_transformers") if use_sentence_model is None else use_sentence_model
+        self.results = QueryCache(name="query")
+        self.renders = QueryCache(max_entries=64, name="render")
+        self._derived = {}
+        # `_lock` guards `_derived` and is only held briefly; `_graph_lock` is held while the graph is read or changed,
+        # and one lock per derived key makes concurrent requests for the same cold value wait for a single build.
+        self._lock = threading.RLock()
+        self._graph_lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._building = {}
+        # Cleared while a restored snapshot's triples are loaded into the graph; `_pending_version` is their version.
+        self._graph_ready = threading.Event()
+        self._graph_ready.set()
+        self._pending_version = None
+        # (version, "snapshot", name) keys of snapshots being written in the background.
+        self._snapshot_writes = set()
+        # (version, name) of the warm-ups already started by _warm().
+        self._warming = set()
+
+    @property
+    def version(self):
+        return self._pending_version or self.store.version
+
+    def _read_graph(self, read):
+        """`read(G)` on the current graph, holding the graph lock so refresh() cannot change it midway.
+
+        refresh() updates the graph in place, so `read` must copy out what
+        it needs (a subgraph, a view) rather than return the graph itself.
+        """
+        self._graph_ready.wait()
+        with self._graph_lock:
+            return read(self.store.graph)
+
+    def refresh(self):
+        """Bring the graph in line with the main triple store (or the demo triples).
+
+        A fresh engine restores a snapshot of that data when there is one.
+        Without a main store, the newest snapshot of any data is restored
+        and its triples become the main store.
+        """
+        stored = stored_version(MAIN_STORE)
+        source = stored or "demo"
+        added = removed = 0
+        with self._refresh_lock:
+            if not self._graph_ready.is_set():
+                return {"version": self.version, "added": 0, "removed": 0}
+            if self.store.source is None:
+                snap = find_snapshot(stored)
+                if snap is not None:
+                    if stored is None and snap.source != "demo":
+                        save_store(MAIN_STORE, snap.store)
+                    self._restore(snap)
+                    return {"version": self.version, "added": len(snap.store), "removed": 0}
+            if self.store.source != source:
+                triples = load_store(MAIN_STORE) if source != "demo" else TripleStore.from_triples(TRIPLES)
+                with self._graph_lock:
+                    added, removed = self.store.sync(triples.iter_triples(), source=source)
+        return {"version": self.version, "added": added, "removed": removed}
+
+    def _restore(self, snap):
+        with timed("kg.restore_snapshot", items=len(snap.nodes)):
+            version = snap.version
+            derived = {(version, "adjacency"): snap.adjacency, (version, "summary"): snap.summary}
+            # The loaded snapshot is this version's snapshot, so snapshot() does not write it again.
+            derived[(version, "snapshot", snapshot_name(version, snap.backend, snap.quantize))] = dict(snap.header, path=snap.path)
+            corpus = self._snapshot_corpus(snap)
+            if corpus is not None:
+                derived[(version, "prepare_corpus", corpus.quantize)] = corpus
+            with self._lock:
+                self._derived = derived
+                self._pending_version = version
+                self._graph_ready.clear()
+        threading.Thread(target=self._load_snapshot_graph, args=(snap,), name="knowmap-snapshot-graph", daemon=True).start()
+
+    def _snapshot_corpus(self, snap):
+        """The search corpus stored in `snap`, or None when it was built with a different backend."""
+        if snap.backend == "tfidf":
+            return None if self.use_sentence_model else Corpus(snap.nodes, snap.docs, embeddings=snap.tfidf, vectorizer=snap.vectorizer)
+        if not self.use_sentence_model:
+            return None
+        try:
+            model = get_sentence_model(SENTENCE_MODEL_NAME)
+        except Exception:
+            log.exception("Failed to load Sentence Transformer model for the snapshot.")
+            return None
+        retriever = None if snap.lexical is None else HybridRetriever(snap.lexical, snap.nodes, snap.vectors, index=snap.index)
+        return Corpus(snap.nodes, snap.docs, model, snap.vectors, None, snap.index, retriever, snap.quantize)
+
+    def _load_snapshot_graph(self, snap):
+        try:
+            with self._graph_lock:
+                self.store.sync(snap.store.iter_triples(), source=snap.source)
+            if self.store.version != snap.version:
+                log.warning("Snapshot %s rebuilt as graph version %s.", snap.version, self.store.version)
+        finally:
+            self._pending_version = None
+            self._graph_ready.set()
+
+    def _derive(self, key, build):
+        """The value `build()` returns for the current graph version, built once and kept until the graph changes.
+
+        The engine lock is only held to look the value up and to publish
+        it, so a slow cold build never holds up requests for other values.
+        """
+        version = self.version
+        full_key = (version,) + key
+        with self._lock:
+            hit = full_key in self._derived
+            value = self._derived.get(full_key)
+            if not hit:
+                building = self._building.setdefault(full_key, threading.Lock())
+        record(f"cache.kg.{key[0]}", hits=int(hit), misses=int(not hit))
+        if hit:
+            return value
+        with building:
+            with self._lock:
+                if full_key in self._derived:
+                    return self._derived[full_key]
+            try:
+                value = build()
+                with self._lock:
+                    # A value built while the graph changed is returned but not kept.
+                    if self.version == version:
+                        for stale in [k for k in self._derived if k[0] != version]:
+                            del self._derived[stale]
+                        self._derived[full_key] = value
+            finally:
+                # Only after publishing, so a request arriving in between finds the value rather than building it again.
+                with self._lock:
+                    self._building.pop(full_key, None)
+            return value
+
+    def corpus(self, quantize=None):
+        quantize = quantize or EMBEDDING_QUANTIZATION
+        if not self.use_sentence_model:
+            quantize = "none"
+        return self._derive(("prepare_corpus", quantize), lambda: self._build_corpus(quantize))
+
+    def _build_corpus(self, quantize):
+        with timed("kg.prepare_corpus") as span:
+            nodes, docs = self._read_graph(node_documents)
+            span.items = len(nodes)
+            if self.use_sentence_model:
+                try:
+                    model = get_sentence_model(SENTENCE_MODEL_NAME)
+                    # Only node docs not seen before are encoded. The normalized corpus matrix is a
+                    # read-only memory map shared by every process on the host, not a private copy.
+                    matrix = get_embedding_store(SENTENCE_MODEL_NAME).corpus_matrix(model, docs, quantize=quantize)
+                    if matrix.codes is not None:
+                        index = QuantizedIndex(matrix.vectors, matrix.codes, matrix.scales)
+                    else:
+                        index = build_index(matrix.vectors, normalized=True)
+                    # The BM25 index is persistent and only re-indexes node docs that changed.
+                    lexical = get_lexical_index()
+                    if lexical.sync(dict(zip(nodes, docs))):
+                        save_lexical_index(lexical)
+                    retriever = HybridRetriever(lexical, nodes, matrix.vectors, index=index)
+                    return Corpus(nodes, docs, model, matrix.vectors, None, index, retriever, quantize)
+                except Exception:
+                    log.exception("Failed to load Sentence Transformer model. Falling back to TF-IDF.")
+            vectorizer, embeddings = build_tfidf(docs)
+            return Corpus(nodes, docs, embeddings=embeddings, vectorizer=vectorizer)
+
+    def adjacency(self):
+        return self._derive(("adjacency",), lambda: self._read_graph(CSRAdjacency))
+
+    def summary(self):
+        return self._derive(("summary",), lambda: self._read_graph(summarize_graph))
+
+    def analytics(self):
+        # Computed once per graph version by whichever process gets there first, then read from disk.
+        return self._derive(("analytics",), lambda: load_or_compute_analytics(self.adjacency(), self.version))
+
+    def _warm_up(self):
+        # One after the other, so the two all-pairs passes do not compete for the CPU.
+        self.analytics()
+        self.knn()
+
+    def _warm(self, name, build):
+        """Run `build()` once per graph version on a background thread, so a request later finds its result derived.
+
+        A request that arrives while it is still running waits on the same
+        build instead of starting another.
+        """
+        key = (self.version, name)
+        with self._lock:
+            if key in self._warming:
+                return
+            self._warming = {k for k in self._warming if k[0] == key[0]} | {key}
+
+        def run():
+            try:
+                build()
+            except Exception:
+                log.exception("Failed to build %s for graph version %s.", name, key[0])
+
+        threading.Thread(target=run, name=f"knowmap-warm-{name}", daemon=True).start()
+
+    def info(self, quantize=None):
+        """What the UI needs to lay itself out: sizes, search backend, relations and clusters."""
+        corpus = self.corpus(quantize)
+        adjacency = self.adjacency()
+        lod = len(adjacency) > LOD_NODE_THRESHOLD
+        self._warm("derived", self._warm_up)
+        return {
+            "version": self.version,
+            "nodes": len(adjacency),
+            "edges": len(adjacency.sources),
+            "search_backend": corpus.backend,
+            "sentence_model_available": self.use_sentence_model,
+            "hybrid_available": corpus.retriever is not None,
+            "index": None if corpus.index is None else {"kind": corpus.index.kind, "size": len(corpus.index)},
+            "predicates": adjacency.predicates,
+            "lod": lod,
+            "clusters": self.summary().labels if lod else [],
+        }
+
+    def search(self, query, k=5, hybrid=True, quantize=None, rank="similarity"):
+        """Top-k [node, score] matches for one query."""
+        return self.search_batch([query], k, hybrid, quantize, rank)[0]
+
+    def search_batch(self, queries, k=5, hybrid=True, quantize=None, rank="similarity"):
+        """Matches for every query. Queries already answered for this graph version come from the cache.
+
+        rank="importance" draws IMPORTANCE_POOL x k matches and puts central
+        concepts first; the scores stay the similarities.
+        """
+        if rank == "importance":
+            analytics = self.analytics()
+
+            def boosted(match):
+                return match[1] * (0.5 + 0.5 * (analytics.importance(match[0]) or 0.0))
+
+            pools = self.search_batch(queries, k * IMPORTANCE_POOL, hybrid, quantize)
+            return [sorted(pool, key=boosted, reverse=True)[:k] for pool in pools]
+        corpus = self.corpus(quantize)
+        version, mode = self.version, corpus.mode(hybrid)
+        keys = [("matches", normalize_query(q), k, mode) for q in queries]
+        results = [self.results.get(version, key) if str(q).strip() else [] for q, key in zip(queries, keys)]
+        todo = [i for i, r in enumerate(results) if r is None]
+        if todo:
+            fresh = corpus.search_batch([queries[i] for i in todo], k, hybrid)
+            for i, matches in zip(todo, fresh):
+                results[i] = [[n, float(s)] for n, s in matches]
+                self.results.put(version, keys[i], results[i])
+        return results
+
+    def _render(self, G, height):
+        # graph_html records its own "render.graph_html" span.
+        return self.renders.get_or_compute(self.version, (graph_fingerprint(G), height), lambda: graph_html(G, height))[1]
+
+    def subgraph_html(self, seeds, depth=1, max_nodes=None, predicates=None, height=400, direction="both", max_edges=SUBGRAPH_EDGE_LIMIT):
+        """Rendered subgraph around `seeds`, expanded over the CSR adjacency.
+
+        The edges are sliced from the adjacency too, capped at `max_edges`,
+        so the networkx graph is never copied. Only the expanded node list
+        is kept in the query cache; the page itself lives in the smaller
+        render cache.
+        """
+        predicates = tuple(sorted(predicates or ()))
+        adjacency = self.adjacency()
+        key = ("subgraph", tuple(seeds), depth, max_nodes, predicates, direction)
+        nodes = self.results.get_or_compute(
+            self.version, key, lambda: adjacency.expand_nodes(seeds, depth, max_nodes=max_nodes, predicates=predicates, direction=direction)
+        )[1]
+
+        def build():
+            # `nodes` can come from a newer graph version than `adjacency` when the graph changes midway.
+            ids = [adjacency.index[n] for n in nodes if n in adjacency.index]
+            sub = adjacency_subgraph(adjacency, ids, self.store.node_attributes, predicates=predicates, max_edges=max_edges)
+            return graph_html(sub, height)
+
+        return self.renders.get_or_compute(self.version, ("subgraph", tuple(nodes), predicates, max_edges, height), build)[1]
+
+    def related(self, node, predicates=None, depth=1, direction="in", limit=500):
+        """[concept, hops] for everything linked to `node` by `predicates` within `depth` hops, or None for an unknown node.
+
+        direction="in" follows edges backwards (who `influences` the node),
+        "out" forwards (what the node `influences`), "both" either way.
+        Answered from the per-predicate indexes without scanning other edges.
+        """
+        adjacency = self.adjacency()
+        if node not in adjacency.index:
+            return None
+        key = ("related", node, tuple(sorted(predicates or ())), depth, direction, limit)
+
+        def build():
+            with timed("kg.related") as span:
+                found = adjacency.reach([node], depth, max_nodes=limit + 1, predicates=predicates, direction=direction)
+                span.items = len(found)
+            return [[n, hops] for n, hops in found]
+
+        return self.results.get_or_compute(self.version, key, build)[1]
+
+    def graph_html(self, expanded=(), height=600):
+        """Rendered full graph; above LOD_NODE_THRESHOLD nodes, the clustered view with `expanded` clusters opened."""
+        if len(self.adjacency()) > LOD_NODE_THRESHOLD:
+            # With every cluster collapsed the view comes from the summary alone, so it never waits for a restored graph.
+            summary = self.summary()
+            if not expanded:
+                return self._render(lod_view(None, summary), height)
+            return self._render(self._read_graph(lambda G: lod_view(G, summary, expanded)), height)
+        return self._render(self._read_graph(lambda G: G.copy()), height)
+
+    def importance(self, nodes):
+        """PageRank percentile per node (None for unknown nodes)."""
+        analytics = self.analytics()
+        return [analytics.importance(n) for n in nodes]
+
+    def top_concepts(self, by="pagerank", limit=20):
+        """The most central concepts by "pagerank", "betweenness" or "degree", as records."""
+        if by not in ("pagerank", "betweenness", "degree"):
+            raise ValueError(f"Unknown centrality {by!r}")
+        return self.analytics().top(by, limit)
+
+    def connect(self, source, target):
+        """How two concepts are linked, ignoring edge direction, or None if they are not connected.
+
+        Returns the analytics route ({"path", "hops", "lower_bound", "exact"})
+        plus "steps": one [subject, predicate, object] triple per hop, in the
+        direction it is stored.
+        """
+        with timed("kg.connect"):
+            route = self.analytics().connect(source, target, adjacency=self.adjacency())
+        if route is None:
+            return None
+
+        def steps(G):
+            found = []
+            for u, v in zip(route["path"], route["path"][1:]):
+                if G.has_edge(u, v):
+                    found.append([u, next(iter(G[u][v])), v])
+                elif G.has_edge(v, u):
+                    found.append([v, next(iter(G[v][u])), u])
+            return found
+
+        return dict(route, steps=self._read_graph(steps))
+
+    def knn(self, quantize=None):
+        """Similarity graph of the node embeddings with MAX_NEIGHBORS neighbours per node, built once per graph version."""
+        corpus = self.corpus(quantize)
+        mode = "st" if corpus.model is not None else "tfidf"
+        # Both the sentence-embedding matrix and TF-IDF rows are already L2-normalized.
+        return self._derive(("knn", mode), lambda: load_or_build_knn(corpus.embeddings, self.version, mode, MAX_NEIGHBORS, normalized=True))
+
+    def suggested_links(self, n_neighbors=10, min_score=0.5, limit=100, quantize=None):
+        """Similar but unlinked concept pairs from different clusters, as records.
+
+        `n_neighbors` (at most MAX_NEIGHBORS) is sliced from the shared kNN
+        graph, so changing it never starts another all-pairs pass.
+        """
+        corpus = self.corpus(quantize)
+        knn = top_neighbors(self.knn(quantize), n_neighbors)
+        summary = self.summary()
+        domains = [summary.membership[n] for n in corpus.nodes]
+        links = cross_domain_links(knn, corpus.nodes, domains, self.adjacency(), min_score=min_score, limit=limit)
+        return [
+            {"source": s, "target": t, "similarity": float(score), "source_domain": summary.labels[a], "target_domain": summary.labels[b]}
+            for s, t, score, a, b in links.itertuples(index=False)
+        ]
+
+    def snapshot(self, quantize=None, wait=False):
+        """Header of the current graph version's snapshot, or None while it is still being written.
+
+        A missing snapshot is written once per version on a background
+        thread, so request paths never wait for it; wait=True writes it
+        inline instead (service warm-up, the snapshot CLI).
+        """
+        corpus = self.corpus(quantize)
+        version = self.version
+        full_key = (version, "snapshot", snapshot_name(version, corpus.backend, corpus.quantize))
+        with self._lock:
+            header = self._derived.get(full_key)
+            if header is not None or (not wait and full_key in self._snapshot_writes):
+                return header
+            self._snapshot_writes.add(full_key)
+        if wait:
+            return self._write_snapshot(corpus, full_key)
+
+        def write():
+            try:
+                self._write_snapshot(corpus, full_key)
+            except Exception:
+                log.exception("Failed to write snapshot of graph version %s.", version)
+
+        threading.Thread(target=write, name="knowmap-snapshot-write", daemon=True).start()
+        return None
+
+    def _write_snapshot(self, corpus, full_key):
+        version = full_key[0]
+        try:
+            self._graph_ready.wait()
+            adjacency, summary = self.adjacency(), self.summary()
+            with self._graph_lock:
+                # Copied under the graph lock, so refresh() cannot change the triples midway; None if the graph moved on.
+                if self.version != version:
+                    return None
+                store = TripleStore.from_triples(self.store.triples.elements())
+                store.version = self.store.source
+            with timed("kg.write_snapshot", items=len(adjacency)):
+                path = write_snapshot(version, store.version, store, corpus, adjacency, summary)
+            header = dict(read_header(path), path=path)
+            with self._lock:
+                if self.version == version:
+                    self._derived[full_key] = header
+            return header
+        finally:
+            with self._lock:
+                self._snapshot_writes.discard(full_key)
+
+    def recall(self, k=10, quantize=None):
+        index = self.corpus(quantize).index
+        return None if index is None else recall_report(index, k=k)
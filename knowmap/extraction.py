@@ -0,0 +1,243 @@
+import atexit
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from knowmap.postprocess import dedup_mentions
+from knowmap.telemetry import instrument, record
+
+# Components that produce doc.ents; everything else can be skipped when
+# only entities are needed.
+ENTITY_PIPES = ("ner", "entity_ruler")
+# Components the relation extractor reads: entities, sentence boundaries, dependency arcs, POS tags and lemmas.
+RELATION_PIPES = ENTITY_PIPES + ("parser", "senter", "sentencizer", "tagger", "morphologizer", "attribute_ruler", "lemmatizer")
+
+SUBJECT_DEPS = frozenset({"nsubj", "nsubjpass", "csubj"})
+OBJECT_DEPS = frozenset({"dobj", "obj", "dative", "oprd", "attr"})
+# Left children folded into an argument's text: "quantum mechanics", "Newton's laws", "two stars".
+MODIFIER_DEPS = frozenset({"compound", "amod", "nummod", "nmod", "poss"})
+
+
+def pipeline_exclusions(nlp, keep=RELATION_PIPES):
+    """Names of pipeline components that produce nothing in `keep` or that `keep` listens to."""
+    keep = set(keep)
+    for shared in ("tok2vec", "transformer"):
+        if shared in nlp.pipe_names:
+            # Keep a shared embedding layer only if a kept component listens to it.
+            listeners = getattr(nlp.get_pipe(shared), "listening_components", [])
+            if keep & set(listeners):
+                keep.add(shared)
+    return [name for name in nlp.pipe_names if name not in keep]
+
+
+def _argument(token, ent_tokens):
+    """Text of the noun phrase headed by `token`: its entity, or the token with its left modifiers."""
+    ent = ent_tokens.get(token.i)
+    if ent is not None:
+        return ent.text
+    if token.pos_ == "PRON":
+        return None
+    start = min([c.left_edge.i for c in token.lefts if c.dep_ in MODIFIER_DEPS], default=token.i)
+    return token.doc[start:token.i + 1].text
+
+
+def _verb_triples(verb, ent_tokens):
+    """(subject, predicate, object) triples of one verb, from its dependency children."""
+    children = list(verb.children)
+    subjects = [c for c in children if c.dep_ in SUBJECT_DEPS]
+    if not subjects and verb.dep_ == "conj":
+        # "Watson discovered DNA and described its structure": conjoined verbs share the subject.
+        subjects = [c for c in verb.head.children if c.dep_ in SUBJECT_DEPS]
+    if not subjects:
+        return []
+    lemma = (verb.lemma_ or verb.text).lower()
+    base = f"not_{lemma}" if any(c.dep_ == "neg" for c in children) else lemma
+    passive = any(s.dep_ == "nsubjpass" for s in subjects)
+
+    # (object token, predicate, subject and object swapped)
+    objects = []
+    for c in children:
+        if c.dep_ in OBJECT_DEPS:
+            objects.append((c, "is_a" if c.dep_ == "attr" and lemma == "be" else base, False))
+        elif c.dep_ == "agent":
+            objects.extend((p, base, True) for p in c.children if p.dep_ == "pobj")
+        elif c.dep_ == "prep":
+            objects.extend((p, f"{base}_{c.lower_}", False) for p in c.children if p.dep_ == "pobj")
+        elif c.dep_ == "acomp":
+            # "Astrophysics is related to astronomy"
+            objects.extend((p, f"{c.lemma_.lower()}_{prep.lower_}", False) for prep in c.children if prep.dep_ == "prep" for p in prep.children if p.dep_ == "pobj")
+
+    triples = []
+    for subject in subjects:
+        for s in (subject, *subject.conjuncts):
+            s_text = _argument(s, ent_tokens)
+            for obj, predicate, swap in objects:
+                for o in (obj, *obj.conjuncts):
+                    o_text = _argument(o, ent_tokens)
+                    if s_text and o_text and s_text != o_text:
+                        triples.append((o_text, predicate, s_text) if swap and passive else (s_text, predicate, o_text))
+    return triples
+
+
+def doc_relations(doc):
+    """Subject-verb-object triples of a parsed Doc, sentence by sentence.
+
+    Returns (subject, predicate, object, sent_start, sent_end) tuples, with
+    character offsets of the sentence each triple came from. Docs without
+    a dependency parse yield no triples.
+    """
+    if not doc.has_annotation("DEP"):
+        return []
+    ent_tokens = {i: ent for ent in doc.ents for i in range(ent.start, ent.end)}
+    relations = []
+    for sent in doc.sents:
+        for token in sent:
+            if token.pos_ in ("VERB", "AUX") or token.dep_ == "ROOT":
+                relations.extend((s, p, o, sent.start_char, sent.end_char) for s, p, o in _verb_triples(token, ent_tokens))
+    return relations
+
+
+def doc_entities_and_triples(doc):
+    """Entities and subject-verb-object triples for one processed spaCy Doc."""
+    entities = [(ent.text, ent.label_) for ent in doc.ents]
+    return entities, [(s, p, o) for s, p, o, _, _ in doc_relations(doc)]
+
+
+def extract_entities_and_triples(nlp, text):
+    """Entities (nodes) and dependency-parse triples of one text."""
+    if not nlp:
+        return [], []
+    return doc_entities_and_triples(nlp(text))
+
+
+def _extract_columns(nlp, texts, row_offset=0, batch_size=256):
+    """Raw entity and triple mention columns for `texts`, plus what they cost to produce."""
+    cols = {name: [] for name in ("ent_text", "ent_label", "ent_row", "s", "p", "o", "row", "sent_start", "sent_end")}
+    n_tokens = n_sents = 0
+    # Thread CPU time: the in-process path shares its process with the UI's other threads.
+    cpu, wall = time.thread_time(), time.perf_counter()
+    disable = pipeline_exclusions(nlp)
+    for row, doc in enumerate(nlp.pipe(texts, batch_size=batch_size, disable=disable), start=row_offset):
+        n_tokens += len(doc)
+        for ent in doc.ents:
+            cols["ent_text"].append(ent.text)
+            cols["ent_label"].append(ent.label_)
+            cols["ent_row"].append(row)
+        if doc.has_annotation("DEP"):
+            n_sents += sum(1 for _ in doc.sents)
+        for s, p, o, start, end in doc_relations(doc):
+            cols["s"].append(s)
+            cols["p"].append(p)
+            cols["o"].append(o)
+            cols["row"].append(row)
+            cols["sent_start"].append(start)
+            cols["sent_end"].append(end)
+    cost = {
+        "docs": len(texts),
+        "chars": sum(len(t) for t in texts),
+        "tokens": n_tokens,
+        "sentences": n_sents,
+        "cpu_seconds": time.thread_time() - cpu,
+        "worker_seconds": time.perf_counter() - wall,
+    }
+    return cols, cost
+
+
+_WORKER_NLP = None
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _init_worker(nlp):
+    global _WORKER_NLP
+    _WORKER_NLP = nlp
+
+
+def _worker_extract(texts, row_offset, batch_size):
+    return _extract_columns(_WORKER_NLP, texts, row_offset, batch_size)
+
+
+def process_pool(nlp, n_process):
+    """A pool of `n_process` workers that each hold `nlp`, created once and reused for every chunk.
+
+    Workers receive only texts and send back plain columns, never Doc
+    objects, so little crosses the process boundary. They are spawned
+    rather than forked, because the caller is usually a threaded server,
+    and all pools are shut down when the process exits.
+    """
+    key = (id(nlp), n_process)
+    with _POOLS_LOCK:
+        # The pool keeps a reference to `nlp`, so its id cannot be reused by another pipeline while the pool exists.
+        if key not in _POOLS:
+            pool = ProcessPoolExecutor(n_process, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker, initargs=(nlp,))
+            _POOLS[key] = (nlp, pool)
+        return _POOLS[key][1]
+
+
+@atexit.register
+def _shutdown_pools():
+    with _POOLS_LOCK:
+        for _, pool in _POOLS.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _POOLS.clear()
+
+
+@instrument("extraction.chunk", items=lambda nlp, texts, *args, **kwargs: len(texts))
+def extract_chunk(nlp, texts, batch_size=256, n_process=1):
+    """Deduplicated, columnar entities and triples for one chunk of texts (a job checkpoint unit).
+
+    With n_process > 1 the chunk is split into contiguous slices that run
+    through nlp.pipe on a process pool. Mentions are gathered into flat
+    columns tagged with their row in the chunk (and, for triples, the
+    sentence offsets); normalisation and dedup then run over whole columns.
+    The result's "cost" holds document, token and sentence counts with
+    wall and CPU seconds, for extraction_cost().
+    """
+    start = time.perf_counter()
+    if n_process > 1 and len(texts) > 1:
+        bounds = np.linspace(0, len(texts), min(n_process, len(texts)) + 1).astype(int)
+        pool = process_pool(nlp, n_process)
+        futures = [pool.submit(_worker_extract, texts[a:b], int(a), batch_size) for a, b in zip(bounds, bounds[1:])]
+        parts = [f.result() for f in futures]
+    else:
+        parts = [_extract_columns(nlp, texts, 0, batch_size)]
+
+    cols = {name: [v for part, _ in parts for v in part[name]] for name in parts[0][0]}
+    cost = {name: sum(c[name] for _, c in parts) for name in parts[0][1]}
+    cost["wall_seconds"] = time.perf_counter() - start
+    cost["workers"] = len(parts)
+    record("extraction.doc_cpu", seconds=cost["cpu_seconds"], items=cost["docs"])
+
+    result = dedup_mentions(
+        len(texts),
+        (cols["ent_text"], cols["ent_label"], cols["ent_row"]),
+        (cols["s"], cols["p"], cols["o"], cols["row"], cols["sent_start"], cols["sent_end"]),
+    )
+    result["cost"] = cost
+    return result
+
+
+def extraction_cost(chunks):
+    """Totals and per-document cost over chunk results, for sizing an extraction fleet.
+
+    CPU time is summed across worker processes, so `docs_per_core_second`
+    is what one core sustains and `cores_for(docs, seconds)` follows from it.
+    """
+    costs = [c["cost"] for c in chunks if "cost" in c]
+    total = {name: sum(c[name] for c in costs) for name in ("docs", "chars", "tokens", "sentences", "cpu_seconds", "wall_seconds")}
+    docs, cpu = total["docs"], total["cpu_seconds"]
+    total["triples"] = int(sum(c["triples"]["count"].sum() for c in chunks))
+    total["cpu_ms_per_doc"] = 1000 * cpu / docs if docs else 0.0
+    total["cpu_ms_per_1k_chars"] = 1000 * cpu / (total["chars"] / 1000) if total["chars"] else 0.0
+    total["docs_per_core_second"] = docs / cpu if cpu else 0.0
+    total["docs_per_second"] = docs / total["wall_seconds"] if total["wall_seconds"] else 0.0
+    total["triples_per_doc"] = total["triples"] / docs if docs else 0.0
+    return total
+
+
+def cores_for(docs, seconds, cost):
+    """Worker cores needed to extract `docs` documents in `seconds`, at the measured CPU cost per document."""
+    return docs * cost["cpu_ms_per_doc"] / 1000 / seconds if seconds else float("inf")
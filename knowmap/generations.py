@@ -0,0 +1,59 @@
+"""Directories that are rewritten in place while other processes read them.
+
+A saved directory holds generations (gen-<time>-<pid>) plus a CURRENT file
+naming the complete one. A writer fills a new generation and then
+replaces CURRENT, the single atomic step that publishes it. Readers
+resolve CURRENT once and read one complete generation, so they never see
+a mix of old and new files. The previous generation is kept for readers
+that are still opening it; older ones are deleted.
+"""
+
+import os
+import shutil
+import time
+
+CURRENT = "CURRENT"
+
+
+def new_generation(root):
+    """Create and return an empty generation directory under `root`."""
+    path = os.path.join(root, f"gen-{time.time_ns():x}-{os.getpid()}")
+    os.makedirs(path)
+    return path
+
+
+def publish(generation):
+    """Make `generation` the current one of its directory and delete all but the previous one."""
+    root, name = os.path.split(generation)
+    previous = os.path.basename(resolve(root))
+    tmp = os.path.join(root, f"{CURRENT}.tmp-{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(tmp, os.path.join(root, CURRENT))
+    for old in os.listdir(root):
+        if old.startswith("gen-") and old not in (name, previous):
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+
+
+def resolve(path):
+    """Directory of the current generation at `path` (directories saved without generations resolve to `path` itself)."""
+    try:
+        with open(os.path.join(path, CURRENT), "r", encoding="utf-8") as f:
+            return os.path.join(path, f.read().strip())
+    except OSError:
+        return path
+
+
+def read_current(path, read):
+    """`read(generation)` on the current generation at `path`.
+
+    Saves that land meanwhile may delete the generation being read; the
+    read is then retried on the new current one.
+    """
+    while True:
+        generation = resolve(path)
+        try:
+            return read(generation)
+        except FileNotFoundError:
+            if resolve(path) == generation:
+                raise
@@ -0,0 +1,118 @@
+import hashlib
+import threading
+from collections import Counter
+
+import networkx as nx
+
+from knowmap.telemetry import instrument, timed
+
+_MASK = (1 << 64) - 1
+
+
+@instrument("graph.build")
+def build_graph(triples, sentences_map):
+    """Directed multigraph with one edge per distinct (subject, predicate, object), keyed by predicate.
+
+    Direction and every predicate between two concepts are kept, so
+    "A influences B" and "B cites A" are two separate edges.
+    """
+    G = nx.MultiDiGraph()
+    for s, p, o in triples:
+        if not G.has_node(s):
+            G.add_node(s, sentences=[sentences_map.get(s, s)])
+        if not G.has_node(o):
+            G.add_node(o, sentences=[sentences_map.get(o, o)])
+        G.add_edge(s, o, key=p, predicate=p)
+    return G
+
+
+def _triple_hash(triple):
+    h = hashlib.blake2b("\x1f".join(map(str, triple)).encode("utf-8"), digest_size=8)
+    return int.from_bytes(h.digest(), "little")
+
+
+class GraphStore:
+    """A knowledge graph that is kept up to date by applying triple diffs.
+
+    The graph matches what `build_graph` would produce for the current
+    triples: an edge (s, o, key=p) exists while at least one copy of the
+    triple (s, p, o) is held. The version is an order-independent
+    hash of the triple multiset, so it can be updated incrementally and the
+    same data always gets the same version.
+    """
+
+    def __init__(self, sentences_map=None):
+        self.sentences_map = sentences_map or {}
+        self.graph = nx.MultiDiGraph()
+        self.triples = Counter()
+        self._node_refs = Counter()
+        self._digest = 0
+        # Identifier of the data last passed to sync(), e.g. a triple store version.
+        self.source = None
+        self._lock = threading.RLock()
+
+    @property
+    def version(self):
+        return f"{self._digest:016x}-{sum(self.triples.values())}"
+
+    def __len__(self):
+        return sum(self.triples.values())
+
+    def node_attributes(self, node):
+        """What a node of the graph carries, known without looking at the graph."""
+        return {"sentences": [self.sentences_map.get(node, node)]}
+
+    def _add(self, triple):
+        s, p, o = triple
+        G = self.graph
+        for n in (s, o):
+            if not self._node_refs[n]:
+                G.add_node(n, **self.node_attributes(n))
+            self._node_refs[n] += 1
+        if not G.has_edge(s, o, key=p):
+            G.add_edge(s, o, key=p, predicate=p)
+        self._digest = (self._digest + _triple_hash(triple)) & _MASK
+
+    def _remove(self, triple):
+        s, p, o = triple
+        G = self.graph
+        # apply() has already dropped this copy from self.triples.
+        if not self.triples[triple]:
+            G.remove_edge(s, o, key=p)
+        for n in (s, o):
+            self._node_refs[n] -= 1
+            if not self._node_refs[n]:
+                del self._node_refs[n]
+                G.remove_node(n)
+        self._digest = (self._digest - _triple_hash(triple)) & _MASK
+
+    def apply(self, added=(), removed=()):
+        """Add and remove individual triples without touching the rest of the graph."""
+        with self._lock:
+            for t in removed:
+                t = tuple(t)
+                if self.triples[t]:
+                    self.triples[t] -= 1
+                    if not self.triples[t]:
+                        del self.triples[t]
+                    self._remove(t)
+            for t in added:
+                t = tuple(t)
+                self.triples[t] += 1
+                self._add(t)
+        return self.version
+
+    def sync(self, triples, source=None):
+        """Make the store hold exactly `triples`, applying only the difference.
+
+        Returns (added, removed) counts.
+        """
+        with timed("graph.sync") as span:
+            target = Counter(tuple(t) for t in triples)
+            with self._lock:
+                removed = list((self.triples - target).elements())
+                added = list((target - self.triples).elements())
+                self.apply(added=added, removed=removed)
+                self.source = source
+            span.items = len(added) + len(removed)
+        return len(added), len(removed)
@@ -0,0 +1,265 @@
+import os
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from knowmap.config import cache_path
+from knowmap.telemetry import record
+
+# Rows read up front to pick the starting column dtypes.
+SAMPLE_ROWS = 10000
+CHUNK_ROWS = 100000
+# Ingested datasets nobody has read for this long are deleted after each upload.
+DATASET_MAX_AGE = 7 * 24 * 3600
+
+# What a column becomes when a later chunk has values its dtype cannot hold.
+WIDER = {"boolean": "string", "Int64": "float64", "float64": "string"}
+_BOOLEANS = {"true": True, "false": False}
+_ARROW_TYPES = {"boolean": pa.bool_(), "Int64": pa.int64(), "float64": pa.float64(), "string": pa.string()}
+# Read written columns back as nullable pandas dtypes, so integers with gaps stay integers when re-cast.
+_NULLABLE = {pa.int64(): pd.Int64Dtype(), pa.bool_(): pd.BooleanDtype()}
+
+
+def infer_dtypes(sample):
+    """Starting dtypes per column, from a sample; ingest_csv widens them when later rows do not fit."""
+    dtypes = {}
+    for col, dtype in sample.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype):
+            dtypes[col] = "boolean"
+        elif pd.api.types.is_integer_dtype(dtype):
+            dtypes[col] = "Int64"
+        elif pd.api.types.is_float_dtype(dtype):
+            dtypes[col] = "float64"
+        else:
+            dtypes[col] = "string"
+    return dtypes
+
+
+def convert(values, dtype):
+    """A column as `dtype`; raises ValueError or TypeError when its values do not fit.
+
+    `values` are a column as parsed from one CSV chunk, or one already
+    written with a narrower dtype.
+    Strings stay plain Python strings, so the Parquet schema matches the
+    Excel path.
+    """
+    if dtype == "string":
+        text = values.astype(object)
+        return text.where(text.isna(), text.astype(str))
+    if dtype == "boolean":
+        if pd.api.types.is_bool_dtype(values.dtype):
+            return values.astype("boolean")
+        flags = values.where(values.isna(), values.astype(str).str.lower()).map(_BOOLEANS)
+        if (flags.isna() & values.notna()).any():
+            raise ValueError(f"Column {values.name!r} is not boolean")
+        return flags.astype("boolean")
+    numbers = pd.to_numeric(values)
+    return numbers.astype("Int64") if dtype == "Int64" else numbers.astype("float64")
+
+
+def _fit(chunk, dtypes):
+    """Convert every column of `chunk`, widening `dtypes` in place where a column does not fit.
+
+    Returns the converted chunk and the columns that were widened.
+    """
+    widened = []
+    for col in chunk.columns:
+        while True:
+            try:
+                chunk[col] = convert(chunk[col], dtypes[col])
+                break
+            except (ValueError, TypeError):
+                dtypes[col] = WIDER[dtypes[col]]
+                widened.append(col)
+    return chunk, widened
+
+
+def arrow_schema(dtypes):
+    """The Parquet schema of a CSV dataset with these column dtypes (empty columns keep their type)."""
+    return pa.schema([(col, _ARROW_TYPES[dtype]) for col, dtype in dtypes.items()])
+
+
+def new_dataset_path():
+    return cache_path("datasets", f"{uuid.uuid4().hex}.parquet")
+
+
+def touch_dataset(path):
+    """Mark a dataset as in use, so prune_datasets keeps it."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def prune_datasets(root, replaces=None):
+    """Delete `replaces` (the dataset a session's new upload supersedes) and datasets unread for DATASET_MAX_AGE.
+
+    Other sessions' datasets are never deleted while they are being read.
+    """
+    cutoff = time.time() - DATASET_MAX_AGE
+    for name in os.listdir(root):
+        old = os.path.join(root, name)
+        if not name.endswith(".parquet"):
+            continue
+        try:
+            if old == replaces or os.path.getmtime(old) < cutoff:
+                os.remove(old)
+        except OSError:
+            pass
+
+
+class _Writer:
+    """Appends DataFrame chunks to one Parquet file; one row group per chunk."""
+
+    def __init__(self, path, on_progress, schema=None):
+        self.path = path
+        self.on_progress = on_progress
+        self.writer = None
+        self.schema = schema
+        self.rows = 0
+        self.start = time.perf_counter()
+
+    def _append(self, chunk):
+        table = pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False)
+        if self.writer is None:
+            self.schema = table.schema
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(table)
+
+    def write(self, chunk):
+        self._append(chunk)
+        self.rows += len(chunk)
+        if self.on_progress:
+            self.on_progress(self.rows, self.rate)
+
+    def recast(self, dtypes, columns):
+        """Rewrite the row groups written so far with `columns` converted to their new `dtypes`.
+
+        Row groups are copied one at a time, so this never holds more than
+        one chunk in memory; it runs at most twice per column.
+        """
+        if self.writer is None:
+            return
+        self.writer.close()
+        old = f"{self.path}.old"
+        os.replace(self.path, old)
+        source = pq.ParquetFile(old)
+        self.writer, self.schema = None, arrow_schema(dtypes)
+        for i in range(source.num_row_groups):
+            chunk = source.read_row_group(i).to_pandas(types_mapper=_NULLABLE.get)
+            for col in columns:
+                chunk[col] = convert(chunk[col], dtypes[col])
+            self._append(chunk)
+        os.remove(old)
+
+    def abort(self):
+        """Close and delete the partial file after a failed ingest."""
+        if self.writer is not None:
+            self.writer.close()
+        for path in (self.path, f"{self.path}.old"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    @property
+    def rate(self):
+        elapsed = time.perf_counter() - self.start
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def close(self, columns, dtypes):
+        if self.writer is None:
+            # Empty file: still write a valid (zero-row) dataset with the header's columns.
+            pq.write_table(pa.Table.from_pandas(pd.DataFrame(columns=columns), preserve_index=False), self.path)
+        else:
+            self.writer.close()
+        return {
+            "path": self.path,
+            "rows": self.rows,
+            "columns": list(columns),
+            "dtypes": {c: d.__name__ if isinstance(d, type) else str(d) for c, d in dtypes.items()},
+            "seconds": time.perf_counter() - self.start,
+            "rows_per_sec": self.rate,
+        }
+
+
+def ingest_csv(source, path=None, chunksize=CHUNK_ROWS, on_progress=None, replaces=None):
+    """Stream a CSV into a Parquet file chunk by chunk, never holding the whole file in memory.
+
+    Column dtypes start from a sample of the first rows. When a later
+    chunk has values a column cannot hold (a float in an integer column,
+    text in a numeric one), that column is widened (Int64 -> float64 ->
+    string) and the rows already written are re-cast to match. `replaces`
+    is the path of the dataset this upload supersedes; it is deleted once
+    the new one is written.
+    """
+    path = path or new_dataset_path()
+    sample = pd.read_csv(source, nrows=SAMPLE_ROWS)
+    source.seek(0)
+    dtypes = infer_dtypes(sample)
+
+    writer = _Writer(path, on_progress, arrow_schema(dtypes))
+    try:
+        # Only text columns are pinned; the rest are parsed per chunk and converted here, so a value that
+        # does not fit widens its column instead of failing the upload.
+        text_columns = {col: str for col, dtype in dtypes.items() if dtype == "string"}
+        for chunk in pd.read_csv(source, chunksize=chunksize, dtype=text_columns):
+            chunk, widened = _fit(chunk, dtypes)
+            if widened:
+                writer.recast(dtypes, widened)
+            writer.write(chunk)
+        meta = writer.close(sample.columns, dtypes)
+    except Exception:
+        writer.abort()
+        raise
+    prune_datasets(os.path.dirname(path), replaces)
+    record("ingest.csv", meta["seconds"], items=meta["rows"])
+    return meta
+
+
+def ingest_excel(source, path=None, chunksize=CHUNK_ROWS, on_progress=None, replaces=None):
+    """Excel has no streaming reader in pandas; the sheet is read once and spilled in chunks."""
+    path = path or new_dataset_path()
+    df = pd.read_excel(source)
+    for col, dtype in df.dtypes.items():
+        if dtype == object:
+            df[col] = convert(df[col], "string")
+    writer = _Writer(path, on_progress)
+    try:
+        for start in range(0, len(df), chunksize):
+            writer.write(df.iloc[start:start + chunksize])
+        meta = writer.close(df.columns, df.dtypes)
+    except Exception:
+        writer.abort()
+        raise
+    prune_datasets(os.path.dirname(path), replaces)
+    record("ingest.excel", meta["seconds"], items=meta["rows"])
+    return meta
+
+
+def read_page(path, page, page_size):
+    """Rows [page * page_size, (page + 1) * page_size), reading only the row groups that overlap them."""
+    touch_dataset(path)
+    pf = pq.ParquetFile(path)
+    start, stop = page * page_size, (page + 1) * page_size
+    groups, offset, first = [], 0, None
+    for i in range(pf.num_row_groups):
+        n = pf.metadata.row_group(i).num_rows
+        if offset + n > start and offset < stop:
+            groups.append(i)
+            first = offset if first is None else first
+        offset += n
+    if not groups:
+        return pf.schema_arrow.empty_table().to_pandas()
+    table = pf.read_row_groups(groups)
+    return table.slice(start - first, page_size).to_pandas()
+
+
+def read_column(path, column):
+    touch_dataset(path)
+    return pq.read_table(path, columns=[column]).column(0).to_pandas()
+
+
+def dataset_rows(path):
+    return pq.ParquetFile(path).metadata.num_rows
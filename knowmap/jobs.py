@@ -0,0 +1,229 @@
+import json
+import os
+import pickle
+import shutil
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from knowmap.config import cache_path
+
+QUEUED, RUNNING, COMPLETED, FAILED = "queued", "running", "completed", "failed"
+
+# A runner renews the lease on its jobs every HEARTBEAT_SECONDS; a job whose
+# lease is older than LEASE_SECONDS is taken over by another runner.
+HEARTBEAT_SECONDS = 10
+LEASE_SECONDS = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    label TEXT,
+    params TEXT,
+    total_rows INTEGER,
+    total_chunks INTEGER,
+    done_chunks INTEGER DEFAULT 0,
+    done_rows INTEGER DEFAULT 0,
+    created REAL,
+    started REAL,
+    updated REAL,
+    error TEXT,
+    owner TEXT,
+    heartbeat REAL,
+    run_started REAL,
+    run_rows INTEGER DEFAULT 0
+)
+"""
+
+# Columns added after the first release, for job tables created without them.
+_ADDED_COLUMNS = {"owner": "TEXT", "heartbeat": "REAL", "run_started": "REAL", "run_rows": "INTEGER DEFAULT 0"}
+
+
+def _dump(obj, path):
+    """Atomic pickle write: a crash never leaves a half-written checkpoint behind."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def _load(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+class JobRunner:
+    """Runs chunked jobs on a background thread pool, outside any Streamlit script run.
+
+    Every job has a row in a local SQLite job table. Its input and each
+    finished chunk are checkpointed under the job directory. Several
+    processes can share the table: a job is run by the runner holding its
+    lease, which a background thread renews. A job left queued or running
+    by a crashed process is picked up once its lease expires, and resumes
+    from the first chunk without a checkpoint.
+    """
+
+    def __init__(self, kind, process_chunk, root=None, max_workers=1):
+        self.kind = kind
+        self.process_chunk = process_chunk
+        self.root = root or os.path.dirname(cache_path("jobs", kind, "jobs.db"))
+        os.makedirs(self.root, exist_ok=True)
+        self._db_path = os.path.join(self.root, "jobs.db")
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"knowmap-{kind}")
+        self._active = {}
+        self._lock = threading.Lock()
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        with self._db() as db:
+            db.execute(_SCHEMA)
+            have = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+            for col, decl in _ADDED_COLUMNS.items():
+                if col not in have:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {col} {decl}")
+        self.resume_incomplete()
+        threading.Thread(target=self._heartbeat, name=f"knowmap-{kind}-heartbeat", daemon=True).start()
+
+    def _db(self):
+        db = sqlite3.connect(self._db_path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def _update(self, job_id, **fields):
+        fields["updated"] = time.time()
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self._db() as db:
+            db.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.root, job_id)
+
+    def _chunk_path(self, job_id, i):
+        return os.path.join(self._job_dir(job_id), f"chunk-{i:06d}.pkl")
+
+    def submit(self, items, chunk_size=1000, label="", **params):
+        """Checkpoint `items`, queue the job and return its id."""
+        items = list(items)
+        job_id = uuid.uuid4().hex[:12]
+        os.makedirs(self._job_dir(job_id))
+        _dump({"items": items, "chunk_size": chunk_size}, os.path.join(self._job_dir(job_id), "input.pkl"))
+        total_chunks = (len(items) + chunk_size - 1) // chunk_size
+        now = time.time()
+        with self._db() as db:
+            db.execute(
+                "INSERT INTO jobs (id, kind, status, label, params, total_rows, total_chunks, created, updated, owner, heartbeat)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, self.kind, QUEUED, label, json.dumps(params), len(items), total_chunks, now, now, self.owner, now),
+            )
+        self._start(job_id)
+        return job_id
+
+    def _claim(self, job_id):
+        """Take the lease on an unfinished job unless another live runner holds it; True when this runner has it."""
+        now = time.time()
+        with self._db() as db:
+            claimed = db.execute(
+                "UPDATE jobs SET owner = ?, heartbeat = ? WHERE id = ? AND status IN (?, ?)"
+                " AND (owner IS NULL OR owner = ? OR heartbeat IS NULL OR heartbeat < ?)",
+                (self.owner, now, job_id, QUEUED, RUNNING, self.owner, now - LEASE_SECONDS),
+            ).rowcount
+        return claimed == 1
+
+    def _owns(self, job_id):
+        with self._db() as db:
+            row = db.execute("SELECT owner FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row is not None and row["owner"] == self.owner
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            try:
+                with self._db() as db:
+                    db.execute(
+                        "UPDATE jobs SET heartbeat = ? WHERE owner = ? AND status IN (?, ?)", (time.time(), self.owner, QUEUED, RUNNING)
+                    )
+                self.resume_incomplete()
+            except sqlite3.Error:
+                pass
+
+    def _start(self, job_id):
+        with self._lock:
+            future = self._active.get(job_id)
+            if future is not None and not future.done():
+                return
+            self._active[job_id] = self._pool.submit(self._run, job_id)
+
+    def resume(self, job_id):
+        """Restart a failed or interrupted job; finished chunks are not redone."""
+        with self._db() as db:
+            db.execute("UPDATE jobs SET status = ?, error = NULL WHERE id = ? AND status = ?", (QUEUED, job_id, FAILED))
+        if self._claim(job_id):
+            self._start(job_id)
+
+    def resume_incomplete(self):
+        """Start every queued or running job whose lease has expired (or that is already this runner's)."""
+        with self._db() as db:
+            rows = db.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) AND (owner IS NULL OR owner = ? OR heartbeat IS NULL OR heartbeat < ?)",
+                (QUEUED, RUNNING, self.owner, time.time() - LEASE_SECONDS),
+            ).fetchall()
+        for row in rows:
+            if self._claim(row["id"]):
+                self._start(row["id"])
+
+    def _run(self, job_id):
+        try:
+            job = self.status(job_id)
+            params = json.loads(job["params"] or "{}")
+            spec = _load(os.path.join(self._job_dir(job_id), "input.pkl"))
+            items, chunk_size = spec["items"], spec["chunk_size"]
+            now = time.time()
+            self._update(job_id, status=RUNNING, started=job["started"] or now, run_started=now, run_rows=0)
+
+            # run_rows counts only chunks processed by this run, not ones restored from checkpoints.
+            done_chunks = done_rows = run_rows = 0
+            for i in range(job["total_chunks"]):
+                if not self._owns(job_id):
+                    # Another runner took the job over after this one's lease lapsed.
+                    return
+                path = self._chunk_path(job_id, i)
+                chunk = items[i * chunk_size:(i + 1) * chunk_size]
+                if not os.path.exists(path):
+                    _dump(self.process_chunk(chunk, **params), path)
+                    run_rows += len(chunk)
+                done_chunks += 1
+                done_rows += len(chunk)
+                self._update(job_id, done_chunks=done_chunks, done_rows=done_rows, run_rows=run_rows, heartbeat=time.time())
+
+            self._update(job_id, status=COMPLETED, owner=None)
+        except Exception:
+            self._update(job_id, status=FAILED, error=traceback.format_exc(limit=5), owner=None)
+
+    def status(self, job_id):
+        with self._db() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        # Throughput of the latest run only, so chunks restored after a resume do not inflate it.
+        elapsed = (job["updated"] or 0) - (job["run_started"] or job["started"] or job["updated"] or 0)
+        job["rows_per_sec"] = (job["run_rows"] or 0) / elapsed if elapsed > 0 else 0.0
+        return job
+
+    def list_jobs(self, limit=20):
+        with self._db() as db:
+            rows = db.execute("SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def results(self, job_id):
+        """Per-chunk results of a completed job, in input order."""
+        job = self.status(job_id)
+        return [_load(self._chunk_path(job_id, i)) for i in range(job["total_chunks"])]
+
+    def delete(self, job_id):
+        with self._db() as db:
+            db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
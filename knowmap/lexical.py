@@ -0,0 +1,169 @@
+import hashlib
+import os
+import pickle
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+from knowmap.config import cache_path
+from knowmap.vector_index import top_k
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were which with".split()
+)
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(str(text).lower()) if t not in STOP_WORDS]
+
+
+def _text_hash(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring that can be updated one document at a time.
+
+    Postings are term -> {doc id: term frequency}. A frozen NumPy copy of
+    each posting list is cached for scoring and dropped when that term
+    changes. Removed documents leave a hole in the id space instead of
+    forcing a renumbering.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.keys = []
+        self.doc_of = {}
+        self.hashes = {}
+        self.doc_len = []
+        self.doc_terms = []
+        self.total_len = 0
+        self.n_docs = 0
+        self.postings = {}
+        self._frozen = {}
+        self._doc_len_array = None
+        self.lock = threading.RLock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"], state["_frozen"], state["_doc_len_array"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._frozen = {}
+        self._doc_len_array = None
+        self.lock = threading.RLock()
+
+    def add(self, key, text):
+        if key in self.doc_of:
+            self.remove(key)
+        doc = len(self.keys)
+        terms = Counter(tokenize(text))
+        self.keys.append(key)
+        self.doc_of[key] = doc
+        self.hashes[key] = _text_hash(text)
+        length = sum(terms.values())
+        self.doc_len.append(length)
+        self.doc_terms.append(tuple(terms))
+        self._doc_len_array = None
+        self.total_len += length
+        self.n_docs += 1
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc] = tf
+            self._frozen.pop(term, None)
+
+    def remove(self, key):
+        doc = self.doc_of.pop(key, None)
+        if doc is None:
+            return
+        del self.hashes[key]
+        self.keys[doc] = None
+        self.total_len -= self.doc_len[doc]
+        self.doc_len[doc] = 0
+        self._doc_len_array = None
+        self.n_docs -= 1
+        for term in self.doc_terms[doc]:
+            del self.postings[term][doc]
+            if not self.postings[term]:
+                del self.postings[term]
+            self._frozen.pop(term, None)
+        self.doc_terms[doc] = ()
+
+    def sync(self, docs):
+        """Make the index hold exactly `docs` ({key: text}); only changed documents are touched.
+
+        Returns True when anything changed.
+        """
+        with self.lock:
+            stale = [k for k in self.doc_of if k not in docs]
+            changed = [k for k, text in docs.items() if self.hashes.get(k) != _text_hash(text)]
+            for k in stale:
+                self.remove(k)
+            for k in changed:
+                self.add(k, docs[k])
+            return bool(stale or changed)
+
+    def _posting(self, term):
+        if term not in self._frozen:
+            plist = self.postings.get(term, {})
+            self._frozen[term] = (
+                np.fromiter(plist.keys(), dtype=np.int64, count=len(plist)),
+                np.fromiter(plist.values(), dtype=np.float32, count=len(plist)),
+            )
+        return self._frozen[term]
+
+    def search(self, query, n=100):
+        """Top-n (key, score) pairs for `query`; only documents sharing a term are scored."""
+        with self.lock:
+            terms = [t for t in set(tokenize(query)) if t in self.postings]
+            if not terms or not self.n_docs:
+                return []
+            if self._doc_len_array is None:
+                self._doc_len_array = np.asarray(self.doc_len, dtype=np.float32)
+            doc_len = self._doc_len_array
+            avgdl = self.total_len / self.n_docs
+            all_docs, all_scores = [], []
+            for term in terms:
+                docs, tf = self._posting(term)
+                idf = np.log(1 + (self.n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                norm = tf + self.k1 * (1 - self.b + self.b * doc_len[docs] / avgdl)
+                all_docs.append(docs)
+                all_scores.append(idf * tf * (self.k1 + 1) / norm)
+            ids, inverse = np.unique(np.concatenate(all_docs), return_inverse=True)
+            vals = np.bincount(inverse, weights=np.concatenate(all_scores))
+            best = top_k(vals, n)
+            return [(self.keys[ids[i]], float(vals[i])) for i in best]
+
+    def save(self, path):
+        tmp = f"{path}.tmp"
+        with self.lock, open(tmp, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_lexical_index(name="nodes"):
+    """Process-wide BM25 index, loaded from disk the first time it is asked for."""
+    with _INDEXES_LOCK:
+        if name not in _INDEXES:
+            path = cache_path("lexical", f"{name}.pkl")
+            _INDEXES[name] = BM25Index.load(path) if os.path.exists(path) else BM25Index()
+        return _INDEXES[name]
+
+
+def save_lexical_index(index, name="nodes"):
+    index.save(cache_path("lexical", f"{name}.pkl"))
@@ -0,0 +1,127 @@
+from collections import Counter
+
+import networkx as nx
+
+# Pixel scale of the precomputed layout handed to vis.js.
+LAYOUT_SCALE = 1000
+
+CLUSTER_COLOR = "#f4a261"
+NODE_COLOR = "#87ceeb"
+
+
+class GraphSummary:
+    """Cluster membership, super-graph and layout for one graph version."""
+
+    def __init__(self, membership, clusters, labels, super_graph, positions):
+        self.membership = membership
+        self.clusters = clusters
+        self.labels = labels
+        self.super_graph = super_graph
+        self.positions = positions
+
+
+def summarize_graph(G, max_clusters=60, seed=0):
+    """Group `G` into at most `max_clusters` clusters and lay the clusters out.
+
+    Communities come from label propagation, which runs in near-linear
+    time. The largest `max_clusters - 1` keep their own super-node and the
+    rest are pooled into one "other" cluster, so the super-graph size is
+    fixed.
+    """
+    if hasattr(nx.community, "fast_label_propagation_communities"):  # networkx >= 3.4
+        found = nx.community.fast_label_propagation_communities(G, seed=seed)
+    else:
+        found = nx.community.label_propagation_communities(G.to_undirected(as_view=True) if G.is_directed() else G)
+    communities = sorted(found, key=len, reverse=True)
+    pooled = len(communities) > max_clusters
+    if pooled:
+        rest = set().union(*communities[max_clusters - 1:])
+        communities = communities[:max_clusters - 1] + [rest]
+
+    degree = G.degree
+    clusters, membership, labels = [], {}, []
+    for cid, members in enumerate(communities):
+        ranked = sorted(members, key=lambda n: degree[n], reverse=True)
+        clusters.append(ranked)
+        for n in ranked:
+            membership[n] = cid
+        if pooled and cid == len(communities) - 1:
+            labels.append(f"Other ({len(ranked)})")
+        else:
+            labels.append(f"{ranked[0]} (+{len(ranked) - 1})" if len(ranked) > 1 else str(ranked[0]))
+
+    weights = Counter()
+    for u, v in G.edges():
+        cu, cv = membership[u], membership[v]
+        if cu != cv:
+            weights[(min(cu, cv), max(cu, cv))] += 1
+
+    S = nx.Graph()
+    for cid, members in enumerate(clusters):
+        S.add_node(cid, size=len(members))
+    for (cu, cv), w in weights.items():
+        S.add_edge(cu, cv, weight=w)
+
+    pos = nx.spring_layout(S, weight="weight", seed=seed, scale=LAYOUT_SCALE) if len(S) else {}
+    positions = {cid: (float(x), float(y)) for cid, (x, y) in pos.items()}
+    return GraphSummary(membership, clusters, labels, S, positions)
+
+
+def lod_view(G, summary, expanded=(), max_members=100, seed=0):
+    """Build the graph to draw: collapsed clusters as super-nodes, `expanded` ones as members.
+
+    Every node in the result carries precomputed `x`/`y` coordinates, so
+    the browser can render it with physics switched off. Only the
+    `max_members` highest-degree members of an expanded cluster are shown,
+    which keeps the output size bounded.
+    """
+    expanded = set(expanded)
+    V = nx.Graph()
+    n_clusters = len(summary.clusters)
+    radius = LAYOUT_SCALE / max(2.0, n_clusters ** 0.5)
+
+    for cid, members in enumerate(summary.clusters):
+        cx, cy = summary.positions.get(cid, (0.0, 0.0))
+        if cid not in expanded:
+            V.add_node(
+                f"cluster:{cid}",
+                label=summary.labels[cid],
+                title=f"{len(members)} concepts, e.g. " + ", ".join(map(str, members[:5])),
+                color=CLUSTER_COLOR,
+                size=15 + min(45, len(members) ** 0.5),
+                x=cx,
+                y=cy,
+                cluster=cid,
+            )
+            continue
+        shown = members[:max_members]
+        sub = G.subgraph(shown)
+        pos = nx.spring_layout(sub, seed=seed, center=(cx, cy), scale=radius) if len(sub) > 1 else {shown[0]: (cx, cy)}
+        for n in shown:
+            V.add_node(
+                n,
+                label=str(n),
+                title=" ".join(map(str, G.nodes[n].get("sentences", [n]))),
+                color=NODE_COLOR,
+                size=20,
+                x=float(pos[n][0]),
+                y=float(pos[n][1]),
+                cluster=cid,
+            )
+
+    visible = set(V.nodes)
+    for u, v, w in summary.super_graph.edges(data="weight"):
+        a, b = f"cluster:{u}", f"cluster:{v}"
+        if a in visible and b in visible:
+            V.add_edge(a, b, predicate=f"{w} links", weight=w)
+
+    for cid in expanded:
+        members = summary.clusters[cid][:max_members]
+        edges = G.edges(members, data="predicate")
+        if G.is_directed():
+            edges = [*edges, *((v, u, p) for u, v, p in G.in_edges(members, data="predicate"))]
+        for n, nb, predicate in edges:
+            target = nb if nb in visible else f"cluster:{summary.membership[nb]}"
+            if target != n and target in visible and not V.has_edge(n, target):
+                V.add_edge(n, target, predicate=predicate or "")
+    return V
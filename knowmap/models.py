@@ -0,0 +1,85 @@
+import importlib.util
+import os
+import threading
+
+from knowmap.config import SENTENCE_MODEL_NAME, SPACY_MODEL_NAME
+
+_MODELS = {}
+_KEY_LOCKS = {}
+_LOCK = threading.Lock()
+_WARMING = None
+
+
+def _load_sentence_model(name):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name)
+
+
+def _load_spacy_model(name):
+    import spacy
+    return spacy.load(name)
+
+
+LOADERS = {
+    "sentence": _load_sentence_model,
+    "spacy": _load_spacy_model,
+}
+
+
+def has_package(name):
+    """Whether `name` is importable, without paying for the import."""
+    return importlib.util.find_spec(name) is not None
+
+
+def get_model(kind, name):
+    """Load a model once per process and hand out the same instance afterwards.
+
+    The registry lives at module level, outside Streamlit's caches, so
+    st.cache_resource.clear() after an upload does not throw models away.
+    Failed loads are not cached; the next call tries again.
+    """
+    key = (kind, name)
+    if key in _MODELS:
+        return _MODELS[key]
+    with _LOCK:
+        key_lock = _KEY_LOCKS.setdefault(key, threading.Lock())
+    with key_lock:
+        if key not in _MODELS:
+            _MODELS[key] = LOADERS[kind](name)
+    return _MODELS[key]
+
+
+def get_sentence_model(name=SENTENCE_MODEL_NAME):
+    return get_model("sentence", name)
+
+
+def get_spacy_model(name=SPACY_MODEL_NAME):
+    return get_model("spacy", name)
+
+
+def warm_up():
+    """Load every model whose library is installed; errors are left for the page that needs the model."""
+    if has_package("sentence_transformers"):
+        try:
+            get_sentence_model()
+        except Exception:
+            pass
+    if has_package("spacy"):
+        try:
+            get_spacy_model()
+        except Exception:
+            pass
+
+
+def warm_up_in_background():
+    """Start warm_up() on a daemon thread, at most once per process."""
+    global _WARMING
+    with _LOCK:
+        if _WARMING is None:
+            _WARMING = threading.Thread(target=warm_up, name="knowmap-warm-up", daemon=True)
+            _WARMING.start()
+    return _WARMING
+
+
+if os.environ.get("KNOWMAP_PREWARM", "").lower() in ("1", "true", "yes"):
+    warm_up_in_background()
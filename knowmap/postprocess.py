@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+from knowmap.config import cache_path
+
+ENTITY_COLUMNS = ("entity", "label")
+TRIPLE_COLUMNS = ("subject", "predicate", "object")
+PROVENANCE_COLUMNS = ("triple", "row", "sent_start", "sent_end")
+
+_ARTICLE_RE = r"^(?:the|a|an)\s+"
+_POSSESSIVE_RE = r"['’]s$"
+
+
+def _per_unique(values, transform):
+    """Run a Series -> Series string transform on the distinct values only, then broadcast it back."""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    if not len(uniques):
+        return np.empty(0, dtype=object)
+    return transform(pd.Series(uniques, dtype=object).astype(str)).to_numpy(dtype=object)[codes]
+
+
+def _clean_entity(s):
+    s = s.str.normalize("NFKC").str.replace(r"\s+", " ", regex=True).str.strip()
+    return s.str.replace(_ARTICLE_RE, "", case=False, regex=True).str.replace(_POSSESSIVE_RE, "", regex=True)
+
+
+def _clean_predicate(s):
+    return s.str.normalize("NFKC").str.strip().str.replace(r"\s+", "_", regex=True).str.casefold()
+
+
+def surface_forms(values):
+    """Unicode/whitespace-normalised text with leading articles and trailing possessives removed."""
+    return _per_unique(values, _clean_entity)
+
+
+def predicate_forms(values):
+    return _per_unique(values, _clean_predicate)
+
+
+def entity_keys(surfaces):
+    """Case-folded keys; surface forms that share a key are aliases of one entity."""
+    return _per_unique(surfaces, lambda s: s.str.casefold())
+
+
+def _aggregate(df, by):
+    """Collapse duplicate `by` rows, summing `count` and keeping the earliest `first_row`."""
+    return df.groupby(list(by), sort=False, as_index=False).agg(count=("count", "sum"), first_row=("first_row", "min"))
+
+
+def dedup_mentions(n_rows, entities, triples):
+    """Deduplicate the raw mentions of one chunk.
+
+    `entities` is (texts, labels, rows) and `triples` is (subjects,
+    predicates, objects, rows, sentence starts, sentence ends), each a
+    tuple of equal-length columns with rows local to the chunk and
+    sentence character offsets within the row's text. Returns the columnar
+    chunk result that merge_chunks() consumes.
+    """
+    texts, labels, ent_rows = entities
+    ents = pd.DataFrame({"entity": surface_forms(texts), "label": np.asarray(labels, dtype=object), "first_row": np.asarray(ent_rows, dtype=np.int64)})
+    ents = _aggregate(ents[ents["entity"] != ""].assign(count=1), ENTITY_COLUMNS)
+
+    subjects, predicates, objects, tri_rows, sent_starts, sent_ends = triples
+    tris = pd.DataFrame(
+        {
+            "subject": surface_forms(subjects),
+            "predicate": predicate_forms(predicates),
+            "object": surface_forms(objects),
+            "first_row": np.asarray(tri_rows, dtype=np.int64),
+            "sent_start": np.asarray(sent_starts, dtype=np.int64),
+            "sent_end": np.asarray(sent_ends, dtype=np.int64),
+        }
+    )
+    tris = tris[(tris["subject"] != "") & (tris["object"] != "")]
+    return {"rows": n_rows, "entities": ents, **_dedup_triples(tris.assign(count=1))}
+
+
+def _dedup_triples(tris):
+    """Deduplicated triples plus (triple, row, sentence offsets) provenance pointing into them."""
+    triple_ids = tris.groupby(list(TRIPLE_COLUMNS), sort=False).ngroup().to_numpy(dtype=np.int64)
+    provenance = pd.DataFrame(
+        {
+            "triple": triple_ids,
+            "row": tris["first_row"].to_numpy(dtype=np.int64),
+            "sent_start": tris["sent_start"].to_numpy(dtype=np.int64),
+            "sent_end": tris["sent_end"].to_numpy(dtype=np.int64),
+        }
+    )
+    return {"triples": _aggregate(tris, TRIPLE_COLUMNS), "provenance": provenance.drop_duplicates()}
+
+
+def canonical_names(keys, surfaces, counts):
+    """key -> its most frequent surface form (the first one seen wins ties)."""
+    totals = pd.DataFrame({"key": keys, "surface": surfaces, "count": counts}).groupby(["key", "surface"], sort=False)["count"].sum()
+    best = totals.reset_index().sort_values("count", ascending=False, kind="stable").drop_duplicates("key")
+    return pd.Series(best["surface"].to_numpy(dtype=object), index=best["key"].to_numpy(dtype=object))
+
+
+def merge_chunks(chunks):
+    """Combine chunk results into global, alias-collapsed, deduplicated tables.
+
+    Row ids are offset to positions in the whole input. Every surface form
+    of an entity is rewritten to the most frequent form among the entity
+    mentions, for entities and triple endpoints alike. Triples that
+    collapse into self-loops are dropped. Returns (entities, triples,
+    provenance) DataFrames; provenance.triple indexes triples, and each
+    provenance row names the input row and sentence offsets it came from.
+    """
+    ent_parts, tri_parts, prov_parts = [], [], []
+    row_offset = triple_offset = 0
+    for chunk in chunks:
+        ent_parts.append(chunk["entities"].assign(first_row=chunk["entities"]["first_row"] + row_offset))
+        tri_parts.append(chunk["triples"].assign(first_row=chunk["triples"]["first_row"] + row_offset))
+        prov_parts.append(chunk["provenance"].assign(triple=chunk["provenance"]["triple"] + triple_offset, row=chunk["provenance"]["row"] + row_offset))
+        row_offset += chunk["rows"]
+        triple_offset += len(chunk["triples"])
+
+    entities = pd.concat(ent_parts, ignore_index=True) if ent_parts else empty_entities()
+    triples = pd.concat(tri_parts, ignore_index=True) if tri_parts else empty_triples()
+    provenance = pd.concat(prov_parts, ignore_index=True) if prov_parts else pd.DataFrame({c: [] for c in PROVENANCE_COLUMNS}, dtype=np.int64)
+
+    names = canonical_names(entity_keys(entities["entity"]), entities["entity"].to_numpy(dtype=object), entities["count"])
+
+    def canonical(values):
+        return _per_unique(values, lambda s: s.str.casefold().map(names).fillna(s))
+
+    entities = _aggregate(entities.assign(entity=canonical(entities["entity"])), ENTITY_COLUMNS)
+
+    triples = triples.assign(subject=canonical(triples["subject"]), object=canonical(triples["object"]))
+    keep = (triples["subject"] != triples["object"]).to_numpy()
+    merged_ids = np.full(len(triples), -1, dtype=np.int64)
+    merged_ids[keep] = triples[keep].groupby(list(TRIPLE_COLUMNS), sort=False).ngroup().to_numpy(dtype=np.int64)
+    triples = _aggregate(triples[keep], TRIPLE_COLUMNS)
+
+    provenance = provenance.assign(triple=merged_ids[provenance["triple"].to_numpy(dtype=np.int64)])
+    provenance = provenance[provenance["triple"] >= 0].drop_duplicates().sort_values(list(PROVENANCE_COLUMNS), ignore_index=True)
+    return entities, triples, provenance
+
+
+def empty_entities():
+    return pd.DataFrame({"entity": [], "label": [], "count": [], "first_row": []}).astype({"count": np.int64, "first_row": np.int64})
+
+
+def empty_triples():
+    return pd.DataFrame({c: [] for c in TRIPLE_COLUMNS} | {"count": [], "first_row": []}).astype({"count": np.int64, "first_row": np.int64})
+
+
+def table_path(name, table):
+    return cache_path("extracted", name, f"{table}.parquet")
+
+
+def save_tables(name, **tables):
+    for table, df in tables.items():
+        df.to_parquet(table_path(name, table), index=False)
+
+
+def load_table(name, table):
+    return pd.read_parquet(table_path(name, table))
@@ -0,0 +1,92 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from knowmap.telemetry import record
+
+MAX_ENTRIES = 2048
+TTL_SECONDS = 900
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Case-folded, whitespace-collapsed query text, so trivially different spellings share an entry."""
+    return _SPACE_RE.sub(" ", str(query)).strip().casefold()
+
+
+class QueryCache:
+    """Thread-safe LRU cache with a per-entry TTL, scoped to one data version.
+
+    Every entry is stored under (version, key). The first lookup with a new
+    version drops all entries of the old one, so a dataset change
+    invalidates exactly the results computed from the old data and nothing
+    else. Concurrent misses on the same key are computed once: later
+    callers wait for the first one's result.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, name="query"):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.name = name
+        self.version = None
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _set_version(self, version):
+        # Caller holds self._lock.
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+
+    def get(self, version, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            self._set_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        record(f"cache.{self.name}", hits=int(entry is not None), misses=int(entry is None))
+        return default if entry is None else entry[1]
+
+    def put(self, version, key, value):
+        with self._lock:
+            self._set_version(version)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, version, key, compute):
+        """Cached value for `key`, calling `compute()` on a miss. Returns (hit, value)."""
+        missing = object()
+        value = self.get(version, key, missing)
+        if value is not missing:
+            return True, value
+        with self._lock:
+            key_lock = self._inflight.setdefault((version, key), threading.Lock())
+        try:
+            with key_lock:
+                # Another caller may have filled the entry while this one waited.
+                with self._lock:
+                    entry = self._entries.get(key) if version == self.version else None
+                if entry is not None and entry[0] >= time.monotonic():
+                    return True, entry[1]
+                value = compute()
+                self.put(version, key, value)
+                return False, value
+        finally:
+            with self._lock:
+                self._inflight.pop((version, key), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,48 @@
+import hashlib
+
+from pyvis.network import Network
+
+from knowmap.telemetry import timed
+
+_MASK = (1 << 64) - 1
+
+
+def _h(value):
+    return int.from_bytes(hashlib.blake2b(repr(value).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def graph_fingerprint(G):
+    """Order-independent hash of everything in `G` that shows up in the rendering."""
+    acc = 0
+    for n, attr in G.nodes(data=True):
+        acc = (acc + _h((n, sorted(attr.items())))) & _MASK
+    for u, v, attr in G.edges(data=True):
+        ends = tuple(sorted((repr(u), repr(v)))) if not G.is_directed() else (repr(u), repr(v))
+        acc = (acc + _h((ends, sorted(attr.items())))) & _MASK
+    return f"{acc:016x}-{G.number_of_nodes()}-{G.number_of_edges()}"
+
+
+def graph_html(G, height=500):
+    """Render `G` with pyvis and return the page as a string (nothing touches disk)."""
+    with timed("render.graph_html", items=G.number_of_nodes()):
+        return _graph_html(G, height)
+
+
+def _graph_html(G, height):
+    net = Network(height=f"{height}px", width="100%", bgcolor="#222222", font_color="white", cdn_resources="local", directed=G.is_directed())
+
+    for n, attr in G.nodes(data=True):
+        # Nodes with precomputed coordinates (level-of-detail view) are pinned, so the browser runs no physics.
+        layout = {"x": attr["x"], "y": attr["y"], "physics": False} if "x" in attr else {}
+        net.add_node(
+            n,
+            label=attr.get("label", n),
+            title=attr.get("title", " ".join(attr.get("sentences", [n]))),
+            color=attr.get("color", "#87ceeb"),
+            size=attr.get("size", 20),
+            **layout,
+        )
+    for u, v, attr in G.edges(data=True):
+        net.add_edge(u, v, title=attr.get("predicate", ""), color="#7fffd4")
+
+    return net.generate_html()
@@ -0,0 +1,172 @@
+import networkx as nx
+import numpy as np
+
+from knowmap.telemetry import instrument
+from knowmap.vector_index import normalize_rows, top_k as top_k_indices
+
+# Queries are scored this many at a time so the (queries x nodes) score
+# block stays bounded however long the query list is.
+QUERY_BLOCK = 256
+
+# Lexical candidates re-scored densely per query, and the dense share of the fused score.
+HYBRID_CANDIDATES = 200
+HYBRID_ALPHA = 0.7
+
+
+def node_documents(graph):
+    """(nodes, docs): one searchable document per node, the name followed by its sentences."""
+    nodes = list(graph.nodes())
+    docs = [f"{n}: {' '.join(graph.nodes[n].get('sentences', [n]))}" for n in nodes]
+    return nodes, docs
+
+
+def build_tfidf(docs):
+    """Offline fallback corpus: (vectorizer, TF-IDF matrix) over `docs`."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer(stop_words="english")
+    return vectorizer, vectorizer.fit_transform(docs)
+
+
+class HybridRetriever:
+    """BM25 candidates merged with the dense top-k, then scored together.
+
+    The fused score is alpha * cosine + (1 - alpha) * BM25 / max BM25 over
+    the candidates, with a BM25 term of 0 for candidates that only the
+    dense side found. Every query therefore gets min(k, n) results, and
+    all scores are on the same scale.
+    """
+
+    def __init__(self, lexical, nodes, embeddings, index=None, n_candidates=HYBRID_CANDIDATES, alpha=HYBRID_ALPHA):
+        self.lexical = lexical
+        self.position = {n: i for i, n in enumerate(nodes)}
+        self.vectors = index.vectors if index is not None else normalize_rows(embeddings)
+        self.index = index
+        self.n_candidates = n_candidates
+        self.alpha = alpha
+
+    def _dense(self, q, k):
+        if self.index is not None:
+            return self.index.search(q, k)[0]
+        return top_k_indices(q @ self.vectors.T, k)
+
+    def search(self, texts, q_emb, k):
+        q = normalize_rows(np.atleast_2d(q_emb))
+        ids = np.full((len(q), k), -1, dtype=np.int64)
+        scores = np.full((len(q), k), -np.inf, dtype=np.float32)
+        dense = self._dense(q, k)
+        for row, text in enumerate(texts):
+            lexical = {self.position[key]: s for key, s in self.lexical.search(text, self.n_candidates) if key in self.position}
+            for i in dense[row]:
+                if i >= 0:
+                    lexical.setdefault(int(i), 0.0)
+            if not lexical:
+                continue
+            cand = np.fromiter(lexical.keys(), dtype=np.int64, count=len(lexical))
+            lex = np.fromiter(lexical.values(), dtype=np.float32, count=len(lexical))
+            top = lex.max()
+            fused = self.alpha * (self.vectors[cand] @ q[row]) + (1 - self.alpha) * (lex / top if top > 0 else lex)
+            best = top_k_indices(fused, k)
+            ids[row, :len(best)] = cand[best]
+            scores[row, :len(best)] = fused[best]
+        return ids, scores
+
+
+@instrument("search.semantic", items=lambda queries, *args, **kwargs: len(queries))
+def semantic_search_batch(queries, nodes, model, embeddings, vectorizer, top_k=5, index=None, batch_size=QUERY_BLOCK, retriever=None):
+    """Top-k (node, score) matches for every query in `queries`.
+
+    All non-empty queries are encoded in one batched call and scored with a
+    single matrix product per block; empty queries get an empty result.
+    """
+    from sklearn.metrics.pairwise import cosine_similarity, linear_kernel
+
+    results = [[] for _ in queries]
+    live = [i for i, q in enumerate(queries) if q and str(q).strip()]
+    if not live:
+        return results
+    texts = [str(queries[i]) for i in live]
+
+    if model is not None:
+        q_emb = model.encode(texts, batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True)
+    elif vectorizer is not None:
+        q_emb = vectorizer.transform(texts)
+    else:
+        return results
+
+    for start in range(0, len(live), batch_size):
+        block = q_emb[start:start + batch_size]
+        if model is not None and retriever is not None:
+            ids, scores = retriever.search(texts[start:start + batch_size], block, top_k)
+        elif model is not None and index is not None:
+            ids, scores = index.search(block, top_k)
+        else:
+            if model is not None:
+                sims = cosine_similarity(block, embeddings)
+            else:
+                sims = linear_kernel(block, embeddings)
+            ids = top_k_indices(sims, top_k)
+            scores = np.take_along_axis(sims, ids, axis=1)
+
+        for row, (row_ids, row_scores) in enumerate(zip(ids, scores)):
+            results[live[start + row]] = [(nodes[i], float(s)) for i, s in zip(row_ids, row_scores) if i >= 0]
+    return results
+
+
+def semantic_search(query, nodes, docs, model, embeddings, vectorizer, top_k=5, index=None, retriever=None):
+    if not query:
+        return []
+    return semantic_search_batch([query], nodes, model, embeddings, vectorizer, top_k=top_k, index=index, retriever=retriever)[0]
+
+
+def adjacency_subgraph(adjacency, ids, node_attributes, predicates=None, max_edges=None):
+    """Graph on the node ids `ids`, with edges sliced from the CSR adjacency instead of copied from networkx.
+
+    `node_attributes(node)` gives each node's attributes; at most
+    `max_edges` edges are kept.
+    """
+    sources, targets, preds = adjacency.induced_edges(ids, predicates=predicates, max_edges=max_edges)
+    nodes, names = adjacency.nodes, adjacency.predicates
+    sub = nx.MultiDiGraph()
+    sub.add_nodes_from((nodes[i], node_attributes(nodes[i])) for i in ids)
+    sub.add_edges_from(
+        (nodes[u], nodes[v], names[p], {"predicate": names[p]}) for u, v, p in zip(sources.tolist(), targets.tolist(), preds.tolist())
+    )
+    return sub
+
+
+@instrument("search.subgraph")
+def build_subgraph_from_matches(graph, matched_nodes, depth=1, adjacency=None, max_nodes=None, predicates=None, direction="both", max_edges=None):
+    """Subgraph around `matched_nodes` out to `depth` hops.
+
+    With a CSRAdjacency the expansion runs as sparse frontier products, is
+    capped at `max_nodes` and can follow only edges with the given
+    `predicates`, in the given `direction` ("out", "in" or "both"); the
+    edges come from the adjacency too, capped at `max_edges`.
+    Without one it falls back to plain neighbour walking in both directions.
+    """
+    if adjacency is not None:
+        ids = adjacency.expand(matched_nodes, depth, max_nodes=max_nodes, predicates=predicates, direction=direction)
+        return adjacency_subgraph(adjacency, ids, lambda n: graph.nodes[n], predicates=predicates, max_edges=max_edges)
+    nodes = set(matched_nodes)
+    frontier = set(matched_nodes)
+    for _ in range(depth):
+        new = set()
+        for n in frontier:
+            new.update(nx.all_neighbors(graph, n))
+        frontier = new - nodes
+        nodes.update(new)
+    sub = graph.subgraph(nodes).copy()
+    if predicates:
+        edges = sub.edges(keys=True, data="predicate") if sub.is_multigraph() else sub.edges(data="predicate")
+        sub.remove_edges_from([e[:-1] for e in edges if e[-1] not in predicates])
+    return sub
+
+
+def merge_matches(batch_results):
+    """Distinct matched nodes across a batch, in first-seen order."""
+    seen = {}
+    for matches in batch_results:
+        for n, _ in matches:
+            seen.setdefault(n, None)
+    return list(seen)
@@ -0,0 +1,173 @@
+"""Local graph/search service: one process owns the graph, embeddings and indexes.
+
+    python -m knowmap.service --port 8765
+    KNOWMAP_SERVICE_URL=http://127.0.0.1:8765 streamlit run app.py
+
+With KNOWMAP_SERVICE_URL set, the Knowledge Graph page calls the service
+instead of building its own engine. Any number of Streamlit processes can
+then share one copy of the graph. The service and the UI must share
+KNOWMAP_CACHE_DIR, because uploads and extracted triples reach the
+service through the main triple store on disk.
+"""
+
+import argparse
+import inspect
+import json
+import logging
+import threading
+import traceback
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from knowmap.engine import GraphEngine
+
+log = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# GraphEngine methods reachable over RPC (POST /rpc/<method> with keyword arguments as the JSON body).
+RPC_METHODS = frozenset(
+    {
+        "refresh",
+        "info",
+        "search",
+        "search_batch",
+        "subgraph_html",
+        "graph_html",
+        "related",
+        "connect",
+        "importance",
+        "top_concepts",
+        "suggested_links",
+        "recall",
+        "snapshot",
+    }
+)
+
+
+class ServiceError(RuntimeError):
+    pass
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, {"status": "ok", "version": self.server.engine.version})
+        else:
+            self._reply(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        prefix = "/rpc/"
+        method = self.path[len(prefix):] if self.path.startswith(prefix) else None
+        if method not in RPC_METHODS:
+            self._reply(404, {"error": f"Unknown method {method or self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            kwargs = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self._reply(400, {"error": f"Bad request body: {e}"})
+            return
+        call = getattr(self.server.engine, method)
+        # Only arguments that do not fit the method's signature are the client's fault; any other error is a 500.
+        try:
+            if not isinstance(kwargs, dict):
+                raise TypeError("the request body must be a JSON object of keyword arguments")
+            inspect.signature(call).bind(**kwargs)
+        except TypeError as e:
+            self._reply(400, {"error": str(e)})
+            return
+        try:
+            result = call(**kwargs)
+        except Exception as e:
+            log.error("RPC %s failed:\n%s", method, traceback.format_exc())
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+        else:
+            self._reply(200, {"result": result})
+
+    def log_message(self, fmt, *args):
+        log.debug("%s - %s", self.address_string(), fmt % args)
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, engine=None):
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.engine = engine or GraphEngine()
+    return server
+
+
+class ServiceClient:
+    """Thin client for the graph service, with the same methods as GraphEngine's RPC surface."""
+
+    def __init__(self, url, timeout=300):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def call(self, method, **kwargs):
+        request = urllib.request.Request(
+            f"{self.url}/rpc/{method}",
+            data=json.dumps(kwargs).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)["result"]
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.load(e)["error"]
+            except ValueError:
+                message = e.reason
+            raise ServiceError(f"{method}: {message}") from None
+        except urllib.error.URLError as e:
+            raise ServiceError(f"Graph service at {self.url} is unreachable: {e.reason}") from None
+
+    def __getattr__(self, name):
+        if name not in RPC_METHODS:
+            raise AttributeError(name)
+        return lambda **kwargs: self.call(name, **kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m knowmap.service", description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    server = make_server(args.host, args.port)
+    engine = server.engine
+
+    # Build (or restore) the graph, search corpus and analytics up front, so the first UI request finds them
+    # ready, then snapshot them so the next start is a restore.
+    def warm_up():
+        engine.refresh()
+        engine.info()
+        engine.analytics()
+        engine.snapshot(wait=True)
+        log.info("Graph ready: %s", engine.version)
+
+    threading.Thread(target=warm_up, name="knowmap-service-warmup", daemon=True).start()
+    log.info("Serving on http://%s:%d", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
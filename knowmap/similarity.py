@@ -0,0 +1,128 @@
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from knowmap.config import cache_path
+from knowmap.telemetry import timed
+from knowmap.vector_index import normalize_rows, top_k
+
+# Scores held per worker at once are ROW_BLOCK x COL_BLOCK float32 (32 MB).
+ROW_BLOCK = 512
+COL_BLOCK = 16384
+# The kNN graph is built once per graph version with this many neighbours; smaller requests are sliced from it.
+MAX_NEIGHBORS = 50
+
+
+def _normalized(embeddings):
+    if sp.issparse(embeddings):
+        X = sp.csr_matrix(embeddings, dtype=np.float32)
+        norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sp.diags(1.0 / norms).dot(X).tocsr()
+    return normalize_rows(embeddings)
+
+
+def knn_graph(embeddings, n_neighbors=10, row_block=ROW_BLOCK, col_block=COL_BLOCK, n_jobs=None, normalized=False):
+    """Each row's `n_neighbors` most cosine-similar rows, as an n x n CSR matrix of similarities.
+
+    Row blocks run on a thread pool; the matrix products release the GIL.
+    Each row block streams over column blocks and keeps a running top-k, so
+    memory per worker stays at row_block x col_block scores however large n
+    is. A row never lists itself. Works on dense embeddings and on sparse
+    TF-IDF matrices; `normalized` input (e.g. a memory-mapped matrix) is
+    read in place instead of copied.
+    """
+    X = embeddings if normalized else _normalized(embeddings)
+    n = X.shape[0]
+    k = min(n_neighbors, n - 1)
+    if k <= 0:
+        return sp.csr_matrix((n, n), dtype=np.float32)
+
+    def block(r0):
+        r1 = min(n, r0 + row_block)
+        Q = X[r0:r1]
+        best_ids = np.empty((r1 - r0, 0), dtype=np.int64)
+        best_scores = np.empty((r1 - r0, 0), dtype=np.float32)
+        for c0 in range(0, n, col_block):
+            c1 = min(n, c0 + col_block)
+            scores = Q @ X[c0:c1].T
+            scores = np.asarray(scores.toarray() if sp.issparse(scores) else scores, dtype=np.float32)
+            lo, hi = max(r0, c0), min(r1, c1)
+            if lo < hi:
+                diag = np.arange(lo, hi)
+                scores[diag - r0, diag - c0] = -np.inf
+            cand_scores = np.concatenate([best_scores, scores], axis=1)
+            cand_ids = np.concatenate([best_ids, np.broadcast_to(np.arange(c0, c1), scores.shape)], axis=1)
+            keep = top_k(cand_scores, k)
+            best_scores = np.take_along_axis(cand_scores, keep, axis=1)
+            best_ids = np.take_along_axis(cand_ids, keep, axis=1)
+        return best_ids, best_scores
+
+    with timed("similarity.knn", items=n), ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count() or 1) as pool:
+        parts = list(pool.map(block, range(0, n, row_block)))
+
+    ids = np.concatenate([p[0] for p in parts])
+    scores = np.concatenate([p[1] for p in parts])
+    rows = np.repeat(np.arange(n), k)
+    valid = np.isfinite(scores.ravel())
+    return sp.csr_matrix((scores.ravel()[valid], (rows[valid], ids.ravel()[valid])), shape=(n, n), dtype=np.float32)
+
+
+def top_neighbors(knn, n_neighbors):
+    """The `n_neighbors` most similar entries of each row of a kNN graph built with more."""
+    rows = np.repeat(np.arange(knn.shape[0]), np.diff(knn.indptr))
+    order = np.lexsort((-knn.data, rows))
+    rank = np.arange(knn.nnz) - knn.indptr[rows[order]]
+    keep = order[rank < n_neighbors]
+    return sp.csr_matrix((knn.data[keep], (rows[keep], knn.indices[keep])), shape=knn.shape, dtype=np.float32)
+
+
+def knn_path(version, mode, n_neighbors):
+    return cache_path("similarity", f"{version}-{mode}-{n_neighbors}.npz")
+
+
+def load_or_build_knn(embeddings, version, mode, n_neighbors=MAX_NEIGHBORS, normalized=False):
+    """kNN graph for one graph version and embedding mode, computed once and kept on disk."""
+    path = knn_path(version, mode, n_neighbors)
+    if os.path.exists(path):
+        return sp.load_npz(path).tocsr()
+    knn = knn_graph(embeddings, n_neighbors, normalized=normalized)
+    # Unique per writer, so processes building the same graph never write into each other's file.
+    tmp = f"{path}.tmp-{os.getpid()}-{uuid.uuid4().hex}.npz"
+    sp.save_npz(tmp, knn)
+    os.replace(tmp, path)
+    return knn
+
+
+def cross_domain_links(knn, nodes, domains, adjacency, min_score=0.3, limit=100):
+    """Similar node pairs that are not linked and sit in different domains, most similar first.
+
+    `domains` gives a domain id per entry of `nodes` (same order as the kNN
+    rows). Returns a DataFrame of source, target, similarity and both domain ids.
+    """
+    pairs = sp.triu(knn.maximum(knn.T), k=1).tocoo()
+    rows, cols, score = pairs.row, pairs.col, pairs.data
+    domains = np.asarray(domains)
+    keep = (score >= min_score) & (domains[rows] != domains[cols])
+    rows, cols, score = rows[keep], cols[keep], score[keep]
+
+    # Map kNN rows to adjacency rows by node name; both usually share the graph's node order.
+    a_rows = np.array([adjacency.index[nodes[i]] for i in rows], dtype=np.int64)
+    a_cols = np.array([adjacency.index[nodes[i]] for i in cols], dtype=np.int64)
+    linked = np.asarray(adjacency.matrix()[a_rows, a_cols]).ravel() > 0 if len(rows) else np.zeros(0, dtype=bool)
+    rows, cols, score = rows[~linked], cols[~linked], score[~linked]
+
+    best = top_k(score, limit)
+    return pd.DataFrame(
+        {
+            "source": [nodes[i] for i in rows[best]],
+            "target": [nodes[i] for i in cols[best]],
+            "similarity": score[best],
+            "source_domain": domains[rows[best]],
+            "target_domain": domains[cols[best]],
+        }
+    )
@@ -0,0 +1,320 @@
+"""Prebuilt graph snapshots: everything a fresh process needs to serve searches, in one directory.
+
+    python -m knowmap.snapshot [--quantize int8]   # write one for the current main store
+    python -m knowmap.snapshot --list --verify     # list snapshots and check their checksums
+
+A snapshot holds the triple store, node documents, node embeddings and
+vector index (or the TF-IDF model), the BM25 index, the CSR adjacency and
+the clustered layout of one graph version. Arrays are .npy files loaded
+memory-mapped, so opening a snapshot reads little more than its header.
+header.json carries the format number, graph version, size and blake2b
+checksum of every file, and a checksum of the header itself.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import time
+
+import networkx as nx
+import numpy as np
+
+from knowmap.adjacency import CSRAdjacency
+from knowmap.config import SNAPSHOT_DIR
+from knowmap.lexical import BM25Index
+from knowmap.lod import GraphSummary
+from knowmap.triple_store import TripleStore
+from knowmap.vector_index import ExactIndex, IVFIndex, QuantizedIndex
+
+log = logging.getLogger(__name__)
+
+FORMAT = 1
+HEADER = "header.json"
+KEEP_SNAPSHOTS = 2
+_HASH_BLOCK = 1 << 20
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def _file_digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _header_digest(header):
+    body = {k: v for k, v in header.items() if k != "checksum"}
+    return hashlib.blake2b(json.dumps(body, sort_keys=True).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _put_array(path, array):
+    """Save `array` as .npy; a whole memory-mapped .npy file is hard-linked (or copied) instead of rewritten."""
+    source = getattr(array, "filename", None)
+    if source and source.endswith(".npy") and np.load(source, mmap_mode="r").shape == array.shape:
+        try:
+            os.link(source, path)
+        except OSError:
+            shutil.copyfile(source, path)
+    else:
+        np.save(path, np.asarray(array))
+
+
+def _put_pickle(path, obj):
+    with open(path, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _put_json(path, obj):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+
+
+def snapshot_name(version, backend, quantize):
+    return f"{version}-{backend}-{quantize}"
+
+
+def write_snapshot(version, source, store, corpus, adjacency, summary, root=SNAPSHOT_DIR):
+    """Write one snapshot directory for graph `version` and return its path.
+
+    `corpus` is the engine's search corpus (nodes, docs, embeddings,
+    vectorizer, index, retriever, quantize, backend); its nodes must be in
+    the adjacency's order. The directory is assembled under a temporary
+    name and renamed into place once the header is written, so readers
+    never see a partial snapshot.
+    """
+    if list(corpus.nodes) != list(adjacency.nodes):
+        raise SnapshotError("Corpus and adjacency disagree on the node order.")
+    path = os.path.join(root, snapshot_name(version, corpus.backend, corpus.quantize))
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    def put(name, array):
+        _put_array(os.path.join(tmp, name), array)
+
+    store.save(os.path.join(tmp, "triples"))
+    _put_json(os.path.join(tmp, "documents.json"), {"nodes": [str(n) for n in corpus.nodes], "docs": list(corpus.docs)})
+    _put_json(os.path.join(tmp, "graph.json"), {"predicates": adjacency.predicates, "cluster_labels": summary.labels})
+    put("adjacency-sources.npy", adjacency.sources)
+    put("adjacency-targets.npy", adjacency.targets)
+    put("adjacency-offsets.npy", adjacency.offsets)
+
+    members = np.fromiter((adjacency.index[n] for cluster in summary.clusters for n in cluster), dtype=np.int64)
+    offsets = np.zeros(len(summary.clusters) + 1, dtype=np.int64)
+    np.cumsum([len(c) for c in summary.clusters], out=offsets[1:])
+    put("layout-members.npy", members)
+    put("layout-offsets.npy", offsets)
+    put("layout-positions.npy", np.array([summary.positions.get(c, (0.0, 0.0)) for c in range(len(summary.clusters))], dtype=np.float64).reshape(-1, 2))
+    put("layout-edges.npy", np.array(list(summary.super_graph.edges(data="weight")), dtype=np.int64).reshape(-1, 3))
+
+    index = {"kind": "none"}
+    if corpus.model is None:
+        _put_pickle(os.path.join(tmp, "tfidf.pkl"), {"vectorizer": corpus.vectorizer, "embeddings": corpus.embeddings})
+    else:
+        put("vectors.npy", corpus.embeddings)
+        if isinstance(corpus.index, QuantizedIndex):
+            index = {"kind": "quantized", "rerank": corpus.index.rerank}
+            put("codes.npy", corpus.index.codes)
+            if corpus.index.scales is not None:
+                put("scales.npy", corpus.index.scales)
+        elif isinstance(corpus.index, IVFIndex):
+            index = {"kind": "ivf", "n_probe": corpus.index.n_probe}
+            put("ivf-centroids.npy", corpus.index.centroids)
+            put("ivf-order.npy", corpus.index.order)
+            put("ivf-offsets.npy", corpus.index.offsets)
+        else:
+            index = {"kind": "exact"}
+        if corpus.retriever is not None:
+            corpus.retriever.lexical.save(os.path.join(tmp, "bm25.pkl"))
+
+    files = {}
+    for dirpath, _, names in os.walk(tmp):
+        for name in names:
+            full = os.path.join(dirpath, name)
+            files[os.path.relpath(full, tmp)] = {"bytes": os.path.getsize(full), "blake2b": _file_digest(full)}
+    header = {
+        "format": FORMAT,
+        "version": version,
+        "source": source,
+        "created": time.time(),
+        "backend": corpus.backend,
+        "quantize": corpus.quantize,
+        "nodes": len(adjacency),
+        "edges": int(len(adjacency.sources)),
+        "index": index,
+        "files": files,
+    }
+    header["checksum"] = _header_digest(header)
+    _put_json(os.path.join(tmp, HEADER), header)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    prune_snapshots(root, keep=path)
+    return path
+
+
+def read_header(path, verify=False):
+    """The snapshot header at `path`, checked against the files; `verify` also re-hashes every file."""
+    with open(os.path.join(path, HEADER), encoding="utf-8") as f:
+        header = json.load(f)
+    if header.get("format") != FORMAT:
+        raise SnapshotError(f"Snapshot format {header.get('format')} is not {FORMAT}.")
+    if header.get("checksum") != _header_digest(header):
+        raise SnapshotError("Snapshot header checksum does not match.")
+    for name, meta in header["files"].items():
+        full = os.path.join(path, name)
+        if not os.path.exists(full) or os.path.getsize(full) != meta["bytes"]:
+            raise SnapshotError(f"Snapshot file {name} is missing or has the wrong size.")
+        if verify and _file_digest(full) != meta["blake2b"]:
+            raise SnapshotError(f"Snapshot file {name} fails its checksum.")
+    return header
+
+
+def list_snapshots(root=SNAPSHOT_DIR):
+    """Paths of complete snapshots under `root`, newest first."""
+    if not os.path.isdir(root):
+        return []
+    paths = [os.path.join(root, d) for d in os.listdir(root) if ".tmp-" not in d]
+    paths = [p for p in paths if os.path.exists(os.path.join(p, HEADER))]
+    return sorted(paths, key=lambda p: os.path.getmtime(os.path.join(p, HEADER)), reverse=True)
+
+
+def prune_snapshots(root=SNAPSHOT_DIR, keep=None):
+    for old in [p for p in list_snapshots(root) if p != keep][KEEP_SNAPSHOTS - 1:]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+class Snapshot:
+    """One opened snapshot: its header and memory-mapped parts.
+
+    Search parts are None when absent: `vectors`/`index`/`lexical` for a
+    TF-IDF snapshot, `vectorizer`/`tfidf` for a sentence-embedding one.
+    """
+
+    def __init__(self, path, header, store, nodes, docs, adjacency, summary, vectors=None, index=None, lexical=None, vectorizer=None, tfidf=None):
+        self.path = path
+        self.header = header
+        self.store = store
+        self.nodes = nodes
+        self.docs = docs
+        self.adjacency = adjacency
+        self.summary = summary
+        self.vectors = vectors
+        self.index = index
+        self.lexical = lexical
+        self.vectorizer = vectorizer
+        self.tfidf = tfidf
+
+    @property
+    def version(self):
+        return self.header["version"]
+
+    @property
+    def source(self):
+        return self.header["source"]
+
+    @property
+    def backend(self):
+        return self.header["backend"]
+
+    @property
+    def quantize(self):
+        return self.header["quantize"]
+
+
+def load_snapshot(path, verify=False):
+    header = read_header(path, verify=verify)
+
+    def array(name):
+        return np.load(os.path.join(path, name), mmap_mode="r")
+
+    def has(name):
+        return name in header["files"]
+
+    with open(os.path.join(path, "documents.json"), encoding="utf-8") as f:
+        documents = json.load(f)
+    with open(os.path.join(path, "graph.json"), encoding="utf-8") as f:
+        graph = json.load(f)
+    nodes = documents["nodes"]
+
+    adjacency = CSRAdjacency.from_arrays(nodes, graph["predicates"], array("adjacency-sources.npy"), array("adjacency-targets.npy"), array("adjacency-offsets.npy"))
+
+    members, offsets = array("layout-members.npy"), array("layout-offsets.npy")
+    clusters = [[nodes[i] for i in members[offsets[c]:offsets[c + 1]]] for c in range(len(offsets) - 1)]
+    membership = {n: c for c, cluster in enumerate(clusters) for n in cluster}
+    positions = {c: (float(x), float(y)) for c, (x, y) in enumerate(array("layout-positions.npy"))}
+    super_graph = nx.Graph()
+    for c, cluster in enumerate(clusters):
+        super_graph.add_node(c, size=len(cluster))
+    super_graph.add_weighted_edges_from((int(u), int(v), int(w)) for u, v, w in array("layout-edges.npy"))
+    summary = GraphSummary(membership, clusters, graph["cluster_labels"], super_graph, positions)
+
+    parts = {}
+    if has("tfidf.pkl"):
+        with open(os.path.join(path, "tfidf.pkl"), "rb") as f:
+            tfidf = pickle.load(f)
+        parts.update(vectorizer=tfidf["vectorizer"], tfidf=tfidf["embeddings"])
+    if has("vectors.npy"):
+        vectors = array("vectors.npy")
+        kind = header["index"]["kind"]
+        if kind == "quantized":
+            index = QuantizedIndex(vectors, array("codes.npy"), array("scales.npy") if has("scales.npy") else None, rerank=header["index"]["rerank"])
+        elif kind == "ivf":
+            index = IVFIndex.from_arrays(vectors, array("ivf-centroids.npy"), array("ivf-order.npy"), array("ivf-offsets.npy"), header["index"]["n_probe"])
+        else:
+            index = ExactIndex(vectors, normalized=True)
+        parts.update(vectors=vectors, index=index)
+    if has("bm25.pkl"):
+        parts["lexical"] = BM25Index.load(os.path.join(path, "bm25.pkl"))
+
+    store = TripleStore.load(os.path.join(path, "triples"))
+    return Snapshot(path, header, store, nodes, documents["docs"], adjacency, summary, **parts)
+
+
+def find_snapshot(source=None, root=SNAPSHOT_DIR, verify=False):
+    """The newest usable snapshot of triple store version `source` (of any source when None), or None."""
+    for path in list_snapshots(root):
+        try:
+            header = read_header(path)
+            if source is None or header["source"] == source:
+                return load_snapshot(path, verify=verify)
+        except (OSError, ValueError, KeyError) as e:
+            log.warning("Skipping snapshot %s: %s", path, e)
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m knowmap.snapshot", description=__doc__.splitlines()[0])
+    parser.add_argument("--quantize", default=None, help="embedding precision of the snapshot: none, float16 or int8")
+    parser.add_argument("--list", action="store_true", help="list snapshots instead of writing one")
+    parser.add_argument("--verify", action="store_true", help="with --list, re-hash every file against the header")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if args.list:
+        for path in list_snapshots():
+            try:
+                header = read_header(path, verify=args.verify)
+                status = f"{header['nodes']} nodes, {header['edges']} edges, {header['backend']}/{header['quantize']}"
+            except (OSError, ValueError, KeyError) as e:
+                status = f"INVALID: {e}"
+            print(f"{os.path.basename(path)}: {status}")
+        return
+
+    from knowmap.engine import GraphEngine
+
+    engine = GraphEngine()
+    engine.refresh()
+    print(engine.snapshot(quantize=args.quantize, wait=True)["path"])
+
+
+if __name__ == "__main__":
+    main()
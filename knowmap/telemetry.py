@@ -0,0 +1,182 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from knowmap.config import cache_path
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, so memory peaks are not recorded
+    resource = None
+
+# Set KNOWMAP_TELEMETRY=0 to turn recording off; reads still work.
+ENABLED = os.environ.get("KNOWMAP_TELEMETRY", "1") != "0"
+RETENTION_DAYS = float(os.environ.get("KNOWMAP_TELEMETRY_DAYS", "7"))
+
+# Samples are buffered in memory and written in batches on a background
+# thread, so a hot path pays for a list append rather than an SQLite transaction.
+FLUSH_EVERY = 256
+FLUSH_SECONDS = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    ts REAL NOT NULL,
+    name TEXT NOT NULL,
+    seconds REAL,
+    items INTEGER,
+    hits INTEGER,
+    misses INTEGER,
+    rss_peak INTEGER
+);
+CREATE INDEX IF NOT EXISTS samples_name_ts ON samples (name, ts);
+"""
+
+_buffer = []
+_lock = threading.Lock()
+_last_flush = time.time()
+_flusher = None
+
+
+def _db():
+    db = sqlite3.connect(cache_path("telemetry", "metrics.db"), timeout=30)
+    db.executescript(_SCHEMA)
+    return db
+
+
+def peak_rss():
+    """High-water mark of this process's resident memory, in bytes."""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def record(name, seconds=None, items=None, hits=None, misses=None):
+    """Queue one sample for `name`."""
+    global _last_flush
+    if not ENABLED:
+        return
+    sample = (time.time(), name, seconds, items, hits, misses, peak_rss())
+    with _lock:
+        _buffer.append(sample)
+        due = len(_buffer) >= FLUSH_EVERY or sample[0] - _last_flush >= FLUSH_SECONDS
+    if due:
+        _flush_in_background()
+
+
+def _flush_in_background():
+    """Start a flush on its own thread unless one is already running; the caller never waits on SQLite."""
+    global _flusher
+    with _lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=flush, name="knowmap-telemetry-flush", daemon=True)
+        _flusher.start()
+
+
+def flush():
+    """Write buffered samples and drop ones older than the retention window."""
+    global _last_flush
+    with _lock:
+        pending = _buffer[:]
+        del _buffer[:]
+        _last_flush = time.time()
+    if not pending:
+        return
+    try:
+        with _db() as db:
+            db.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?)", pending)
+            db.execute("DELETE FROM samples WHERE ts < ?", (time.time() - RETENTION_DAYS * 86400,))
+    except sqlite3.Error:
+        # Telemetry must never take the app down; a lost batch is acceptable.
+        pass
+
+
+atexit.register(flush)
+
+
+class Span:
+    """Mutable handle yielded by timed(); set `items` once the amount of work is known."""
+
+    def __init__(self, items=None):
+        self.items = items
+        self.hits = None
+        self.misses = None
+
+
+@contextmanager
+def timed(name, items=None):
+    """Record how long the block takes (only when it finishes without raising)."""
+    span = Span(items)
+    start = time.perf_counter()
+    yield span
+    record(name, time.perf_counter() - start, span.items, span.hits, span.misses)
+
+
+def instrument(name, items=None):
+    """Decorator form of timed(); `items(*args, **kwargs)` can size the call."""
+
+    def wrap(func):
+        def wrapper(*args, **kwargs):
+            with timed(name, items(*args, **kwargs) if items else None):
+                return func(*args, **kwargs)
+
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    return wrap
+
+
+def load_samples(since_seconds=86400, names=None):
+    """Samples from the last `since_seconds`, oldest first, as a DataFrame."""
+    flush()
+    query = "SELECT * FROM samples WHERE ts >= ?"
+    params = [time.time() - since_seconds]
+    if names:
+        query += f" AND name IN ({', '.join('?' * len(names))})"
+        params.extend(names)
+    with _db() as db:
+        df = pd.read_sql_query(query + " ORDER BY ts", db, params=params)
+    df["time"] = pd.to_datetime(df["ts"], unit="s")
+    return df
+
+
+def latency_summary(samples):
+    """Per operation: calls, latency percentiles (ms), throughput and cache hit rate."""
+    rows = []
+    for name, g in samples.groupby("name", sort=True):
+        seconds = g["seconds"].dropna().to_numpy()
+        items = g["items"].dropna()
+        hits, misses = g["hits"].sum(), g["misses"].sum()
+        p50, p95, p99 = np.percentile(seconds, [50, 95, 99]) * 1000 if len(seconds) else (np.nan,) * 3
+        rows.append(
+            {
+                "operation": name,
+                "calls": len(g),
+                "p50_ms": p50,
+                "p95_ms": p95,
+                "p99_ms": p99,
+                "items_per_sec": items.sum() / g.loc[items.index, "seconds"].sum() if len(items) and g.loc[items.index, "seconds"].sum() > 0 else np.nan,
+                "hit_rate": hits / (hits + misses) if hits + misses else np.nan,
+            }
+        )
+    return pd.DataFrame(rows, columns=["operation", "calls", "p50_ms", "p95_ms", "p99_ms", "items_per_sec", "hit_rate"])
+
+
+def latency_histogram(samples, name, bins=30):
+    """Log-spaced latency histogram (ms) for one operation."""
+    ms = samples.loc[samples["name"] == name, "seconds"].dropna().to_numpy() * 1000
+    if not len(ms):
+        return pd.DataFrame({"latency_ms": [], "count": []})
+    edges = np.geomspace(max(ms.min(), 1e-3), max(ms.max(), 1e-3) * 1.0001, bins + 1)
+    counts, edges = np.histogram(ms, bins=edges)
+    return pd.DataFrame({"latency_ms": np.round(edges[:-1], 3), "count": counts})
@@ -0,0 +1,212 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from knowmap.config import CACHE_DIR
+from knowmap.generations import new_generation, publish, read_current, resolve
+
+MAIN_STORE = "main"
+EXTRACTED_STORE = "extracted"
+
+ID_DTYPE = np.int32
+COLUMNS = ("subject", "predicate", "object")
+
+
+class Vocabulary:
+    """String interning: each distinct string gets one dense integer id."""
+
+    def __init__(self, strings=()):
+        self.strings = list(strings)
+        self._ids = {s: i for i, s in enumerate(self.strings)}
+        self._array = None
+
+    def __len__(self):
+        return len(self.strings)
+
+    def intern(self, values):
+        """Ids for `values`, adding unseen strings. Only the distinct values are touched in Python."""
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+        ids = np.empty(len(uniques), dtype=ID_DTYPE)
+        for i, u in enumerate(uniques):
+            ids[i] = self._ids.setdefault(u, len(self.strings))
+            if ids[i] == len(self.strings):
+                self.strings.append(u)
+        self._array = None
+        return ids[codes] if len(codes) else np.empty(0, dtype=ID_DTYPE)
+
+    def id_of(self, s):
+        return self._ids.get(s)
+
+    def decode(self, ids):
+        if self._array is None or len(self._array) != len(self.strings):
+            self._array = np.asarray(self.strings, dtype=object)
+        return self._array[ids]
+
+
+def _group_index(column, size):
+    """(order, offsets) so that rows with id i are order[offsets[i]:offsets[i + 1]]."""
+    order = np.argsort(column, kind="stable").astype(np.int64)
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(column, minlength=size), out=offsets[1:])
+    return order, offsets
+
+
+class TripleStore:
+    """Array-backed triples: int32 subject/predicate/object columns over interned strings.
+
+    Entities (subjects and objects) share one vocabulary and predicates have
+    their own. Per-column group indexes answer "all rows with subject X"
+    with one slice. On disk each column and index is a .npy file, loaded
+    memory-mapped.
+    """
+
+    def __init__(self, terms=None, predicates=None, s=None, p=None, o=None, indexes=None, version=None):
+        self.terms = terms or Vocabulary()
+        self.predicates = predicates or Vocabulary()
+        self.s = np.empty(0, dtype=ID_DTYPE) if s is None else s
+        self.p = np.empty(0, dtype=ID_DTYPE) if p is None else p
+        self.o = np.empty(0, dtype=ID_DTYPE) if o is None else o
+        self._indexes = indexes or {}
+        self.version = version or f"{time.time_ns():x}-{len(self.s)}"
+
+    def __len__(self):
+        return len(self.s)
+
+    @classmethod
+    def from_triples(cls, triples):
+        triples = list(triples)
+        if not triples:
+            return cls()
+        subjects, predicates, objects = zip(*triples)
+        return cls().append(subjects, predicates, objects)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build from a DataFrame with subject/predicate/object columns (rows with gaps are dropped)."""
+        df = df[list(COLUMNS)].dropna()
+        return cls().append(*(df[c].astype(str).to_numpy() for c in COLUMNS))
+
+    def append(self, subjects, predicates, objects):
+        """Return a new store with the given triples added (vocabularies are shared)."""
+        n = len(subjects)
+        ids = self.terms.intern(np.concatenate([np.asarray(subjects, dtype=object), np.asarray(objects, dtype=object)]))
+        return TripleStore(
+            self.terms,
+            self.predicates,
+            np.concatenate([self.s, ids[:n]]),
+            np.concatenate([self.p, self.predicates.intern(predicates)]),
+            np.concatenate([self.o, ids[n:]]),
+        )
+
+    def extend(self, other):
+        return self.append(*other.columns())
+
+    def columns(self):
+        """Decoded (subjects, predicates, objects) object arrays."""
+        return self.terms.decode(self.s), self.predicates.decode(self.p), self.terms.decode(self.o)
+
+    def iter_triples(self):
+        return zip(*self.columns())
+
+    def to_frame(self):
+        return pd.DataFrame(
+            {
+                "subject": pd.Categorical.from_codes(self.s, categories=pd.Index(self.terms.strings, dtype=object)),
+                "predicate": pd.Categorical.from_codes(self.p, categories=pd.Index(self.predicates.strings, dtype=object)),
+                "object": pd.Categorical.from_codes(self.o, categories=pd.Index(self.terms.strings, dtype=object)),
+            }
+        )
+
+    def _index(self, name):
+        if name not in self._indexes:
+            size = len(self.predicates) if name == "p" else len(self.terms)
+            self._indexes[name] = _group_index(getattr(self, name), size)
+        return self._indexes[name]
+
+    def _rows(self, name, vocab, value):
+        i = vocab.id_of(value)
+        order, offsets = self._index(name)
+        # Vocabularies are shared with stores derived by append(), so ids can outgrow this index.
+        if i is None or i + 1 >= len(offsets):
+            return np.empty(0, dtype=np.int64)
+        return order[offsets[i]:offsets[i + 1]]
+
+    def rows_with_subject(self, term):
+        return self._rows("s", self.terms, term)
+
+    def rows_with_object(self, term):
+        return self._rows("o", self.terms, term)
+
+    def rows_with_predicate(self, predicate):
+        return self._rows("p", self.predicates, predicate)
+
+    def save(self, path):
+        """Write the store as a new generation under `path` and publish it (see knowmap.generations).
+
+        Overwriting a store therefore never shows readers a mix of old and
+        new columns.
+        """
+        os.makedirs(path, exist_ok=True)
+        path = new_generation(path)
+
+        def put(name, array):
+            np.save(os.path.join(path, f"{name}.npy"), array)
+
+        for name in ("s", "p", "o"):
+            put(name, getattr(self, name))
+            order, offsets = self._index(name)
+            put(f"{name}_order", order)
+            put(f"{name}_offsets", offsets)
+
+        vocab = {"terms": self.terms.strings, "predicates": self.predicates.strings}
+        with open(os.path.join(path, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(vocab, f)
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "count": len(self)}, f)
+        publish(path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        return read_current(path, lambda generation: cls._load_generation(generation, mmap))
+
+    @classmethod
+    def _load_generation(cls, path, mmap):
+        mode = "r" if mmap else None
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(path, "vocab.json"), "r", encoding="utf-8") as f:
+            vocab = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in ("s", "p", "o")}
+        indexes = {
+            name: (
+                np.load(os.path.join(path, f"{name}_order.npy"), mmap_mode=mode),
+                np.load(os.path.join(path, f"{name}_offsets.npy"), mmap_mode=mode),
+            )
+            for name in ("s", "p", "o")
+        }
+        return cls(Vocabulary(vocab["terms"]), Vocabulary(vocab["predicates"]), indexes=indexes, version=meta["version"], **arrays)
+
+
+def store_path(name):
+    return os.path.join(CACHE_DIR, "triples", name)
+
+
+def stored_version(name):
+    """Version of the named on-disk store, or None if it has not been written yet."""
+    try:
+        with open(os.path.join(resolve(store_path(name)), "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)["version"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def load_store(name):
+    return TripleStore.load(store_path(name)) if stored_version(name) else None
+
+
+def save_store(name, store):
+    store.save(store_path(name))
+    return store
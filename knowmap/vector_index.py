@@ -0,0 +1,216 @@
+import time
+
+import numpy as np
+
+# Below this many vectors a brute-force scan is already sub-millisecond
+# territory and beats the coarse-quantizer overhead of IVF.
+IVF_MIN_SIZE = 20000
+
+# Quantized scans keep this many times k candidates for the full-precision re-rank.
+RERANK_FACTOR = 4
+SCAN_BLOCK = 65536
+
+
+def normalize_rows(x):
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+def top_k(scores, k):
+    """Indices of the k largest scores along the last axis, best first.
+
+    Uses argpartition (O(n)) and only sorts the k survivors instead of
+    argsorting the whole score vector.
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    if k < n:
+        part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        part = np.broadcast_to(np.arange(n), scores.shape).copy()
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(part, order, axis=-1)
+
+
+class ExactIndex:
+    """Brute-force cosine search; the reference every other index is measured against."""
+
+    kind = "exact"
+
+    def __init__(self, embeddings, normalized=False):
+        # Already-normalized input (e.g. a shared memory-mapped matrix) is used as is, not copied.
+        self.vectors = embeddings if normalized else normalize_rows(embeddings)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, queries, k):
+        """Return (ids, scores), each shaped (n_queries, k)."""
+        q = normalize_rows(np.atleast_2d(queries))
+        sims = q @ self.vectors.T
+        ids = top_k(sims, k)
+        return ids, np.take_along_axis(sims, ids, axis=-1)
+
+
+class IVFIndex:
+    """Inverted-file index: spherical k-means cells, probe the closest few per query."""
+
+    kind = "ivf"
+
+    def __init__(self, embeddings, n_lists=None, n_probe=None, n_iter=10, seed=0, normalized=False):
+        self.vectors = embeddings if normalized else normalize_rows(embeddings)
+        n = len(self.vectors)
+        self.n_lists = max(1, min(n, n_lists or int(4 * np.sqrt(n))))
+        self.n_probe = max(1, min(self.n_lists, n_probe or max(8, self.n_lists // 32)))
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(n, 64 * self.n_lists)
+        sample = np.asarray(self.vectors[np.sort(rng.choice(n, sample_size, replace=False))])
+        centroids = sample[rng.choice(sample_size, self.n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assign = self._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=self.n_lists)
+            empty = counts == 0
+            # Re-seed empty cells from random sample points so no list goes unused.
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            centroids = normalize_rows(sums)
+        self.centroids = centroids
+
+        assign = self._assign(self.vectors, centroids)
+        self.order = np.argsort(assign, kind="stable")
+        self.offsets = np.zeros(self.n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=self.n_lists), out=self.offsets[1:])
+
+    @classmethod
+    def from_arrays(cls, vectors, centroids, order, offsets, n_probe):
+        """An index over normalized `vectors` from previously trained cells, without re-running k-means."""
+        index = cls.__new__(cls)
+        index.vectors = vectors
+        index.centroids = centroids
+        index.order = order
+        index.offsets = offsets
+        index.n_lists = len(centroids)
+        index.n_probe = n_probe
+        return index
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @staticmethod
+    def _assign(x, centroids, chunk=65536):
+        out = np.empty(len(x), dtype=np.int64)
+        for start in range(0, len(x), chunk):
+            out[start:start + chunk] = (x[start:start + chunk] @ centroids.T).argmax(axis=1)
+        return out
+
+    def search(self, queries, k, n_probe=None):
+        q = normalize_rows(np.atleast_2d(queries))
+        probes = top_k(q @ self.centroids.T, n_probe or self.n_probe)
+        ids = np.full((len(q), k), -1, dtype=np.int64)
+        scores = np.full((len(q), k), -np.inf, dtype=np.float32)
+        for i, lists in enumerate(probes):
+            cand = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in lists])
+            sims = self.vectors[cand] @ q[i]
+            best = top_k(sims, k)
+            ids[i, :len(best)] = cand[best]
+            scores[i, :len(best)] = sims[best]
+        return ids, scores
+
+
+def quantize_int8(vectors):
+    """Symmetric per-row int8 codes and float32 scales, so vectors ~= codes * scales[:, None]."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class QuantizedIndex:
+    """Brute-force scan over int8 or float16 codes, re-ranked on the full-precision vectors.
+
+    The scan reads 1/4 (int8) or 1/2 (float16) of the bytes of an exact
+    scan and keeps rerank x k candidates per query. Only those candidate
+    rows of the float32 matrix are touched, so with memory-mapped inputs
+    the full-precision vectors mostly stay out of resident memory.
+    `vectors` must already be L2-normalized.
+    """
+
+    def __init__(self, vectors, codes, scales=None, rerank=RERANK_FACTOR):
+        self.vectors = vectors
+        self.codes = codes
+        self.scales = scales
+        self.rerank = rerank
+        self.kind = f"{np.dtype(codes.dtype).name}+rerank"
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def _approx(self, q, start, stop):
+        block = np.asarray(self.codes[start:stop], dtype=np.float32)
+        scores = q @ block.T
+        if self.scales is not None:
+            scores *= np.asarray(self.scales[start:stop])
+        return scores
+
+    def search(self, queries, k):
+        q = normalize_rows(np.atleast_2d(queries))
+        n_cand = min(len(self), max(k, k * self.rerank))
+        cand = np.empty((len(q), 0), dtype=np.int64)
+        cand_scores = np.empty((len(q), 0), dtype=np.float32)
+        for start in range(0, len(self), SCAN_BLOCK):
+            stop = min(len(self), start + SCAN_BLOCK)
+            scores = np.concatenate([cand_scores, self._approx(q, start, stop)], axis=1)
+            ids = np.concatenate([cand, np.broadcast_to(np.arange(start, stop), (len(q), stop - start))], axis=1)
+            keep = top_k(scores, n_cand)
+            cand, cand_scores = np.take_along_axis(ids, keep, axis=1), np.take_along_axis(scores, keep, axis=1)
+
+        ids = np.full((len(q), k), -1, dtype=np.int64)
+        out = np.full((len(q), k), -np.inf, dtype=np.float32)
+        for i, row in enumerate(cand):
+            row = np.sort(row)
+            exact = np.asarray(self.vectors[row]) @ q[i]
+            best = top_k(exact, k)
+            ids[i, :len(best)] = row[best]
+            out[i, :len(best)] = exact[best]
+        return ids, out
+
+
+INDEX_TYPES = {"exact": ExactIndex, "ivf": IVFIndex}
+
+
+def build_index(embeddings, kind="auto", **params):
+    """Build a vector index once from the node embedding matrix."""
+    if kind == "auto":
+        kind = "ivf" if len(embeddings) >= IVF_MIN_SIZE else "exact"
+    return INDEX_TYPES[kind](embeddings, **params)
+
+
+def recall_report(index, k=10, n_queries=100, seed=0):
+    """Recall@k of `index` against the exact path, using node vectors as queries."""
+    exact = index if isinstance(index, ExactIndex) else ExactIndex(index.vectors, normalized=True)
+    rng = np.random.default_rng(seed)
+    queries = np.asarray(index.vectors[np.sort(rng.choice(len(index), min(n_queries, len(index)), replace=False))])
+
+    t0 = time.perf_counter()
+    truth, _ = exact.search(queries, k)
+    t1 = time.perf_counter()
+    found, _ = index.search(queries, k)
+    t2 = time.perf_counter()
+
+    hits = sum(len(np.intersect1d(a, b[b >= 0])) for a, b in zip(truth, found))
+    return {
+        "index": index.kind,
+        "k": k,
+        "queries": len(queries),
+        "recall_at_k": hits / truth.size if truth.size else 1.0,
+        "exact_ms_per_query": 1000 * (t1 - t0) / max(1, len(queries)),
+        "index_ms_per_query": 1000 * (t2 - t1) / max(1, len(queries)),
+    }
@@ -1,59 +1,80 @@
-import streamlit as st
-import pandas as pd
-from io import StringIO
-
-if "logged_in" not in st.session_state or not st.session_state["logged_in"]:
-    st.error("You must be logged in to view this page.")
-    st.stop()
-
-
-st.title("📁 Dataset Manager & Triples Review")
-st.info("Upload new datasets (CSV, Excel) to be processed or review the currently loaded data.")
-
-st.subheader("Upload Dataset")
-uploaded_file = st.file_uploader(
-    "Choose a CSV or Excel file",
-    type=["csv", "xlsx"],
-    help="Upload a file containing text or pre-extracted triples."
-)
-
-if uploaded_file is not None:
-    try:
-        if uploaded_file.name.endswith(".csv"):
-            df = pd.read_csv(uploaded_file)
-        else:
-            df = pd.read_excel(uploaded_file)
-        
-        st.session_state["uploaded_df"] = df
-        st.session_state["data_source_name"] = uploaded_file.name
-        
-        st.success(f"Successfully loaded **{uploaded_file.name}** with {len(df)} rows.")
-        st.experimental_rerun() 
-
-    except Exception as e:
-        st.error(f"Error reading file: {e}")
-
-st.markdown("---")
-
-st.subheader("Current Working Dataset")
-
-if "uploaded_df" in st.session_state:
-    df = st.session_state["uploaded_df"]
-    source_name = st.session_state["data_source_name"]
-    
-    st.write(f"**Source:** `{source_name}` | **Rows:** `{len(df)}` | **Columns:** `{len(df.columns)}`")
-    
-    text_column = st.selectbox(
-        "Select the primary text column for Triple Extraction:",
-        df.columns,
-        key="text_column_selector"
-    )
-
-    st.markdown("#### Data Preview (Editable)")
-    st.data_editor(df, num_rows="dynamic", key="data_editor")
-    
-    if st.button("Save Changes to Working Dataset", type="primary"):
-        st.success("Changes saved to the working dataset in session state.")
-
-else:
+import streamlit as st
+import pandas as pd
+from io import StringIO
+
+from knowmap.ingest import ingest_csv, ingest_excel, read_page
+
+if "logged_in" not in st.session_state or not st.session_state["logged_in"]:
+    st.error("You must be logged in to view this page.")
+    st.stop()
+
+
+st.title("📁 Dataset Manager & Triples Review")
+st.info("Upload new datasets (CSV, Excel) to be processed or review the currently loaded data.")
+
+st.subheader("Upload Dataset")
+uploaded_file = st.file_uploader(
+    "Choose a CSV or Excel file",
+    type=["csv", "xlsx"],
+    help="Upload a file containing text or pre-extracted triples."
+)
+
+upload_id = None if uploaded_file is None else (uploaded_file.name, uploaded_file.size)
+
+if uploaded_file is not None and st.session_state.get("dataset_upload_id") != upload_id:
+    try:
+        progress = st.progress(0.0, text=f"Loading **{uploaded_file.name}**...")
+
+        def report(rows, rows_per_sec):
+            done = min(1.0, uploaded_file.tell() / max(1, uploaded_file.size))
+            progress.progress(done, text=f"Loaded {rows:,} rows ({rows_per_sec:,.0f} rows/sec)")
+
+        # Chunks are spilled to a local Parquet file; only the metadata stays in session state.
+        # The file this session loaded before is deleted once the new one is written.
+        replaces = st.session_state.get("dataset", {}).get("path")
+        if uploaded_file.name.endswith(".csv"):
+            dataset = ingest_csv(uploaded_file, on_progress=report, replaces=replaces)
+        else:
+            dataset = ingest_excel(uploaded_file, on_progress=report, replaces=replaces)
+        
+        st.session_state["dataset"] = dataset
+        st.session_state["data_source_name"] = uploaded_file.name
+        st.session_state["dataset_upload_id"] = upload_id
+        
+        st.success(f"Successfully loaded **{uploaded_file.name}** with {dataset['rows']:,} rows in {dataset['seconds']:,.1f}s ({dataset['rows_per_sec']:,.0f} rows/sec).")
+        st.rerun()
+
+    except Exception as e:
+        st.error(f"Error reading file: {e}")
+
+st.markdown("---")
+
+st.subheader("Current Working Dataset")
+
+if "dataset" in st.session_state:
+    dataset = st.session_state["dataset"]
+    source_name = st.session_state["data_source_name"]
+    
+    st.write(f"**Source:** `{source_name}` | **Rows:** `{dataset['rows']}` | **Columns:** `{len(dataset['columns'])}`")
+    
+    text_column = st.selectbox(
+        "Select the primary text column for Triple Extraction:",
+        dataset["columns"],
+        key="text_column_selector"
+    )
+
+    with st.expander("Column types (inferred from a sample)"):
+        st.dataframe(pd.DataFrame(dataset["dtypes"].items(), columns=["Column", "Type"]), hide_index=True, use_container_width=True)
+
+    st.markdown("#### Data Preview (Editable)")
+    col_size, col_page = st.columns(2)
+    page_size = col_size.selectbox("Rows per page", [50, 100, 500, 1000], index=1)
+    n_pages = max(1, -(-dataset["rows"] // page_size))
+    page = col_page.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1)
+    st.data_editor(read_page(dataset["path"], page - 1, page_size), num_rows="dynamic", key="data_editor")
+    
+    if st.button("Save Changes to Working Dataset", type="primary"):
+        st.success("Changes saved to the working dataset in session state.")
+
+else:
     st.warning("No dataset is currently loaded. Please upload a file above.")
\ No newline at end of file
@@ -1,229 +1,317 @@
-import streamlit as st
-import pandas as pd
-import networkx as nx
-from pyvis.network import Network
-from sklearn.metrics.pairwise import linear_kernel, cosine_similarity
-import streamlit.components.v1 as components
-import os
-import tempfile
-import sys 
-
-try:
-    from sentence_transformers import SentenceTransformer
-    import numpy as np
-    HAS_ST = True
-except ImportError:
-    st.warning("`sentence-transformers` not found. Falling back to TF-IDF (less accurate semantic search). Run: `pip install sentence-transformers numpy scikit-learn`")
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    HAS_ST = False
-
-
-if "logged_in" not in st.session_state or not st.session_state["logged_in"]:
-    st.error("You must be logged in to view this page.")
-    st.stop()
-
-
-TRIPLES = [
-    ("Asia", "has_topic", "Classical Mechanics"),
-    ("Asia", "has_topic", "Quantum Mechanics"),
-    ("Asia", "related_to", "Mathematics"),
-    ("Classical Mechanics", "has_concept", "Newton's Laws"),
-    ("Classical Mechanics", "has_concept", "Energy Conservation"),
-    ("Quantum Mechanics", "has_concept", "Wave Function"),
-    ("Quantum Mechanics", "has_concept", "Uncertainty Principle"),
-    ("Mathematics", "has_topic", "Calculus"),
-    ("Calculus", "used_in", "Classical Mechanics"),
-    ("Quantum Mechanics", "influences", "Philosophy"),
-    ("Philosophy", "has_topic", "Epistemology"),
-    ("History of Science", "has_figure", "Isaac Newton"),
-    ("History of Science", "has_figure", "Albert Einstein"),
-    ("Isaac Newton", "born_in", "1643"),
-    ("Albert Einstein", "born_in", "1879"),
-    ("Technology", "related_to", "Asia"),
-    ("Biology", "has_topic", "Genetics"),
-    ("Genetics", "has_concept", "DNA"),
-    ("DNA", "discovered_by", "Watson & Crick"),
-    ("Astronomy", "has_topic", "Astrophysics"),
-    ("Astrophysics", "related_to", "Asia"),
-    ("Concept A", "subconcept_of", "Asia"),
-    ("Concept B", "subconcept_of", "Asia"),
-    ("Sun", "is_a", "Star"),
-    ("Sun", "related_to", "Astrophysics"),
-    ("Sun", "has_feature", "Solar Flares"),
-    ("Solar Flares", "affects", "Space Weather"),
-    ("Space Weather", "affects", "Satellite Operations"),
-    ("Concept C", "linked_to", "History of Science"),
-    ("Sub-A1", "part_of", "Concept A"),
-    ("Sub-A2", "part_of", "Concept A"),
-    ("Sub-B1", "part_of", "Concept B"),
-    ("Sub-C1", "part_of", "Concept C"),
-    ("Technology", "used_in", "Satellite Operations"),
-    ("Philosophy", "influences", "History of Science"),
-    ("Mathematics", "used_in", "Astrophysics"),
-]
-
-NODE_SENTENCES = {
-    "Asia": "Physics is the natural science that studies matter, motion and behavior through space and time.",
-    "Classical Mechanics": "Classical mechanics deals with the motion of bodies under forces such as Newton's laws and energy conservation.",
-    "Quantum Mechanics": "Quantum mechanics studies physical phenomena at the scale of atoms and subatomic particles and includes the wave function and uncertainty principle.",
-    "Mathematics": "Mathematics provides the language and tools used in physical theories, including calculus and linear algebra.",
-    "Calculus": "Calculus is used for describing change and motion, including derivatives and integrals.",
-    "Newton's Laws": "Newton's laws are foundational principles describing how forces affect motion.",
-    "Energy Conservation": "Conservation of energy is a key principle in many physical and engineering systems.",
-    "Wave Function": "The wave function is a mathematical description of the quantum state of a system.",
-    "Uncertainty Principle": "Heisenberg's uncertainty principle limits the precision of position and momentum measurements.",
-    "Philosophy": "Philosophy studies fundamental questions about knowledge, existence, and reasoning.",
-    "History of Science": "The history of science traces the development of scientific ideas and influential figures.",
-    "Isaac Newton": "Isaac Newton, born 1643, formulated laws of motion and universal gravitation.",
-    "Albert Einstein": "Albert Einstein, born 1879, developed the theory of relativity and shaped modern physics.",
-    "Technology": "Technology is the application of scientific knowledge for practical purposes, such as satellites.",
-    "Biology": "Biology studies living organisms and life processes, including genetics and evolution.",
-    "Genetics": "Genetics is the study of heredity and genes, including DNA structure and function.",
-    "DNA": "DNA stores genetic information in living organisms.",
-    "Sun": "The Sun is a G-type main-sequence star at the center of the Solar System; it produces light and solar activity.",
-    "Solar Flares": "Solar flares are sudden eruptions of energy from the Sun's atmosphere that can affect space weather.",
-    "Space Weather": "Space weather describes variable conditions in space driven by solar activity and can impact satellites and communications.",
-    "Satellite Operations": "Satellite operations manage the functioning and control of satellites orbiting Earth.",
-    "Astrophysics": "Astrophysics applies principles of physics and mathematics to study astronomical objects and phenomena.",
-    "Concept A": "Concept A is a placeholder central concept in this demo KG.",
-    "Concept B": "Concept B is another demo concept that connects to Concept A.",
-    "Concept C": "Concept C deals with historical aspects in the demo.",
-    "Sub-A1": "Sub-A1 is a subtopic of Concept A.",
-    "Sub-A2": "Sub-A2 is a subtopic of Concept A.",
-    "Sub-B1": "Sub-B1 is a subtopic of Concept B.",
-    "Sub-C1": "Sub-C1 is a subtopic of Concept C.",
-}
-
-def build_graph(triples, sentences_map):
-    G = nx.Graph()
-    for s, p, o in triples:
-        if not G.has_node(s):
-            G.add_node(s, sentences=[sentences_map.get(s, s)])
-        if not G.has_node(o):
-            G.add_node(o, sentences=[sentences_map.get(o, o)])
-        if not G.has_edge(s, o):
-            G.add_edge(s, o, predicate=p)
-    return G
-
-@st.cache_resource(show_spinner="Preparing corpus and model...")
-def prepare_corpus_and_model(_graph, has_st_flag):
-    nodes = list(_graph.nodes())
-    docs = [f"{n}: {' '.join(_graph.nodes[n].get('sentences', [n]))}" for n in nodes]
-    
-    if has_st_flag:
-        try:
-            model = SentenceTransformer("all-MiniLM-L6-v2")
-            embeddings = model.encode(docs, show_progress_bar=False, convert_to_numpy=True)
-            return nodes, docs, model, embeddings, None
-        except Exception:
-            st.error("Failed to load Sentence Transformer model. Falling back to TF-IDF.")
-            has_st_flag = False
-
-    if not has_st_flag:
-        from sklearn.feature_extraction.text import TfidfVectorizer
-        vectorizer = TfidfVectorizer(stop_words="english")
-        embeddings = vectorizer.fit_transform(docs)
-        return nodes, docs, None, embeddings, vectorizer
-
-def semantic_search(query, nodes, docs, model, embeddings, vectorizer, top_k=5):
-    if not query:
-        return []
-    
-    if model is not None:
-        q_emb = model.encode([query], convert_to_numpy=True)
-        sims = cosine_similarity(q_emb, embeddings)[0]
-    elif vectorizer is not None:
-        q_vec = vectorizer.transform([query])
-        sims = linear_kernel(q_vec, embeddings).flatten()
-    else:
-        return [] 
-
-    idxs = sims.argsort()[::-1][:top_k]
-    return [(nodes[i], float(sims[i])) for i in idxs]
-
-def build_subgraph_from_matches(graph, matched_nodes, depth=1):
-    nodes = set(matched_nodes)
-    frontier = set(matched_nodes)
-    for _ in range(depth):
-        new = set()
-        for n in frontier:
-            new.update(graph.neighbors(n))
-        frontier = new - nodes
-        nodes.update(new)
-    return graph.subgraph(nodes).copy()
-
-def visualize_graph(G, height=500):
-    net = Network(height=f"{height}px", width="100%", bgcolor="#222222", font_color="white", cdn_resources="local")
-    
-    # Add nodes and edges
-    for n, attr in G.nodes(data=True):
-        net.add_node(n, label=n, title=" ".join(attr.get("sentences", [n])), color="#87ceeb", size=20)
-    for u, v, attr in G.edges(data=True):
-        net.add_edge(u, v, title=attr.get("predicate", ""), color="#7fffd4")
-        
-    tmp_dir = tempfile.gettempdir()
-    tmp_path = os.path.join(tmp_dir, "graph.html")
-    net.save_graph(tmp_path)
-    
-    with open(tmp_path, "r", encoding="utf-8") as f:
-        html = f.read()
-    components.html(html, height=height)
-
-
-st.title("🌐 Knowledge Graph & Semantic Search")
-st.info("Upload your dataset, explore knowledge graphs, and perform semantic search.")
-
-st.sidebar.header("📂 Dataset Upload")
-uploaded_file = st.sidebar.file_uploader("Upload dataset (CSV or Excel)", type=["csv", "xlsx"])
-
-if uploaded_file is not None:
-    try:
-        if uploaded_file.name.endswith(".csv"):
-            df = pd.read_csv(uploaded_file)
-        else:
-            df = pd.read_excel(uploaded_file)
-
-        if all(col in df.columns for col in ["subject", "predicate", "object"]):
-            uploaded_triples = list(df[["subject", "predicate", "object"]].itertuples(index=False, name=None))
-            TRIPLES = uploaded_triples  
-            st.sidebar.success(f"Loaded {len(uploaded_triples)} triples from uploaded dataset.")
-            
-            st.cache_data.clear()
-            st.cache_resource.clear()
-        else:
-            st.sidebar.error("File must contain columns: subject, predicate, object.")
-    except Exception as e:
-        st.sidebar.error(f"Error reading file: {e}")
-
-KG = build_graph(TRIPLES, NODE_SENTENCES)
-nodes, docs, model, embeddings, vectorizer = prepare_corpus_and_model(KG, HAS_ST)
-
-
-col1, col2 = st.columns([3, 2])
-with col1:
-    st.subheader("Full Graph View")
-    visualize_graph(KG, height=600)
-
-with col2:
-    st.subheader("🔍 Semantic Search")
-    q = st.text_input("Enter search query", placeholder="e.g. quantum mechanics, Sun, calculus")
-    k = st.slider("Top-K matches", 1, 10, 5)
-    depth = st.slider("Expansion depth", 0, 3, 1)
-    
-    if st.button("Search", use_container_width=True):
-        if not q.strip():
-            st.warning("Please enter a query to search.")
-        else:
-            results = semantic_search(q, nodes, docs, model, embeddings, vectorizer, top_k=k)
-            
-            if not results:
-                st.warning("No matches found.")
-            else:
-                st.markdown("**Top Matches:**")
-                results_df = pd.DataFrame(results, columns=['Concept', 'Similarity Score'])
-                st.dataframe(results_df, hide_index=True, use_container_width=True)
-                
-                matched_nodes = [n for n, _ in results]
-                sub = build_subgraph_from_matches(KG, matched_nodes, depth)
-                st.markdown("### Subgraph View")
-                visualize_graph(sub, height=400)
\ No newline at end of file
+import streamlit as st
+import pandas as pd
+import streamlit.components.v1 as components
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from knowmap.config import EMBEDDING_QUANTIZATION, SERVICE_URL
+from knowmap.engine import GraphEngine
+from knowmap.models import has_package
+from knowmap.search import merge_matches
+from knowmap.service import ServiceClient, ServiceError
+from knowmap.telemetry import timed
+from knowmap.triple_store import MAIN_STORE, TripleStore, save_store
+
+
+if "logged_in" not in st.session_state or not st.session_state["logged_in"]:
+    st.error("You must be logged in to view this page.")
+    st.stop()
+
+
+EMBEDDING_PRECISIONS = {"none": "float32", "float16": "float16 + re-rank", "int8": "int8 + re-rank"}
+RELATION_DIRECTIONS = {"in": "Incoming (… → concept)", "out": "Outgoing (concept → …)", "both": "Either direction"}
+RELATION_LIMIT = 500
+RANKINGS = {"similarity": "Similarity", "importance": "Similarity × importance"}
+CENTRALITIES = {"pagerank": "PageRank", "betweenness": "Betweenness (sampled)", "degree": "Degree"}
+# Threads shared by every session for backend calls, one pool per kind of work so a search never queues
+# behind renders, and how often a waiting run refreshes its progress note.
+POOL_WORKERS = {"search": 4, "render": 4}
+STAGE_POOLS = {"search": "search", "batch": "search", "graph": "render", "subgraph": "render"}
+POLL_SECONDS = 0.2
+
+@st.cache_resource(show_spinner="Building knowledge graph...")
+def get_backend():
+    """The shared graph service when KNOWMAP_SERVICE_URL is set, otherwise one in-process engine.
+
+    Either way the graph, embeddings and indexes are held once and shared
+    by every session; the page only sends queries and shows the results.
+    """
+    if SERVICE_URL:
+        return ServiceClient(SERVICE_URL)
+    return GraphEngine()
+
+@st.cache_resource
+def get_executors():
+    return {name: ThreadPoolExecutor(max_workers=n, thread_name_prefix=f"knowmap-page-{name}") for name, n in POOL_WORKERS.items()}
+
+def submit(stage, key, fn, **kwargs):
+    """Run `fn(**kwargs)` on the stage's worker pool as this session's `stage`, and return its future.
+
+    While `key` is unchanged the session's earlier future is reused, so a
+    rerun picks up work that is already running (or done) instead of
+    starting it again. A new key cancels the old future; if it has already
+    started, its result is simply never read.
+    """
+    pending = st.session_state.setdefault("kg_pending", {})
+    old = pending.get(stage)
+    if old is not None and old[0] == key and not (old[1].done() and old[1].exception() is not None):
+        return old[1]
+    drop(stage)
+    future = get_executors()[STAGE_POOLS[stage]].submit(fn, **kwargs)
+    pending[stage] = (key, future)
+    return future
+
+def drop(stage):
+    old = st.session_state.get("kg_pending", {}).pop(stage, None)
+    if old is not None:
+        old[1].cancel()
+
+def wait_for(future, status, message):
+    """The result of `future`, with a progress note in the `status` placeholder until it arrives.
+
+    Updating the note hands control back to Streamlit, so a changed input
+    stops this run right away instead of after the wait.
+    """
+    start = time.perf_counter()
+    while not wait([future], timeout=POLL_SECONDS).done:
+        status.caption(f"⏳ {message}... {time.perf_counter() - start:.1f}s")
+    status.empty()
+    return future.result()
+
+def search_with_importance(query, k, hybrid, quantize, rank, with_importance):
+    """Matches for `query`, plus each match's importance when it is shown (it needs the graph analytics)."""
+    results = backend.search(query=query, k=k, hybrid=hybrid, quantize=quantize, rank=rank)
+    return results, backend.importance(nodes=[n for n, _ in results]) if results and with_importance else None
+
+def show_html(html, height):
+    components.html(html, height=height)
+
+
+st.title("🌐 Knowledge Graph & Semantic Search")
+st.info("Upload your dataset, explore knowledge graphs, and perform semantic search.")
+
+st.sidebar.header("📂 Dataset Upload")
+uploaded_file = st.sidebar.file_uploader("Upload dataset (CSV or Excel)", type=["csv", "xlsx"])
+
+backend = get_backend()
+upload_id = None if uploaded_file is None else (uploaded_file.name, uploaded_file.size)
+
+try:
+    if uploaded_file is not None and st.session_state.get("kg_upload_id") != upload_id:
+        try:
+            with timed("kg.upload_parse") as span:
+                if uploaded_file.name.endswith(".csv"):
+                    df = pd.read_csv(uploaded_file)
+                else:
+                    df = pd.read_excel(uploaded_file)
+                span.items = len(df)
+
+            if all(col in df.columns for col in ["subject", "predicate", "object"]):
+                # The main store on disk is the hand-off point; the backend picks it up on refresh.
+                uploaded_store = save_store(MAIN_STORE, TripleStore.from_frame(df))
+                change = backend.refresh()
+                st.session_state["kg_upload_id"] = upload_id
+                st.sidebar.success(f"Loaded {len(uploaded_store)} triples from uploaded dataset (+{change['added']} / -{change['removed']} vs. current graph).")
+            else:
+                st.sidebar.error("File must contain columns: subject, predicate, object.")
+        except ServiceError:
+            raise
+        except Exception as e:
+            st.sidebar.error(f"Error reading file: {e}")
+
+    backend.refresh()
+    quantize = EMBEDDING_QUANTIZATION
+    if SERVICE_URL or has_package("sentence_transformers"):
+        quantize = st.sidebar.selectbox(
+            "Embedding precision",
+            list(EMBEDDING_PRECISIONS),
+            index=list(EMBEDDING_PRECISIONS).index(EMBEDDING_QUANTIZATION) if EMBEDDING_QUANTIZATION in EMBEDDING_PRECISIONS else 0,
+            format_func=EMBEDDING_PRECISIONS.get,
+            help="Quantized scans read less memory; the final top-k is re-ranked on full-precision vectors.",
+        )
+    with st.spinner("Preparing corpus and model..."):
+        info = backend.info(quantize=quantize)
+    # Writes this version's snapshot for fast restarts on a background thread, once; never waits for it.
+    backend.snapshot(quantize=quantize)
+except ServiceError as e:
+    st.error(f"Knowledge graph service error: {e}")
+    st.stop()
+
+if info["search_backend"] == "tfidf":
+    if info["sentence_model_available"]:
+        st.error("Failed to load Sentence Transformer model. Falling back to TF-IDF.")
+    else:
+        st.warning("`sentence-transformers` not found. Falling back to TF-IDF (less accurate semantic search). Run: `pip install sentence-transformers numpy scikit-learn`")
+if SERVICE_URL:
+    st.sidebar.caption(f"Connected to graph service at `{SERVICE_URL}`.")
+
+if info["index"] is not None:
+    with st.sidebar.expander("🧭 Vector Index"):
+        st.write(f"**Type:** `{info['index']['kind']}` | **Vectors:** `{info['index']['size']}`")
+        if st.button("Measure recall@k vs exact search"):
+            report = backend.recall(k=10, quantize=quantize)
+            st.metric("Recall@10", f"{report['recall_at_k']:.1%}")
+            st.caption(f"Index: {report['index_ms_per_query']:.2f} ms/query | Exact: {report['exact_ms_per_query']:.2f} ms/query")
+
+
+# The full graph renders on the worker pool while the search column is filled in; it is only waited for
+# at the end of the page, so searches never queue behind a large graph view.
+col1, col2 = st.columns([3, 2])
+with col1:
+    st.subheader("Full Graph View")
+    expanded = []
+    if info["lod"]:
+        clusters = info["clusters"]
+        expanded = st.multiselect(
+            "Expand clusters",
+            range(len(clusters)),
+            format_func=lambda c: clusters[c],
+            key="lod_expanded",
+        )
+        st.caption(f"{info['nodes']} concepts grouped into {len(clusters)} clusters. Expand a cluster to see its top concepts.")
+    graph_status = st.empty()
+graph_future = submit("graph", (info["version"], tuple(expanded)), backend.graph_html, expanded=list(expanded), height=600)
+
+with col2:
+    st.subheader("🔍 Semantic Search")
+    q = st.text_input("Enter search query", placeholder="e.g. quantum mechanics, Sun, calculus")
+    k = st.slider("Top-K matches", 1, 10, 5)
+    depth = st.slider("Expansion depth", 0, 3, 1)
+    with st.expander("Subgraph limits"):
+        predicate_filter = st.multiselect("Only follow relations", info["predicates"], placeholder="All relations")
+        max_sub_nodes = st.number_input("Max subgraph nodes", min_value=10, max_value=5000, value=300, step=10)
+        max_sub_edges = st.number_input("Max subgraph edges", min_value=10, max_value=20000, value=2000, step=10)
+    use_hybrid = info["hybrid_available"] and st.checkbox("Hybrid lexical + semantic ranking", value=True, help="BM25 and embedding candidates are merged and ranked on one blended score.")
+    rank = st.radio("Rank matches by", list(RANKINGS), format_func=RANKINGS.get, horizontal=True, help="Importance is the concept's PageRank percentile in the graph.")
+    show_importance = rank == "importance" or st.checkbox("Show importance", value=False)
+    subgraph_params = {"depth": depth, "max_nodes": int(max_sub_nodes), "max_edges": int(max_sub_edges), "predicates": predicate_filter, "height": 400}
+    search_params = {"query": q, "k": k, "hybrid": use_hybrid, "quantize": quantize, "rank": rank, "with_importance": show_importance}
+    search_key = (info["version"], tuple(search_params.values()))
+
+    if st.button("Search", use_container_width=True):
+        if not q.strip():
+            st.warning("Please enter a query to search.")
+        else:
+            st.session_state["kg_search"] = search_key
+    # A search stays on screen across reruns until its query or options change; then its work is cancelled.
+    if st.session_state.get("kg_search") not in (None, search_key):
+        del st.session_state["kg_search"]
+        drop("search")
+        drop("subgraph")
+
+    if "kg_search" in st.session_state:
+        search_status = st.empty()
+        results, importance = wait_for(submit("search", search_key, search_with_importance, **search_params), search_status, "Searching")
+
+        if not results:
+            st.warning("No matches found.")
+        else:
+            st.markdown("**Top Matches:**")
+            matched_nodes = [n for n, _ in results]
+            # Matches are shown as soon as they arrive; the subgraph follows when it has rendered.
+            subgraph_future = submit("subgraph", (search_key, tuple(subgraph_params.values())), backend.subgraph_html, seeds=matched_nodes, **subgraph_params)
+            results_df = pd.DataFrame(results, columns=['Concept', 'Similarity Score'])
+            if importance is not None:
+                results_df["Importance"] = importance
+            st.dataframe(results_df, hide_index=True, use_container_width=True, column_config={"Importance": st.column_config.ProgressColumn(min_value=0.0, max_value=1.0)})
+
+            st.markdown("### Subgraph View")
+            show_html(wait_for(subgraph_future, st.empty(), "Rendering subgraph"), height=400)
+
+    with st.expander("📋 Batch Search"):
+        batch_text = st.text_area("Queries (one per line)", placeholder="quantum mechanics\nsolar flares\ngenetics")
+        batch_file = st.file_uploader("...or upload a CSV of queries", type=["csv"], key="batch_query_file")
+        st.caption("Uses the `query` column if present, otherwise the first column.")
+
+        if st.button("Run Batch Search", use_container_width=True):
+            queries = [line.strip() for line in batch_text.splitlines() if line.strip()]
+            if batch_file is not None:
+                qdf = pd.read_csv(batch_file)
+                qcol = "query" if "query" in qdf.columns else qdf.columns[0]
+                queries.extend(qdf[qcol].dropna().astype(str).str.strip().tolist())
+
+            if not queries:
+                st.warning("Please enter or upload at least one query.")
+            else:
+                batch_future = submit("batch", (info["version"], tuple(queries), k, use_hybrid, quantize, rank), backend.search_batch, queries=queries, k=k, hybrid=use_hybrid, quantize=quantize, rank=rank)
+                batch_results = wait_for(batch_future, st.empty(), f"Searching {len(queries)} queries")
+                rows = [
+                    (query, rank, concept, score)
+                    for query, matches in zip(queries, batch_results)
+                    for rank, (concept, score) in enumerate(matches, start=1)
+                ]
+                batch_df = pd.DataFrame(rows, columns=["Query", "Rank", "Concept", "Similarity Score"])
+                st.markdown(f"**{len(queries)}** queries resolved.")
+                st.dataframe(batch_df, hide_index=True, use_container_width=True)
+                st.download_button("Download results (CSV)", batch_df.to_csv(index=False), "batch_search_results.csv", "text/csv")
+
+                st.markdown("### Merged Subgraph View")
+                show_html(backend.subgraph_html(seeds=merge_matches(batch_results), **subgraph_params), height=400)
+
+with col1:
+    show_html(wait_for(graph_future, graph_status, "Rendering full graph"), height=600)
+
+st.markdown("---")
+with st.expander("🧭 Relation Query"):
+    st.caption("Follow chosen relations from one concept, e.g. everything that `influences` Philosophy within 2 hops.")
+    col_node, col_rel, col_hops = st.columns([2, 2, 1])
+    rel_node = col_node.text_input("Concept", placeholder="e.g. Philosophy", key="rel_node").strip()
+    rel_predicates = col_rel.multiselect("Relations", info["predicates"], placeholder="All relations", key="rel_predicates")
+    rel_depth = int(col_hops.number_input("Hops", min_value=1, max_value=5, value=1, key="rel_depth"))
+    rel_direction = st.radio("Direction", list(RELATION_DIRECTIONS), format_func=RELATION_DIRECTIONS.get, horizontal=True, key="rel_direction")
+
+    if st.button("Find related concepts", use_container_width=True):
+        found = backend.related(node=rel_node, predicates=rel_predicates, depth=rel_depth, direction=rel_direction, limit=RELATION_LIMIT) if rel_node else None
+        if found is None:
+            st.warning(f"'{rel_node}' is not a concept in the graph. Names must match exactly; use semantic search to find one.")
+        elif not found:
+            st.info("No concepts are reached through these relations.")
+        else:
+            st.markdown(f"**{len(found)}** concepts reached" + (f" (first {RELATION_LIMIT} shown)." if len(found) >= RELATION_LIMIT else "."))
+            st.dataframe(pd.DataFrame(found, columns=["Concept", "Hops"]), hide_index=True, use_container_width=True)
+            show_html(
+                backend.subgraph_html(
+                    seeds=[rel_node], depth=rel_depth, max_nodes=RELATION_LIMIT + 1, predicates=rel_predicates, height=400, direction=rel_direction
+                ),
+                height=400,
+            )
+
+with st.expander("🛤️ Connect Concepts"):
+    st.caption("How two concepts are linked through the graph, in either direction, e.g. Biology to Philosophy.")
+    col_a, col_b = st.columns(2)
+    source = col_a.text_input("From", placeholder="e.g. Biology", key="connect_source").strip()
+    target = col_b.text_input("To", placeholder="e.g. Philosophy", key="connect_target").strip()
+
+    if st.button("Connect", use_container_width=True) and source and target:
+        route = backend.connect(source=source, target=target)
+        if route is None:
+            st.warning("These concepts are not connected (or one of them is not in the graph; names must match exactly).")
+        else:
+            length = f"{route['hops']} hops" if route["exact"] else f"{route['hops']} hops (the shortest has at least {route['lower_bound']})"
+            st.markdown(f"**Route:** {length}")
+            st.markdown("\n".join(f"- {s} —*{p}*→ {o}" for s, p, o in route["steps"]) or f"- {source}")
+            show_html(backend.subgraph_html(seeds=route["path"], depth=0, max_nodes=len(route["path"]), height=300), height=300)
+
+    if st.toggle("Show most central concepts", key="show_central"):
+        by = st.radio("Centrality", list(CENTRALITIES), format_func=CENTRALITIES.get, horizontal=True, key="central_by")
+        central = pd.DataFrame(backend.top_concepts(by=by, limit=20), columns=["node", "degree", "pagerank", "importance", "betweenness", "component"])
+        central.columns = ["Concept", "Degree", "PageRank", "Importance", "Betweenness", "Component"]
+        st.dataframe(central, hide_index=True, use_container_width=True)
+
+with st.expander("🔗 Suggested Cross-Domain Links"):
+    st.caption("Concepts whose descriptions are semantically close but that are not linked and sit in different domains (graph clusters).")
+    col_n, col_score = st.columns(2)
+    n_neighbors = col_n.slider("Neighbours per concept", 5, 50, 10, step=5)
+    min_similarity = col_score.slider("Minimum similarity", 0.0, 1.0, 0.5, step=0.05)
+    if st.toggle("Find suggested links", key="show_cross_domain"):
+        with st.spinner("Computing node similarity graph..."):
+            links = pd.DataFrame(
+                backend.suggested_links(n_neighbors=n_neighbors, min_score=min_similarity, quantize=quantize),
+                columns=["source", "target", "similarity", "source_domain", "target_domain"],
+            )
+        if links.empty:
+            st.info("No unlinked cross-domain pairs above this similarity.")
+        else:
+            links.columns = ["Concept A", "Concept B", "Similarity", "Domain A", "Domain B"]
+            st.dataframe(links, hide_index=True, use_container_width=True)
+            st.download_button("Download suggestions (CSV)", links.to_csv(index=False), "cross_domain_links.csv", "text/csv")
@@ -1,86 +1,181 @@
-import streamlit as st
-import spacy
-import pandas as pd
-
-if "logged_in" not in st.session_state or not st.session_state["logged_in"]:
-    st.error("You must be logged in to view this page.")
-    st.stop()
-
-@st.cache_resource
-def load_spacy_model():
-    """Load the SpaCy model once."""
-    try:
-        return spacy.load("en_core_web_sm")
-    except Exception as e:
-        st.error(f"Failed to load SpaCy model. Did you run 'python -m spacy download en_core_web_sm'? Error: {e}")
-        return None
-
-nlp = load_spacy_model()
-
-def extract_entities_and_triples(text):
-    """Simple function to extract entities (nodes) and mock triples."""
-    if not nlp:
-        return [], []
-        
-    doc = nlp(text)
-    entities = [(ent.text, ent.label_) for ent in doc.ents]
-    
-    mock_triples = []
-    
-    if len(entities) >= 2:
-        e1, e2 = entities[0][0], entities[1][0]
-        mock_triples.append((e1, "is_related_to", e2))
-    
-    return entities, mock_triples
-
-st.title("🧠 Automated Triple Extractor")
-st.warning("This page uses a simple SpaCy model to **simulate** the entity and triple extraction process.")
-
-if "uploaded_df" not in st.session_state:
-    st.error("Please upload a dataset first via the 'Dataset Manager' page.")
-    st.stop()
-
-df = st.session_state["uploaded_df"]
-text_column = st.session_state.get("text_column_selector", df.columns[0])
-
-st.markdown(f"**Data Source:** `{st.session_state['data_source_name']}` | **Text Column Used:** `{text_column}`")
-
-st.markdown("---")
-if st.button("▶️ Run Triple Extraction on Data", type="primary", use_container_width=True):
-    with st.spinner(f"Extracting entities and triples from column '{text_column}'..."):
-        
-        all_triples = []
-        all_entities = set()
-        
-        for index, row in df.iterrows():
-            text = str(row[text_column])
-            entities, triples = extract_entities_and_triples(text)
-            
-            for e, label in entities:
-                all_entities.add((e, label))
-            
-            all_triples.extend(triples)
-        
-        st.session_state["extracted_entities"] = list(all_entities)
-        st.session_state["extracted_triples"] = all_triples
-        st.success(f"Extraction complete! Found **{len(all_entities)}** unique entities and **{len(all_triples)}** mock triples.")
-        
-st.markdown("---")
-
-if "extracted_triples" in st.session_state:
-    st.subheader("Extracted Results")
-    
-    tab_e, tab_t = st.tabs(["Entities", "Triples"])
-    
-    with tab_e:
-        st.markdown(f"**Unique Entities Found:** {len(st.session_state['extracted_entities'])}")
-        entities_df = pd.DataFrame(st.session_state['extracted_entities'], columns=["Entity/Node", "Type/Label"])
-        st.dataframe(entities_df, use_container_width=True)
-        
-    with tab_t:
-        st.markdown(f"**Mock Triples Found:** {len(st.session_state['extracted_triples'])}")
-        triples_df = pd.DataFrame(st.session_state['extracted_triples'], columns=["Subject", "Predicate", "Object"])
-        st.dataframe(triples_df, use_container_width=True)
-        
-        if st.button("Add Extracted Triples to Knowledge Graph (Simulated)", key="add_to_kg_btn"):
-            st.success(f"**{len(st.session_state['extracted_triples'])}** triples successfully prepared for integration.")
\ No newline at end of file
+import streamlit as st
+import pandas as pd
+import os
+
+from knowmap.extraction import cores_for, extract_chunk, extraction_cost
+from knowmap.ingest import read_column
+from knowmap.demo_data import TRIPLES
+from knowmap.jobs import COMPLETED, FAILED, JobRunner
+from knowmap.models import get_spacy_model
+from knowmap.postprocess import load_table, merge_chunks, save_tables
+from knowmap.triple_store import MAIN_STORE, TripleStore, load_store, save_store
+
+if "logged_in" not in st.session_state or not st.session_state["logged_in"]:
+    st.error("You must be logged in to view this page.")
+    st.stop()
+
+def load_spacy_model():
+    """Load the SpaCy model once per process (via the shared model registry)."""
+    try:
+        return get_spacy_model()
+    except Exception as e:
+        st.error(f"Failed to load SpaCy model. Did you run 'python -m spacy download en_core_web_sm'? Error: {e}")
+        return None
+
+nlp = load_spacy_model()
+
+@st.cache_resource
+def get_extraction_runner(_nlp):
+    """One background runner per process; jobs keep going across reruns and disconnects."""
+    return JobRunner("extraction", lambda texts, **params: extract_chunk(_nlp, texts, **params))
+
+def load_job_results(runner, job_id):
+    """Merge the job's chunk checkpoints into deduplicated tables and an interned triple store."""
+    name = f"extracted-{job_id}"
+    chunks = runner.results(job_id)
+    entities, triples, provenance = merge_chunks(chunks)
+    store = TripleStore.from_frame(triples)
+    # Entities share the store's term vocabulary, so one surface form is one node id everywhere.
+    entities["entity_id"] = store.terms.intern(entities["entity"].to_numpy(dtype=object))
+    save_store(name, store)
+    save_tables(name, entities=entities, triples=triples, provenance=provenance, cost=pd.DataFrame([extraction_cost(chunks)]))
+    st.session_state["extracted_store"] = name
+    st.session_state["extraction_loaded_job"] = job_id
+
+@st.cache_data(max_entries=8)
+def load_extracted_table(name, table):
+    return load_table(name, table)
+
+# Poll job status every couple of seconds where st.fragment is available; otherwise use the refresh button.
+poll_fragment = st.fragment(run_every=2) if hasattr(st, "fragment") else (lambda f: f)
+
+st.title("🧠 Automated Triple Extractor")
+st.info("Entities come from the SpaCy model's entity recognizer; triples are subject–verb–object relations read from the dependency parse of each sentence.")
+if nlp is not None and "parser" not in nlp.pipe_names:
+    st.warning("The loaded SpaCy model has no dependency parser, so only entities will be extracted.")
+
+if "dataset" not in st.session_state:
+    st.error("Please upload a dataset first via the 'Dataset Manager' page.")
+    st.stop()
+
+dataset = st.session_state["dataset"]
+text_column = st.session_state.get("text_column_selector", dataset["columns"][0])
+
+st.markdown(f"**Data Source:** `{st.session_state['data_source_name']}` | **Text Column Used:** `{text_column}`")
+
+st.markdown("---")
+
+with st.expander("⚙️ Extraction Settings"):
+    batch_size = st.select_slider("Batch size (docs per nlp.pipe batch)", options=[32, 64, 128, 256, 512, 1024], value=256)
+    n_process = st.number_input("Worker processes", min_value=1, max_value=os.cpu_count() or 1, value=1)
+    st.caption("Each chunk is split across a pool of worker processes that hold the model and return only columns of results. Only the components needed for entities and the dependency parse are run.")
+
+    chunk_size = st.select_slider("Checkpoint chunk size (rows)", options=[500, 1000, 5000, 10000, 50000], value=5000)
+    st.caption("Extraction runs as a background job; each finished chunk is checkpointed so the job can be resumed.")
+
+runner = get_extraction_runner(nlp) if nlp else None
+
+if st.button("▶️ Run Triple Extraction on Data", type="primary", use_container_width=True) and runner:
+    texts = read_column(dataset["path"], text_column).fillna("").astype(str).tolist()
+    st.session_state["extraction_job_id"] = runner.submit(
+        texts,
+        chunk_size=chunk_size,
+        label=f"{st.session_state['data_source_name']}:{text_column}",
+        batch_size=batch_size,
+        n_process=int(n_process),
+    )
+
+@poll_fragment
+def job_status_panel():
+    job_id = st.session_state.get("extraction_job_id")
+    job = runner.status(job_id) if runner and job_id else None
+    if job is None:
+        return
+
+    st.progress(
+        job["done_chunks"] / max(1, job["total_chunks"]),
+        text=f"Job `{job_id}` ({job['status']}): {job['done_rows']:,} / {job['total_rows']:,} rows",
+    )
+    st.caption(f"Throughput: **{job['rows_per_sec']:,.0f} docs/sec** | Chunks: {job['done_chunks']} / {job['total_chunks']}")
+
+    if job["status"] == COMPLETED and st.session_state.get("extraction_loaded_job") != job_id:
+        load_job_results(runner, job_id)
+        st.rerun()
+    elif job["status"] == COMPLETED:
+        name = st.session_state["extracted_store"]
+        st.success(f"Extraction complete! Found **{len(load_extracted_table(name, 'entities'))}** unique entities and **{len(load_store(name))}** unique triples.")
+    elif job["status"] == FAILED:
+        st.error(f"Extraction job failed:\n\n```\n{job['error']}\n```")
+        if st.button("Resume Job", key="resume_job_btn"):
+            runner.resume(job_id)
+
+job_status_panel()
+
+if runner:
+    with st.expander("🗂️ Recent Extraction Jobs"):
+        jobs = runner.list_jobs()
+        if jobs:
+            jobs_df = pd.DataFrame(jobs)[["id", "label", "status", "done_rows", "total_rows", "done_chunks", "total_chunks"]]
+            st.dataframe(jobs_df, hide_index=True, use_container_width=True)
+            selected_job = st.selectbox("Job", [j["id"] for j in jobs], key="selected_job_id")
+            col_attach, col_refresh = st.columns(2)
+            if col_attach.button("Attach to Job", use_container_width=True):
+                st.session_state["extraction_job_id"] = selected_job
+                st.rerun()
+            if col_refresh.button("🔄 Refresh Status", use_container_width=True):
+                st.rerun()
+        else:
+            st.caption("No extraction jobs yet.")
+
+st.markdown("---")
+
+extracted = load_store(st.session_state["extracted_store"]) if "extracted_store" in st.session_state else None
+
+if extracted is not None:
+    st.subheader("Extracted Results")
+    
+    tab_e, tab_t, tab_c = st.tabs(["Entities", "Triples", "Cost"])
+    
+    with tab_e:
+        entities_df = load_extracted_table(st.session_state["extracted_store"], "entities")
+        st.markdown(f"**Unique Entities Found:** {len(entities_df)} ({entities_df['count'].sum():,} mentions)")
+        entities_df = entities_df.rename(columns={"entity": "Entity/Node", "label": "Type/Label", "count": "Mentions", "first_row": "First Row", "entity_id": "Node ID"})
+        st.dataframe(entities_df, use_container_width=True)
+        
+    with tab_t:
+        triples_df = load_extracted_table(st.session_state["extracted_store"], "triples")
+        st.markdown(f"**Unique Triples Found:** {len(extracted)} ({triples_df['count'].sum():,} before deduplication)")
+        triples_df = triples_df.rename(columns={"subject": "Subject", "predicate": "Predicate", "object": "Object", "count": "Occurrences", "first_row": "First Row"})
+        st.dataframe(triples_df, use_container_width=True)
+        st.caption("Source rows and sentence character offsets for every triple are kept in the provenance table of this extraction.")
+        
+        # Each job's triples are added once; another click would append them to the main store again.
+        added = st.session_state.setdefault("extraction_added", set())
+        already_added = st.session_state["extracted_store"] in added
+        if st.button("Add Extracted Triples to Knowledge Graph", key="add_to_kg_btn", disabled=already_added):
+            main = load_store(MAIN_STORE)
+            if main is None:
+                main = TripleStore.from_triples(TRIPLES)
+            merged = save_store(MAIN_STORE, main.extend(extracted))
+            added.add(st.session_state["extracted_store"])
+            st.success(f"**{len(extracted)}** triples added to the knowledge graph ({len(merged)} triples in total).")
+        elif already_added:
+            st.caption("These triples are already in the knowledge graph.")
+
+    with tab_c:
+        cost = load_extracted_table(st.session_state["extracted_store"], "cost").iloc[0]
+        col_doc, col_core, col_chars, col_yield = st.columns(4)
+        col_doc.metric("CPU per document", f"{cost['cpu_ms_per_doc']:.2f} ms")
+        col_core.metric("Docs/sec per core", f"{cost['docs_per_core_second']:,.0f}")
+        col_chars.metric("CPU per 1k chars", f"{cost['cpu_ms_per_1k_chars']:.2f} ms")
+        col_yield.metric("Triples per document", f"{cost['triples_per_doc']:.2f}")
+        st.caption(
+            f"{int(cost['docs']):,} documents, {int(cost['sentences']):,} sentences and {int(cost['tokens']):,} tokens in "
+            f"{cost['wall_seconds']:.1f} s wall time ({cost['docs_per_second']:,.0f} docs/sec) and {cost['cpu_seconds']:.1f} s of worker CPU time."
+        )
+
+        st.markdown("**Fleet sizing**")
+        col_docs, col_hours = st.columns(2)
+        plan_docs = col_docs.number_input("Documents to extract", min_value=1, value=1_000_000, step=100_000)
+        plan_hours = col_hours.number_input("Within (hours)", min_value=0.1, value=1.0, step=0.5)
+        st.markdown(f"≈ **{cores_for(plan_docs, plan_hours * 3600, cost):,.1f}** worker cores at the measured cost per document.")
\ No newline at end of file
@@ -0,0 +1,18 @@
+import os
+import tempfile
+
+import pytest
+
+# Point every on-disk cache at a scratch directory before knowmap.config is imported.
+os.environ["KNOWMAP_CACHE_DIR"] = tempfile.mkdtemp(prefix="knowmap-tests-")
+os.environ.pop("KNOWMAP_SNAPSHOT_DIR", None)
+os.environ.pop("KNOWMAP_SERVICE_URL", None)
+
+
+@pytest.fixture(scope="session")
+def engine():
+    from knowmap.engine import GraphEngine
+
+    engine = GraphEngine(use_sentence_model=False)
+    engine.refresh()
+    return engine
@@ -0,0 +1,76 @@
+import threading
+import time
+
+
+def test_search_returns_best_match_first(engine):
+    matches = engine.search("Sun", k=3)
+    assert len(matches) == 3
+    assert matches[0][0] == "Sun"
+    scores = [score for _, score in matches]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_search_batch_keeps_query_order_and_skips_empty_queries(engine):
+    results = engine.search_batch(["DNA", "", "Sun"], k=2)
+    assert results[0][0][0] == "DNA"
+    assert results[1] == []
+    assert results[2][0][0] == "Sun"
+
+
+def test_subgraph_html_renders_the_seed_and_its_neighbours(engine):
+    html = engine.subgraph_html(["Sun"], depth=1)
+    for node in ("Sun", "Star", "Solar Flares"):
+        assert node in html
+
+
+def test_subgraph_html_respects_node_and_edge_caps(engine):
+    html = engine.subgraph_html(["Asia"], depth=2, max_nodes=4, max_edges=2)
+    assert html.count('"from"') <= 2
+    assert "Watson & Crick" not in html
+
+
+def test_subgraph_html_with_unknown_seed_renders_an_empty_graph(engine):
+    assert "Sun" not in engine.subgraph_html(["No Such Concept"], depth=1)
+
+
+def test_related_follows_one_predicate_backwards(engine):
+    assert engine.related("Asia", predicates=["subconcept_of"], direction="in") == [["Concept A", 1], ["Concept B", 1]]
+    assert engine.related("Sun", predicates=["is_a"], direction="out") == [["Star", 1]]
+    assert engine.related("No Such Concept") is None
+
+
+def test_connect_returns_stored_triples_along_the_path(engine):
+    route = engine.connect("Sun", "Space Weather")
+    assert route["path"] == ["Sun", "Solar Flares", "Space Weather"]
+    assert route["steps"] == [["Sun", "has_feature", "Solar Flares"], ["Solar Flares", "affects", "Space Weather"]]
+    assert engine.connect("Sun", "No Such Concept") is None
+
+
+def test_slow_derived_build_does_not_block_search(engine):
+    engine.search("Sun", k=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(10)
+        return "built"
+
+    worker = threading.Thread(target=engine._derive, args=(("slow-test",), slow))
+    worker.start()
+    try:
+        started.wait(10)
+        begin = time.perf_counter()
+        assert engine.search("Star", k=1)[0][0] == "Star"
+        assert time.perf_counter() - begin < 5
+    finally:
+        release.set()
+        worker.join()
+    assert engine._derive(("slow-test",), lambda: "rebuilt") == "built"
+
+
+def test_suggested_links_slice_one_knn_graph(engine):
+    few = engine.suggested_links(n_neighbors=5, min_score=0.0)
+    many = engine.suggested_links(n_neighbors=20, min_score=0.0)
+    assert len(many) >= len(few)
+    assert all(link["source_domain"] != link["target_domain"] for link in many)
+    assert len([key for key in engine._derived if key[1] == "knn"]) == 1
@@ -0,0 +1,58 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from knowmap.service import ServiceClient, ServiceError, make_server
+
+
+@pytest.fixture(scope="module")
+def service(engine):
+    server = make_server(port=0, engine=engine)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, method, body):
+    request = urllib.request.Request(f"{url}/rpc/{method}", data=body, headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_client_calls_engine_methods(service):
+    client = ServiceClient(service)
+    assert client.search(query="Sun", k=1)[0][0] == "Sun"
+    assert client.related(node="Sun", predicates=["is_a"], direction="out") == [["Star", 1]]
+
+
+def test_unknown_method_is_404(service):
+    assert post(service, "shutdown", b"{}")[0] == 404
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"[1, 2]", b'{"query": "Sun", "bogus": 1}', b"{}"])
+def test_arguments_that_do_not_fit_are_400(service, body):
+    status, payload = post(service, "search", body)
+    assert status == 400
+    assert payload["error"]
+
+
+def test_errors_inside_the_engine_are_500(service, engine, monkeypatch):
+    def broken(node, predicates=None, depth=1, direction="in", limit=500):
+        raise TypeError("internal failure")
+
+    monkeypatch.setattr(engine, "related", broken)
+    status, payload = post(service, "related", b'{"node": "Sun"}')
+    assert status == 500
+    assert "internal failure" in payload["error"]
+
+    status, _ = post(service, "top_concepts", b'{"by": "nonsense"}')
+    assert status == 500
+    with pytest.raises(ServiceError):
+        ServiceClient(service).top_concepts(by="nonsense")